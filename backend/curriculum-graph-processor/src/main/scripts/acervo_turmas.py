@@ -0,0 +1,382 @@
+import os
+import json
+import argparse
+import hashlib
+import time
+from datetime import datetime
+
+import instrumentation
+from atualizar_turmas import PASTA_DADOS, PERIODO, URI, Neo4jImporter, carregar_turmas, preparar_importacao
+from manifesto_turmas import CAMPOS_CHAVE
+
+# Pasta do acervo: uma subpasta por período
+ACERVO = os.getenv("TURMAS_ACERVO", "/app/acervo_turmas")
+
+SITUACAO_CANCELADA = 10
+
+
+def id_versao(turma):
+    """Identificador de uma versão de turma: hash do JSON canônico dela."""
+    conteudo = json.dumps(turma, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(conteudo.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _reparar_jsonl(caminho, bloco=64 * 1024):
+    """
+    Corta o arquivo no fim da última linha completa. Uma gravação
+    interrompida deixa um pedaço de registro sem "\n" no fim; sem o corte,
+    o próximo acréscimo continuaria na mesma linha e os dois registros se
+    perderiam.
+    """
+    try:
+        f = open(caminho, "rb+")
+    except FileNotFoundError:
+        return
+    with f:
+        tamanho = f.seek(0, os.SEEK_END)
+        fim = tamanho
+        while fim > 0:
+            inicio = max(0, fim - bloco)
+            f.seek(inicio)
+            trecho = f.read(fim - inicio)
+            quebra = trecho.rfind(b"\n")
+            if quebra != -1:
+                fim = inicio + quebra + 1
+                break
+            fim = inicio
+        if fim != tamanho:
+            f.truncate(fim)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _ler_jsonl(caminho):
+    """Linhas de um arquivo JSONL, cortado antes na última linha completa (ver _reparar_jsonl)."""
+    _reparar_jsonl(caminho)
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return [json.loads(linha) for linha in f]
+    except FileNotFoundError:
+        return []
+
+
+def _acrescentar_jsonl(caminho, registros):
+    with open(caminho, "a", encoding="utf-8") as f:
+        for registro in registros:
+            f.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class AcervoTurmas:
+    """
+    Histórico local das turmas de um período, só de acréscimos.
+
+    Cada versão distinta de uma turma é gravada uma única vez em
+    `objetos.jsonl`, identificada pelo hash do seu conteúdo. Cada captura
+    (um download registrado) acrescenta uma linha em `capturas.jsonl` com
+    o que mudou em relação à captura anterior: as turmas cuja versão mudou
+    (shortname -> id da versão) e as que sumiram. Uma turma que não mudou
+    não ocupa nada em uma captura nova; um download sem mudanças não gera
+    captura.
+
+    O estado de qualquer captura é a soma das capturas até ela, e o delta
+    entre duas capturas só olha as turmas tocadas no meio do caminho.
+    """
+
+    def __init__(self, raiz, periodo):
+        self.periodo = str(periodo)
+        self.pasta = os.path.join(raiz, self.periodo)
+        self.caminho_objetos = os.path.join(self.pasta, "objetos.jsonl")
+        self.caminho_capturas = os.path.join(self.pasta, "capturas.jsonl")
+        self.caminho_cursor = os.path.join(self.pasta, "importado.json")
+
+        self.objetos = {registro["id"]: registro["turma"] for registro in _ler_jsonl(self.caminho_objetos)}
+        self.capturas = _ler_jsonl(self.caminho_capturas)
+        self._atual = self.estado()
+
+    @property
+    def ultima(self):
+        """Número da última captura (0 se o acervo está vazio)."""
+        return self.capturas[-1]["captura"] if self.capturas else 0
+
+    def estado(self, captura=None):
+        """{shortname: id da versão} das turmas presentes na captura (padrão: a última)."""
+        estado = {}
+        for registro in self.capturas:
+            if captura is not None and registro["captura"] > captura:
+                break
+            estado.update(registro["alteradas"])
+            for shortname in registro["removidas"]:
+                estado.pop(shortname, None)
+        return estado
+
+    def turmas(self, captura=None):
+        """As turmas completas presentes na captura."""
+        return [self.objetos[id_] for id_ in self.estado(captura).values()]
+
+    def registrar(self, turmas, origem=None):
+        """
+        Registra uma nova captura com as turmas baixadas e devolve o seu
+        delta, ou None se nada mudou desde a última captura.
+        """
+        alteradas = {}
+        novos_objetos = []
+        vistas = set()
+        for turma in turmas:
+            shortname = turma["shortname"]
+            vistas.add(shortname)
+            id_ = id_versao(turma)
+            if self._atual.get(shortname) == id_:
+                continue
+            alteradas[shortname] = id_
+            if id_ not in self.objetos:
+                self.objetos[id_] = turma
+                novos_objetos.append({"id": id_, "turma": turma})
+        removidas = sorted(shortname for shortname in self._atual if shortname not in vistas)
+
+        if not alteradas and not removidas:
+            return None
+
+        registro = {
+            "captura": self.ultima + 1,
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "origem": origem,
+            "alteradas": alteradas,
+            "removidas": removidas,
+        }
+        os.makedirs(self.pasta, exist_ok=True)
+        # Os objetos vão antes, para que uma captura nunca aponte para uma versão que não foi gravada
+        if novos_objetos:
+            _acrescentar_jsonl(self.caminho_objetos, novos_objetos)
+        _acrescentar_jsonl(self.caminho_capturas, [registro])
+
+        anterior = dict(self._atual)
+        self.capturas.append(registro)
+        self._atual.update(alteradas)
+        for shortname in removidas:
+            self._atual.pop(shortname, None)
+        return self._comparar(anterior, self._atual, set(alteradas) | set(removidas), registro["captura"] - 1,
+                              registro["captura"])
+
+    def cursor_importacao(self):
+        """Última captura enviada ao Neo4j e as turmas que falharam nela."""
+        try:
+            with open(self.caminho_cursor, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"captura": 0, "pendentes": []}
+
+    def salvar_cursor(self, captura, pendentes):
+        temporario = self.caminho_cursor + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"captura": captura, "pendentes": sorted(pendentes)}, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho_cursor)
+
+    def delta(self, de=None, ate=None):
+        """Delta entre as capturas `de` (padrão: a penúltima) e `ate` (padrão: a última)."""
+        ate = self.ultima if ate is None else ate
+        de = max(ate - 1, 0) if de is None else de
+        tocadas = set()
+        for registro in self.capturas:
+            if de < registro["captura"] <= ate:
+                tocadas.update(registro["alteradas"])
+                tocadas.update(registro["removidas"])
+        return self._comparar(self.estado(de), self.estado(ate), tocadas, de, ate)
+
+    def _comparar(self, antes, depois, tocadas, de, ate):
+        """
+        Uma passada pelas turmas tocadas entre duas capturas. Cada item diz
+        se a turma é nova, alterada ou removida e traz os campos que mudaram
+        como {campo: [antes, depois]}.
+        """
+        turmas = []
+        resumo = {"de": de, "ate": ate, "novas": 0, "alteradas": 0, "removidas": 0,
+                  "canceladas": 0, "vagas_ocupadas": 0}
+
+        for shortname in sorted(tocadas):
+            id_antes, id_depois = antes.get(shortname), depois.get(shortname)
+            if id_antes == id_depois:
+                continue
+            velha = self.objetos[id_antes] if id_antes else {}
+            nova = self.objetos[id_depois] if id_depois else {}
+
+            if not id_antes:
+                tipo = "nova"
+            elif not id_depois:
+                tipo = "removida"
+            else:
+                tipo = "alterada"
+            resumo[f"{tipo}s"] += 1
+
+            campos = {campo: [velha.get(campo), nova.get(campo)]
+                      for campo in velha.keys() | nova.keys() if velha.get(campo) != nova.get(campo)}
+            if nova.get("situacao") == SITUACAO_CANCELADA and velha.get("situacao") != SITUACAO_CANCELADA:
+                resumo["canceladas"] += 1
+            resumo["vagas_ocupadas"] += (nova.get("vagas_ocupadas") or 0) - (velha.get("vagas_ocupadas") or 0)
+
+            referencia = nova or velha
+            turmas.append({
+                "shortname": shortname,
+                "tipo": tipo,
+                **{campo: referencia.get(campo) for campo in CAMPOS_CHAVE},
+                "campos": dict(sorted(campos.items())),
+            })
+        return {"resumo": resumo, "turmas": turmas}
+
+
+def linhas_importacao(acervo, delta):
+    """
+    Converte um delta nas linhas das consultas do atualizar_turmas:
+    turmas novas vão completas, alteradas só com a chave e os campos que
+    mudaram (None apaga a propriedade) e removidas só com a chave.
+    """
+    completas, parciais, removidas = [], [], []
+    estado = acervo.estado(delta["resumo"]["ate"])
+    for item in delta["turmas"]:
+        chave = {campo: item[campo] for campo in CAMPOS_CHAVE}
+        if item["tipo"] == "removida":
+            removidas.append({"shortname": item["shortname"], **chave})
+        elif item["tipo"] == "nova" or any(campo in CAMPOS_CHAVE for campo in item["campos"]):
+            completas.append(acervo.objetos[estado[item["shortname"]]])
+        else:
+            parciais.append({"shortname": item["shortname"], **chave,
+                             **{campo: depois for campo, (_, depois) in item["campos"].items()}})
+    return completas, parciais, removidas
+
+
+def importar_delta(importer, acervo):
+    """
+    Envia ao Neo4j só o que mudou desde a última captura importada. Turmas
+    que falharam são guardadas no cursor e reenviadas completas na próxima
+    vez, como o manifesto faz na importação por arquivos.
+    """
+    cursor = acervo.cursor_importacao()
+    delta = acervo.delta(cursor["captura"], acervo.ultima)
+    completas, parciais, removidas = linhas_importacao(acervo, delta)
+
+    estado = acervo.estado()
+    reenviadas = {shortname for shortname in cursor["pendentes"] if shortname in estado}
+    reenviadas -= {turma["shortname"] for turma in completas}
+    completas += [acervo.objetos[estado[shortname]] for shortname in sorted(reenviadas)]
+    parciais = [linha for linha in parciais if linha["shortname"] not in reenviadas]
+
+    falhas = importer.importar_linhas(completas, "completa")
+    falhas += importer.importar_linhas(parciais, "parcial")
+    falhas += importer.remover_turmas(removidas)
+
+    acervo.salvar_cursor(acervo.ultima, {falha["shortname"] for falha in falhas if falha["shortname"] in estado})
+    return {"resumo": delta["resumo"], "completas": len(completas), "parciais": len(parciais),
+            "removidas": len(removidas), "falhas": falhas}
+
+
+def periodos(raiz):
+    try:
+        return sorted(nome for nome in os.listdir(raiz) if os.path.isdir(os.path.join(raiz, nome)))
+    except FileNotFoundError:
+        return []
+
+
+def registrar_pasta(raiz, pasta):
+    """Registra os arquivos turmas_curso_*.json de uma pasta, com uma captura por período encontrado."""
+    por_periodo = {}
+    for filename in sorted(os.listdir(pasta)):
+        if not filename.endswith(".json") or filename.startswith("."):
+            continue
+        for turma in carregar_turmas(os.path.join(pasta, filename)) or []:
+            por_periodo.setdefault(str(turma["periodo"]), {})[turma["shortname"]] = turma
+
+    deltas = {}
+    for periodo, turmas in sorted(por_periodo.items()):
+        acervo = AcervoTurmas(raiz, periodo)
+        deltas[periodo] = acervo.registrar(turmas.values(), origem=os.path.abspath(pasta))
+    return deltas
+
+
+def imprimir_resumo(periodo, delta):
+    if delta is None:
+        print(f"Período {periodo}: sem alterações desde a última captura.")
+        return
+    resumo = delta["resumo"]
+    print(f"Período {periodo}, captura {resumo['de']} -> {resumo['ate']}: "
+          f"{resumo['novas']} novas, {resumo['alteradas']} alteradas, {resumo['removidas']} removidas, "
+          f"{resumo['canceladas']} canceladas, {resumo['vagas_ocupadas']:+d} vagas ocupadas.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico de capturas das turmas, por período.")
+    parser.add_argument("--acervo", default=ACERVO, help="Pasta do acervo")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    registrar = comandos.add_parser("registrar", help="Registra os arquivos baixados como uma nova captura")
+    registrar.add_argument("--pasta", default=PASTA_DADOS, help="Pasta com os arquivos turmas_curso_*.json")
+
+    delta = comandos.add_parser("delta", help="Mostra o que mudou entre duas capturas")
+    delta.add_argument("--periodo", required=True)
+    delta.add_argument("--de", type=int, help="Captura inicial (padrão: a penúltima)")
+    delta.add_argument("--ate", type=int, help="Captura final (padrão: a última)")
+    delta.add_argument("--json", action="store_true", help="Imprime o delta completo em JSON")
+
+    importar = comandos.add_parser("importar", help="Envia ao Neo4j o delta desde a última importação")
+    importar.add_argument("--periodo", default=PERIODO)
+    importar.add_argument("--sem-esquema", action="store_true",
+                          help="Não cria os índices/restrições antes de importar")
+    importar.add_argument("--permitir-varredura", action="store_true",
+                          help="Importa mesmo que o plano de alguma consulta varra um rótulo inteiro")
+
+    comandos.add_parser("listar", help="Lista os períodos e capturas do acervo")
+    instrumentation.add_cli_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    if args.comando == "registrar":
+        if not os.path.isdir(args.pasta):
+            print(f"Erro: A pasta '{args.pasta}' não foi encontrada.")
+            return
+        inicio = time.perf_counter()
+        for periodo, resultado in registrar_pasta(args.acervo, args.pasta).items():
+            imprimir_resumo(periodo, resultado)
+        print(f"Tempo total: {time.perf_counter() - inicio:.2f}s")
+
+    elif args.comando == "delta":
+        acervo = AcervoTurmas(args.acervo, args.periodo)
+        resultado = acervo.delta(args.de, args.ate)
+        if args.json:
+            print(json.dumps(resultado, ensure_ascii=False, indent=2))
+        else:
+            imprimir_resumo(args.periodo, resultado)
+            for item in resultado["turmas"]:
+                campos = ", ".join(f"{campo}: {antes} -> {depois}" for campo, (antes, depois) in item["campos"].items()
+                                   if item["tipo"] == "alterada")
+                print(f"  [{item['tipo'].upper()}] {item['shortname']}{' (' + campos + ')' if campos else ''}")
+
+    elif args.comando == "importar":
+        acervo = AcervoTurmas(args.acervo, args.periodo)
+        importer = Neo4jImporter(URI)
+        if importer.driver is None:
+            return
+        if preparar_importacao(importer, args.sem_esquema, args.permitir_varredura):
+            inicio = time.perf_counter()
+            with instrumentation.span("import"):
+                resultado = importar_delta(importer, acervo)
+            for falha in resultado["falhas"]:
+                print(f"  [FALHA] Turma '{falha['shortname']}': {falha['motivo']}")
+            imprimir_resumo(args.periodo, resultado)
+            print(f"Enviadas: {resultado['completas']} completas, {resultado['parciais']} parciais, "
+                  f"{resultado['removidas']} remoções, {len(resultado['falhas'])} falhas "
+                  f"em {time.perf_counter() - inicio:.2f}s")
+        importer.close()
+
+    else:
+        for periodo in periodos(args.acervo):
+            acervo = AcervoTurmas(args.acervo, periodo)
+            tamanho = sum(os.path.getsize(os.path.join(acervo.pasta, nome)) for nome in os.listdir(acervo.pasta))
+            print(f"Período {periodo}: {len(acervo.capturas)} capturas, {len(acervo.estado())} turmas, "
+                  f"{len(acervo.objetos)} versões ({tamanho / 1e6:.1f} MB)")
+            for registro in acervo.capturas:
+                print(f"  {registro['captura']:>4}  {registro['data']}  {len(registro['alteradas'])} alteradas, "
+                      f"{len(registro['removidas'])} removidas")
+
+
+if __name__ == "__main__":
+    main()
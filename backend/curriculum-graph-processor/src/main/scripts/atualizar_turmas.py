@@ -1,11 +1,67 @@
 import os
 import json
+import argparse
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from neo4j import GraphDatabase
 from neo4j.exceptions import Neo4jError
 
+import instrumentation
+
+from manifesto_turmas import ManifestoTurmas, assinatura_turma, hash_conteudo
+
+log = instrumentation.get_logger("atualizar_turmas")
+
 URI = os.getenv("NEO4J_URI", "bolt://neo4j:7687")
 
-PASTA_DADOS = "/app/turmas_20252"
+# Período padrão e a pasta onde o download_turmas.py grava os arquivos dele
+PERIODO = os.getenv("TURMAS_PERIODO", "20252")
+PASTA_DADOS = os.getenv("TURMAS_PASTA", f"/app/turmas_{PERIODO}")
+
+# Quantidade de turmas enviadas por transação no modo em lotes.
+# Use 0 para voltar ao modo antigo (uma transação por turma).
+TAMANHO_LOTE = int(os.getenv("TURMAS_TAMANHO_LOTE", "500"))
+
+# Paralelismo do pipeline: processos que leem/normalizam os arquivos e
+# sessões do Neo4j que gravam os lotes ao mesmo tempo.
+NUM_LEITORES = int(os.getenv("TURMAS_LEITORES", str(os.cpu_count() or 1)))
+NUM_SESSOES = int(os.getenv("TURMAS_SESSOES", "4"))
+
+# Lotes aguardando gravação por sessão. Quando a fila enche, a leitura de
+# novos arquivos espera o banco (backpressure).
+PROFUNDIDADE_FILA = int(os.getenv("TURMAS_PROFUNDIDADE_FILA", "4"))
+
+# Manifesto com o que já foi importado. Por padrão fica na própria pasta de dados.
+MANIFESTO = os.getenv("TURMAS_MANIFESTO")
+
+# Executa cada lote com PROFILE para registrar os db hits (mais lento).
+PERFIL_LOTES = os.getenv("TURMAS_PERFIL", "0") == "1"
+
+# Segundos esperando os índices ficarem ONLINE antes de importar.
+TEMPO_ESPERA_INDICES = int(os.getenv("TURMAS_ESPERA_INDICES", "300"))
+
+# Índices usados pelo MATCH do Course e pelo MERGE da Class. Sem eles, cada
+# linha dos lotes vira uma varredura de todos os nós do rótulo. A chave da
+# Class é composta; a restrição de unicidade composta (NODE KEY) só existe
+# no Enterprise, então ela fica como índice composto.
+ESQUEMA = [
+    "CREATE CONSTRAINT course_course_id IF NOT EXISTS FOR (c:Course) REQUIRE c.courseId IS UNIQUE",
+    "CREATE INDEX class_chave IF NOT EXISTS FOR (t:Class) ON (t.codigo_disciplina, t.codigo_turma, t.periodo)",
+]
+
+# Operadores de plano que leem todos os nós (do banco ou de um rótulo)
+OPERADORES_VARREDURA = ("AllNodesScan", "NodeByLabelScan")
+
+# Linha que não existe no banco, usada só para obter o plano das consultas
+LINHA_PREFLIGHT = {
+    "codigo_disciplina": "__preflight__",
+    "codigo_turma": "__preflight__",
+    "periodo": -1,
+    "shortname": "__preflight__",
+}
 
 CYPHER_QUERY = """
 MATCH (c:Course {courseId: $props.codigo_disciplina})
@@ -17,76 +73,673 @@ MERGE (t:Class {
 ON CREATE SET t = $props
 ON MATCH SET t += $props
 MERGE (c)-[:OFFERS]->(t)
+RETURN count(t) AS gravadas
+"""
+
+# Mesma escrita da CYPHER_QUERY, mas para um lote inteiro de turmas.
+# O FOREACH só executa o MERGE quando o curso existe; as turmas sem
+# curso correspondente são devolvidas para entrarem no resumo.
+CYPHER_QUERY_LOTE = """
+UNWIND $rows AS props
+OPTIONAL MATCH (c:Course {courseId: props.codigo_disciplina})
+FOREACH (_ IN CASE WHEN c IS NULL THEN [] ELSE [1] END |
+    MERGE (t:Class {
+        codigo_disciplina: props.codigo_disciplina,
+        codigo_turma: props.codigo_turma,
+        periodo: props.periodo
+    })
+    ON CREATE SET t = props
+    ON MATCH SET t += props
+    MERGE (c)-[:OFFERS]->(t)
+)
+WITH props, c
+WHERE c IS NULL
+RETURN props.shortname AS shortname, props.codigo_disciplina AS codigo_disciplina
 """
 
+# Atualização parcial de turmas que já existem: só as propriedades que
+# mudaram desde a última importação são enviadas. Turmas que não estão no
+# banco são devolvidas (e não criadas pela metade).
+CYPHER_QUERY_PARCIAL = """
+UNWIND $rows AS props
+OPTIONAL MATCH (t:Class {
+    codigo_disciplina: props.codigo_disciplina,
+    codigo_turma: props.codigo_turma,
+    periodo: props.periodo
+})
+FOREACH (_ IN CASE WHEN t IS NULL THEN [] ELSE [1] END | SET t += props)
+WITH props, t
+WHERE t IS NULL
+RETURN props.shortname AS shortname, props.codigo_disciplina AS codigo_disciplina
+"""
+
+CYPHER_QUERY_REMOVER = """
+UNWIND $rows AS chave
+MATCH (t:Class {
+    codigo_disciplina: chave.codigo_disciplina,
+    codigo_turma: chave.codigo_turma,
+    periodo: chave.periodo
+})
+DETACH DELETE t
+"""
+
+# Consulta usada por tipo de lote e o motivo registrado para as linhas
+# que ela devolve.
+CONSULTAS_LOTE = {
+    "completa": (CYPHER_QUERY_LOTE, "Curso com courseId='{codigo_disciplina}' não existe no banco."),
+    "parcial": (CYPHER_QUERY_PARCIAL, "Turma não existe no banco; será reenviada completa na próxima execução."),
+}
+
+
+def normalizar_turma(turma):
+    """Converte os horários ocupados para uma lista de inteiros."""
+    horarios = turma.get("sequenciais_horas_ocupadas")
+
+    if isinstance(horarios, dict):
+        turma["sequenciais_horas_ocupadas"] = [int(k) for k in horarios.keys()]
+    elif horarios is None:
+        turma["sequenciais_horas_ocupadas"] = []
+
+    return turma
+
+
+def carregar_turmas(file_path, conteudo=None):
+    """
+    Lê um arquivo turmas_curso_*.json (ou o conteúdo já lido dele) e devolve
+    a lista de turmas normalizadas. Devolve None se o arquivo for inválido.
+    """
+    try:
+        if conteudo is None:
+            with open(file_path, 'rb') as f:
+                conteudo = f.read()
+        data = json.loads(conteudo)
+    except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError) as e:
+        log.error("Não foi possível ler o arquivo %s: %s", os.path.basename(file_path), e)
+        return None
+
+    turmas_data = data.get("turmas")
+    if not turmas_data or not isinstance(turmas_data, dict):
+        log.debug("Nenhuma turma encontrada para processar em %s.", os.path.basename(file_path))
+        return []
+
+    return [normalizar_turma(turma) for turma in turmas_data.values()]
+
+
+def operadores_do_plano(plano):
+    """Percorre a árvore de um plano (PROFILE/EXPLAIN) e devolve seus nós em pré-ordem."""
+    pilha = [plano] if plano else []
+    while pilha:
+        operador = pilha.pop()
+        yield operador
+        pilha.extend(reversed(operador.get("children", [])))
+
+
+def db_hits(plano):
+    return sum(operador.get("dbHits", 0) for operador in operadores_do_plano(plano))
+
+
+def _falha(turma, motivo):
+    return {
+        "shortname": turma.get("shortname"),
+        "codigo_disciplina": turma.get("codigo_disciplina"),
+        "motivo": motivo,
+    }
+
+
 class Neo4jImporter:
-    def __init__(self, uri):
+    def __init__(self, uri, tamanho_lote=TAMANHO_LOTE, perfil=PERFIL_LOTES, driver=None):
+        self.tamanho_lote = tamanho_lote
+        self.perfil = perfil
+        # Métricas de cada lote gravado (consulta, linhas, tempo, db hits);
+        # as sessões do pipeline só fazem append, que é seguro entre threads.
+        self.lotes = []
+        if driver is not None:
+            # Driver já pronto (por exemplo o substituto em memória dos benchmarks)
+            self.driver = driver
+            return
         try:
             # 2. Conecta usando auth=None
             self.driver = GraphDatabase.driver(uri, auth=None)
             self.driver.verify_connectivity()
-            print("Conexão com o Neo4j estabelecida com sucesso!")
+            log.info("Conexão com o Neo4j estabelecida com sucesso!")
         except Exception as e:
-            print(f"Erro ao conectar com o Neo4j: {e}")
+            log.error("Erro ao conectar com o Neo4j: %s", e)
             self.driver = None
 
     def close(self):
         if self.driver is not None:
             self.driver.close()
-            print("Conexão com o Neo4j fechada.")
+            log.info("Conexão com o Neo4j fechada.")
+
+    def garantir_esquema(self, tempo_espera=TEMPO_ESPERA_INDICES):
+        """
+        Cria a restrição e o índice do ESQUEMA que ainda não existem e espera
+        todos os índices ficarem ONLINE. Devolve False se algo falhar.
+        """
+        try:
+            with instrumentation.span("schema"), self.driver.session() as session:
+                for comando in ESQUEMA:
+                    session.run(comando).consume()
+                inicio = time.perf_counter()
+                session.run("CALL db.awaitIndexes($tempo)", tempo=tempo_espera).consume()
+        except Neo4jError as e:
+            log.error("Falha ao criar o esquema: %s", e.message)
+            return False
+        log.info("Esquema pronto: %d índices/restrições online (espera de %.2fs).",
+                 len(ESQUEMA), time.perf_counter() - inicio)
+        return True
+
+    def verificar_planos(self):
+        """
+        Executa cada consulta de lote com PROFILE sobre LINHA_PREFLIGHT, em
+        uma transação desfeita ao final, e devolve os operadores que varrem
+        um rótulo inteiro ou o banco inteiro.
+        """
+        varreduras = []
+        with instrumentation.span("plan_check"), self.driver.session() as session:
+            consultas = {consulta: query for consulta, (query, _) in CONSULTAS_LOTE.items()}
+            consultas["remover"] = CYPHER_QUERY_REMOVER
+            for consulta, query in consultas.items():
+                tx = session.begin_transaction()
+                try:
+                    resumo = tx.run("PROFILE " + query, rows=[LINHA_PREFLIGHT]).consume()
+                finally:
+                    tx.rollback()
+                for operador in operadores_do_plano(resumo.profile):
+                    nome = operador.get("operatorType", "")
+                    if nome.split("@")[0] in OPERADORES_VARREDURA:
+                        varreduras.append({
+                            "consulta": consulta,
+                            "operador": nome,
+                            "detalhes": operador.get("args", {}).get("Details", ""),
+                        })
+        return varreduras
 
     def processar_arquivo(self, file_path):
-        print("-" * 40)
-        print(f"Processando arquivo: {os.path.basename(file_path)}")
+        """
+        Importa as turmas de um arquivo e devolve um resumo com o total de
+        turmas, quantas foram importadas e as falhas de cada linha.
+        """
+        log.debug("Processando arquivo: %s", os.path.basename(file_path))
 
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            print(f"  [ERRO] Não foi possível ler o arquivo: {e}")
-            return
+        resumo = {
+            "arquivo": os.path.basename(file_path),
+            "total": 0,
+            "importadas": 0,
+            "falhas": [],
+        }
 
-        turmas_data = data.get("turmas")
-        if not turmas_data or not isinstance(turmas_data, dict):
-            print("  Nenhuma turma encontrada para processar neste arquivo.")
-            return
+        lista_de_turmas = carregar_turmas(file_path)
+        if not lista_de_turmas:
+            return resumo
 
-        lista_de_turmas = list(turmas_data.values())
-        print(f"  Encontradas {len(lista_de_turmas)} turmas para importar.")
+        resumo["total"] = len(lista_de_turmas)
+        log.debug("Encontradas %d turmas para importar.", len(lista_de_turmas))
 
         with self.driver.session() as session:
-            for turma in lista_de_turmas:
-                horarios = turma.get("sequenciais_horas_ocupadas")
-                
-                if isinstance(horarios, dict):
-                    turma["sequenciais_horas_ocupadas"] = [int(k) for k in horarios.keys()]
-                elif horarios is None:
-                    turma["sequenciais_horas_ocupadas"] = []
+            resumo["falhas"].extend(self._importar_linhas(session, lista_de_turmas))
+
+        resumo["importadas"] = resumo["total"] - len(resumo["falhas"])
+        for falha in resumo["falhas"]:
+            log.warning("Turma '%s': %s", falha["shortname"], falha["motivo"])
+
+        log.info("Importação de %s concluída: %d/%d turmas.", resumo["arquivo"], resumo["importadas"], resumo["total"])
+        return resumo
+
+    def _importar_linhas(self, session, linhas, consulta="completa"):
+        """
+        Grava as linhas em lotes de tamanho_lote e devolve as falhas. Com
+        tamanho_lote 0, as turmas completas são gravadas uma a uma pela
+        CYPHER_QUERY; as parciais não têm consulta por linha e vão em lotes
+        de uma turma.
+        """
+        if not self.tamanho_lote and consulta == "completa":
+            return self._importar_por_linha(session, linhas)
+        falhas = []
+        tamanho = max(1, self.tamanho_lote)
+        for inicio in range(0, len(linhas), tamanho):
+            falhas.extend(self._importar_lote(session, linhas[inicio:inicio + tamanho], consulta))
+        return falhas
+
+    def _importar_por_linha(self, session, lista_de_turmas):
+        falhas = []
+        _, motivo = CONSULTAS_LOTE["completa"]
+        for turma in lista_de_turmas:
+            inicio = time.perf_counter()
+            try:
+                resultado = session.run(("PROFILE " if self.perfil else "") + CYPHER_QUERY, props=turma)
+                registro = resultado.single()
+                resumo = resultado.consume()
+            except Neo4jError as e:
+                log.error("Não foi possível importar a turma '%s': %s (verifique se o curso com courseId='%s' "
+                          "já existe no banco)", turma.get("shortname"), e.message, turma.get("codigo_disciplina"))
+                falhas.append(_falha(turma, e.message))
+                continue
+            self._registrar_lote("linha", 1, time.perf_counter() - inicio, resumo)
+            # Sem o Course, o MATCH não devolve nenhuma linha e nada é gravado
+            if registro is None or not registro["gravadas"]:
+                falhas.append(_falha(turma, motivo.format(codigo_disciplina=turma.get("codigo_disciplina"))))
+        return falhas
+
+    def importar_linhas(self, linhas, consulta="completa"):
+        """Grava linhas já prontas para uma consulta de CONSULTAS_LOTE, em lotes, e devolve as falhas."""
+        with self.driver.session() as session:
+            return self._importar_linhas(session, linhas, consulta)
+
+    def _importar_lote(self, session, lote, consulta="completa"):
+        """
+        Grava um lote em uma única transação de escrita. Se o lote inteiro
+        falhar, as turmas são regravadas uma a uma para identificar quais
+        linhas causaram o erro sem descartar as demais.
+        """
+        query, motivo = CONSULTAS_LOTE[consulta]
+        inicio = time.perf_counter()
+        try:
+            ausentes, resumo = session.execute_write(self._gravar_lote, query, lote, self.perfil)
+        except Neo4jError as e:
+            if len(lote) == 1:
+                return [_falha(lote[0], e.message)]
+
+            falhas = []
+            for turma in lote:
+                falhas.extend(self._importar_lote(session, [turma], consulta))
+            return falhas
+        self._registrar_lote(consulta, len(lote), time.perf_counter() - inicio, resumo)
+
+        return [
+            {
+                "shortname": registro["shortname"],
+                "codigo_disciplina": registro["codigo_disciplina"],
+                "motivo": motivo.format(**registro),
+            }
+            for registro in ausentes
+        ]
 
+    def remover_turmas(self, chaves):
+        """Remove (DETACH DELETE) as turmas indicadas e devolve as falhas."""
+        falhas = []
+        tamanho = max(1, self.tamanho_lote)
+        with self.driver.session() as session:
+            for inicio in range(0, len(chaves), tamanho):
+                lote = chaves[inicio:inicio + tamanho]
+                comeco = time.perf_counter()
                 try:
-                    session.run(CYPHER_QUERY, props=turma)
+                    _, resumo = session.execute_write(self._gravar_lote, CYPHER_QUERY_REMOVER, lote, self.perfil)
                 except Neo4jError as e:
-                    print(f"  [ERRO CYPHER] Não foi possível importar a turma '{turma.get('shortname')}'.")
-                    print(f"  Motivo: {e.message}")
-                    print(f"  Verifique se o curso com courseId='{turma.get('codigo_disciplina')}' já existe no banco.")
+                    falhas.extend(_falha(chave, e.message) for chave in lote)
+                else:
+                    self._registrar_lote("remover", len(lote), time.perf_counter() - comeco, resumo)
+        return falhas
+
+    def _registrar_lote(self, consulta, linhas, tempo, resumo):
+        metricas = {
+            "consulta": consulta,
+            "linhas": linhas,
+            "tempo": tempo,
+            "db_hits": db_hits(resumo.profile) if resumo.profile else None,
+        }
+        self.lotes.append(metricas)
+        instrumentation.run.record("db_write", tempo)
+        instrumentation.count("rows", linhas)
+        if metricas["db_hits"] is not None:
+            instrumentation.count("db_hits", metricas["db_hits"])
+        log.debug("Lote %s: %d linhas em %.0f ms", consulta, linhas, tempo * 1000,
+                  extra={"consulta": consulta, "linhas": linhas, "db_hits": metricas["db_hits"]})
+
+    @staticmethod
+    def _gravar_lote(tx, query, lote, perfil=False):
+        result = tx.run(("PROFILE " if perfil else "") + query, rows=lote)
+        registros = [record.data() for record in result]
+        return registros, result.consume()
+
+
+def _ler_arquivo(file_path, hash_anterior=None, com_assinaturas=False):
+    """
+    Executado nos processos leitores: lê e normaliza um arquivo. Se o hash
+    do conteúdo for igual a `hash_anterior`, o JSON nem chega a ser lido.
+    """
+    inicio = time.perf_counter()
+    resultado = {
+        "arquivo": os.path.basename(file_path),
+        "hash": None,
+        "inalterado": False,
+        "erro": False,
+        "turmas": [],
+        "assinaturas": [],
+    }
+
+    try:
+        with open(file_path, 'rb') as f:
+            conteudo = f.read()
+    except OSError as e:
+        log.error("Não foi possível ler o arquivo %s: %s", os.path.basename(file_path), e)
+        resultado["erro"] = True
+    else:
+        resultado["hash"] = hash_conteudo(conteudo)
+        if resultado["hash"] == hash_anterior:
+            resultado["inalterado"] = True
+        else:
+            turmas = carregar_turmas(file_path, conteudo)
+            if turmas is None:
+                resultado["erro"] = True
+            else:
+                resultado["turmas"] = turmas
+                if com_assinaturas:
+                    resultado["assinaturas"] = [assinatura_turma(turma) for turma in turmas]
+
+    resultado["tempo"] = time.perf_counter() - inicio
+    return resultado
+
+
+def _particao(turma, num_sessoes):
+    codigo = str(turma.get("codigo_disciplina", ""))
+    return zlib.crc32(codigo.encode("utf-8")) % num_sessoes
+
+
+class ImportacaoParalela:
+    """
+    Pipeline de importação: um pool de processos faz o parse dos arquivos e
+    um conjunto limitado de sessões do Neo4j grava os lotes em paralelo.
+
+    As turmas são distribuídas entre as sessões pelo codigo_disciplina, de
+    modo que todas as escritas sobre um mesmo Course passam sempre pela
+    mesma sessão, em sequência. Assim, transações concorrentes nunca
+    disputam os mesmos nós (sem deadlocks) e duas sessões nunca fazem
+    MERGE da mesma turma ao mesmo tempo.
+
+    Com um manifesto, a importação é incremental: arquivos inalterados são
+    ignorados, turmas alteradas enviam só as propriedades que mudaram e
+    turmas que sumiram do período são removidas do banco.
+    """
+
+    def __init__(self, importer, leitores=NUM_LEITORES, sessoes=NUM_SESSOES,
+                 profundidade_fila=PROFUNDIDADE_FILA, manifesto=None):
+        self.importer = importer
+        self.manifesto = manifesto
+        self.leitores = max(1, leitores)
+        self.sessoes = max(1, sessoes)
+        # Com tamanho_lote 0 cada turma vai sozinha para o gravador (uma por vez)
+        self.tamanho_lote = max(1, importer.tamanho_lote)
+        self.filas = [queue.Queue(maxsize=max(1, profundidade_fila)) for _ in range(self.sessoes)]
+        self.estatisticas_sessoes = [
+            {"lotes": 0, "tempo_banco": 0.0, "falhas": []} for _ in range(self.sessoes)
+        ]
+
+    def executar(self, arquivos):
+        """Importa todos os arquivos e devolve as estatísticas da execução."""
+        inicio = time.perf_counter()
+        estatisticas = {
+            "arquivos": 0,
+            "arquivos_inalterados": 0,
+            "turmas": 0,
+            "turmas_inalteradas": 0,
+            "turmas_removidas": 0,
+            "tempo_leitura": 0.0,
+            "tempo_bloqueado": 0.0,
+        }
+
+        gravadores = [
+            threading.Thread(target=self._gravar, args=(i,), name=f"gravador-{i}", daemon=True)
+            for i in range(self.sessoes)
+        ]
+        for gravador in gravadores:
+            gravador.start()
+
+        buffers = {}
+        try:
+            for resultado in self._ler_arquivos(arquivos):
+                estatisticas["arquivos"] += 1
+                estatisticas["tempo_leitura"] += resultado["tempo"]
+                # A leitura roda nos processos leitores: o tempo medido lá entra no relatório aqui
+                instrumentation.run.record("read", resultado["tempo"])
+                instrumentation.count("files")
+
+                for consulta, turmas in self._classificar(resultado, estatisticas):
+                    estatisticas["turmas"] += len(turmas)
+                    for turma in turmas:
+                        destino = (_particao(turma, self.sessoes), consulta)
+                        buffer = buffers.setdefault(destino, [])
+                        buffer.append(turma)
+                        if len(buffer) >= self.tamanho_lote:
+                            estatisticas["tempo_bloqueado"] += self._enfileirar(destino, buffer)
+                            buffers[destino] = []
+
+            for destino, buffer in buffers.items():
+                if buffer:
+                    estatisticas["tempo_bloqueado"] += self._enfileirar(destino, buffer)
+        finally:
+            for fila in self.filas:
+                fila.put(None)
+            for gravador in gravadores:
+                gravador.join()
+
+        estatisticas["lotes"] = sum(e["lotes"] for e in self.estatisticas_sessoes)
+        estatisticas["tempo_banco"] = sum(e["tempo_banco"] for e in self.estatisticas_sessoes)
+        estatisticas["falhas"] = [f for e in self.estatisticas_sessoes for f in e["falhas"]]
+        if self.importer.perfil:
+            estatisticas["db_hits"] = sum(lote["db_hits"] or 0 for lote in self.importer.lotes)
+
+        if self.manifesto is not None:
+            self._sincronizar_manifesto(estatisticas)
+
+        estatisticas["tempo_total"] = time.perf_counter() - inicio
+        return estatisticas
+
+    def _classificar(self, resultado, estatisticas):
+        """Decide quais turmas do arquivo vão para o banco e com qual consulta."""
+        if self.manifesto is None:
+            return [("completa", resultado["turmas"])]
+
+        nome = resultado["arquivo"]
+        if resultado["inalterado"] or (resultado["erro"] and nome in self.manifesto.arquivos):
+            # Um arquivo ilegível mantém as turmas da última importação, em
+            # vez de fazer todas parecerem removidas.
+            estatisticas["arquivos_inalterados"] += resultado["inalterado"]
+            self.manifesto.registrar_inalterado(nome)
+            return []
+        if resultado["erro"]:
+            return []
+
+        completas, parciais = self.manifesto.comparar(
+            nome, resultado["hash"], resultado["turmas"], resultado["assinaturas"]
+        )
+        estatisticas["turmas_inalteradas"] += len(resultado["turmas"]) - len(completas) - len(parciais)
+        return [("completa", completas), ("parcial", parciais)]
+
+    def _sincronizar_manifesto(self, estatisticas):
+        """Remove as turmas que sumiram e grava o manifesto atualizado."""
+        removidas = self.manifesto.removidas()
+        if removidas:
+            inicio = time.perf_counter()
+            falhas_remocao = self.importer.remover_turmas(removidas)
+            estatisticas["tempo_banco"] += time.perf_counter() - inicio
+            estatisticas["falhas"].extend(falhas_remocao)
+            estatisticas["turmas_removidas"] = len(removidas) - len(falhas_remocao)
 
-        print(f"  Importação do arquivo concluída.")
+        self.manifesto.confirmar(
+            [falha["shortname"] for falha in estatisticas["falhas"]],
+            [chave["shortname"] for chave in removidas],
+        )
+        self.manifesto.salvar()
+
+    def _ler_arquivos(self, arquivos):
+        """
+        Lê os arquivos no pool de processos, mantendo no máximo dois arquivos
+        em andamento por leitor para não acumular dados na memória.
+        """
+        pendentes_max = 2 * self.leitores
+        arquivos = iter(arquivos)
+        with ProcessPoolExecutor(max_workers=self.leitores) as pool:
+            em_andamento = set()
+            while True:
+                for file_path in arquivos:
+                    hash_anterior = None
+                    if self.manifesto is not None:
+                        hash_anterior = self.manifesto.hash_arquivo(os.path.basename(file_path))
+                    em_andamento.add(pool.submit(
+                        _ler_arquivo, file_path, hash_anterior, self.manifesto is not None
+                    ))
+                    if len(em_andamento) >= pendentes_max:
+                        break
+
+                if not em_andamento:
+                    return
+
+                prontos, em_andamento = wait(em_andamento, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    yield futuro.result()
+
+    def _enfileirar(self, destino, lote):
+        particao, consulta = destino
+        inicio = time.perf_counter()
+        self.filas[particao].put((consulta, lote))
+        return time.perf_counter() - inicio
+
+    def _gravar(self, indice):
+        fila = self.filas[indice]
+        estatisticas = self.estatisticas_sessoes[indice]
+
+        with self.importer.driver.session() as session:
+            while True:
+                item = fila.get()
+                if item is None:
+                    return
+
+                consulta, lote = item
+                inicio = time.perf_counter()
+                try:
+                    estatisticas["falhas"].extend(self.importer._importar_linhas(session, lote, consulta))
+                except Exception as e:
+                    # Erros de conexão não podem derrubar o gravador, senão a
+                    # fila enche e o pipeline trava esperando por ele.
+                    estatisticas["falhas"].extend(_falha(turma, str(e)) for turma in lote)
+                estatisticas["tempo_banco"] += time.perf_counter() - inicio
+                estatisticas["lotes"] += 1
+
+
+def imprimir_estatisticas(estatisticas):
+    tempo_total = estatisticas["tempo_total"] or 1e-9
+    falhas = estatisticas["falhas"]
+
+    print("=" * 40)
+    for falha in falhas:
+        print(f"  [FALHA] Turma '{falha['shortname']}': {falha['motivo']}")
+
+    importadas = estatisticas["turmas"] - len(falhas)
+    print(f"Turmas importadas: {importadas}/{estatisticas['turmas']} ({len(falhas)} falhas) "
+          f"em {estatisticas['arquivos']} arquivos e {estatisticas['lotes']} lotes.")
+    if estatisticas["arquivos_inalterados"] or estatisticas["turmas_inalteradas"] or estatisticas["turmas_removidas"]:
+        print(f"Sem alterações: {estatisticas['arquivos_inalterados']} arquivos e "
+              f"{estatisticas['turmas_inalteradas']} turmas. "
+              f"Turmas removidas: {estatisticas['turmas_removidas']}.")
+    print(f"Tempo total: {tempo_total:.2f}s "
+          f"({estatisticas['arquivos'] / tempo_total:.1f} arquivos/s, "
+          f"{estatisticas['turmas'] / tempo_total:.1f} turmas/s)")
+    print(f"Tempo lendo arquivos (soma dos leitores): {estatisticas['tempo_leitura']:.2f}s")
+    print(f"Tempo gravando no banco (soma das sessões): {estatisticas['tempo_banco']:.2f}s")
+    print(f"Tempo com a leitura esperando o banco: {estatisticas['tempo_bloqueado']:.2f}s")
+    if estatisticas.get("db_hits") is not None:
+        print(f"DB hits (PROFILE): {estatisticas['db_hits']} "
+              f"({estatisticas['db_hits'] / max(estatisticas['turmas'], 1):.1f} por turma)")
+
+
+def preparar_importacao(importer, sem_esquema=False, permitir_varredura=False):
+    """Cria o esquema e confere os planos das consultas; devolve False se a importação não deve começar."""
+    if not sem_esquema and not importer.garantir_esquema():
+        return False
+
+    varreduras = importer.verificar_planos()
+    for varredura in varreduras:
+        log.warning("Consulta '%s' usa %s (%s): cada linha do lote vai ler todos os nós do rótulo.",
+                    varredura["consulta"], varredura["operador"], varredura["detalhes"])
+    if varreduras and not permitir_varredura:
+        log.error("Importação cancelada: crie os índices (sem --sem-esquema) ou use --permitir-varredura.")
+        return False
+    return True
+
+
+def listar_arquivos(pasta):
+    """Arquivos de turmas da pasta, ignorando o manifesto e os temporários (que começam com ponto)."""
+    return [
+        os.path.join(pasta, filename)
+        for filename in sorted(os.listdir(pasta))
+        if filename.endswith(".json") and not filename.startswith(".")
+    ]
+
+
+def importar_alterados(importer, pasta, alterados, caminho_manifesto=None, **opcoes):
+    """
+    Importa só os arquivos `alterados` da pasta (caminhos novos, modificados
+    ou apagados). Os demais arquivos conhecidos pelo manifesto entram como
+    inalterados sem serem lidos, então só as turmas dos arquivos apagados,
+    ou que sumiram dos alterados, são removidas do banco.
+
+    O manifesto é relido a cada chamada: ele acumula as turmas vistas na
+    execução, e um processo de longa duração não pode reaproveitá-lo.
+    """
+    manifesto = ManifestoTurmas.carregar(caminho_manifesto or os.path.join(pasta, ".manifesto_turmas.json"))
+    nomes_alterados = {os.path.basename(caminho) for caminho in alterados}
+    for nome in list(manifesto.arquivos):
+        if nome not in nomes_alterados and os.path.exists(os.path.join(pasta, nome)):
+            manifesto.registrar_inalterado(nome)
+
+    arquivos = [os.path.join(pasta, nome) for nome in sorted(nomes_alterados)
+                if os.path.exists(os.path.join(pasta, nome))]
+    opcoes.setdefault("leitores", max(1, min(NUM_LEITORES, len(arquivos))))
+    pipeline = ImportacaoParalela(importer, manifesto=manifesto, **opcoes)
+    return pipeline.executar(arquivos)
 
 
 def main():
-    importer = Neo4jImporter(URI)
+    parser = argparse.ArgumentParser(description="Importa as turmas para o Neo4j.")
+    parser.add_argument("--pasta", default=PASTA_DADOS, help="Pasta com os arquivos turmas_curso_*.json")
+    parser.add_argument("--leitores", type=int, default=NUM_LEITORES, help="Processos lendo os arquivos")
+    parser.add_argument("--sessoes", type=int, default=NUM_SESSOES, help="Sessões gravando no Neo4j")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE,
+                        help="Turmas por transação (0 grava uma turma por vez, sem UNWIND)")
+    parser.add_argument("--manifesto", default=MANIFESTO,
+                        help="Manifesto da importação incremental (padrão: <pasta>/.manifesto_turmas.json)")
+    parser.add_argument("--completo", action="store_true",
+                        help="Reenvia todas as turmas, ignorando o que o manifesto registra como importado")
+    parser.add_argument("--sem-manifesto", action="store_true",
+                        help="Importa tudo sem ler nem gravar o manifesto")
+    parser.add_argument("--perfil", action="store_true", default=PERFIL_LOTES,
+                        help="Executa cada lote com PROFILE e mostra os db hits")
+    parser.add_argument("--sem-esquema", action="store_true",
+                        help="Não cria os índices/restrições antes de importar")
+    parser.add_argument("--permitir-varredura", action="store_true",
+                        help="Importa mesmo que o plano de alguma consulta varra um rótulo inteiro")
+    instrumentation.add_cli_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    importer = Neo4jImporter(URI, tamanho_lote=args.lote, perfil=args.perfil)
     if importer.driver is None:
         return
 
-    if not os.path.isdir(PASTA_DADOS):
-        print(f"Erro: A pasta '{PASTA_DADOS}' não foi encontrada.")
+    if not preparar_importacao(importer, args.sem_esquema, args.permitir_varredura):
+        importer.close()
+        return
+
+    if not os.path.isdir(args.pasta):
+        log.error("A pasta '%s' não foi encontrada.", args.pasta)
         importer.close()
         return
 
-    for filename in os.listdir(PASTA_DADOS):
-        if filename.endswith(".json"):
-            file_path = os.path.join(PASTA_DADOS, filename)
-            importer.processar_arquivo(file_path)
+    arquivos = listar_arquivos(args.pasta)
+
+    manifesto = None
+    if not args.sem_manifesto:
+        caminho_manifesto = args.manifesto or os.path.join(args.pasta, ".manifesto_turmas.json")
+        manifesto = ManifestoTurmas.carregar(caminho_manifesto, completo=args.completo)
+
+    pipeline = ImportacaoParalela(importer, leitores=args.leitores, sessoes=args.sessoes,
+                                  manifesto=manifesto)
+    with instrumentation.span("import"):
+        estatisticas = pipeline.executar(arquivos)
+    instrumentation.count("turmas", estatisticas["turmas"])
+    instrumentation.count("falhas", len(estatisticas["falhas"]))
+    imprimir_estatisticas(estatisticas)
 
     importer.close()
 
@@ -0,0 +1,283 @@
+import os
+import csv
+import json
+import argparse
+import time
+
+from atualizar_turmas import PASTA_DADOS, carregar_turmas
+from manifesto_turmas import CAMPOS_CHAVE
+
+# Currículos lidos pelo processador Kotlin (src/main/resources)
+PASTA_CURRICULOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "resources")
+
+PASTA_SAIDA = os.getenv("IMPORTACAO_SAIDA", "importacao_neo4j")
+
+# Mesma separação de pré-requisitos do BachelorDegreeCurriculumHandler
+SEPARADORES_PREREQUISITO = (" e ", " ou ", " E ", " OU ")
+
+DELIMITADOR_ARRAY = ";"
+
+
+def separar_prerequisitos(texto):
+    """Divide o campo prerequisito exatamente como o processador Kotlin faz."""
+    partes = [texto or ""]
+    for separador in SEPARADORES_PREREQUISITO:
+        partes = [pedaco for parte in partes for pedaco in parte.split(separador)]
+    return [parte.strip() for parte in partes if parte.strip()]
+
+
+def tipo_csv(valores):
+    """Tipo da coluna no cabeçalho do neo4j-admin import para os valores de uma propriedade."""
+    tipos = set()
+    for valor in valores:
+        if isinstance(valor, bool):
+            tipos.add("boolean")
+        elif isinstance(valor, int):
+            tipos.add("long")
+        elif isinstance(valor, float):
+            tipos.add("double")
+        elif isinstance(valor, list):
+            if not valor:
+                continue
+            internos = {tipo_csv([item]) for item in valor}
+            tipos.add(f"{internos.pop()}[]" if len(internos) == 1 else "string[]")
+        else:
+            tipos.add("string")
+    if tipos == {"long", "double"}:
+        return "double"
+    return tipos.pop() if len(tipos) == 1 else "string"
+
+
+def valor_csv(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    if isinstance(valor, list):
+        return DELIMITADOR_ARRAY.join(str(valor_csv(item)) for item in valor)
+    return valor
+
+
+class GrafoImportacao:
+    """
+    O grafo que o processador Kotlin e o atualizar_turmas.py montam no
+    Neo4j, calculado em memória para ser gravado como CSVs do
+    `neo4j-admin import`.
+
+    Cada nó e cada relação aparece uma vez só, com a mesma regra que os
+    MERGE aplicariam: o Course fica com as propriedades do último currículo
+    lido, o Curriculum com o nome do primeiro e a Class com a união das
+    propriedades de todos os arquivos em que aparece. Referências que o
+    MATCH da importação online descartaria em silêncio (pré-requisitos e
+    turmas de disciplinas que não existem) ficam registradas em `pendencias`.
+    """
+
+    def __init__(self):
+        self.curriculos = {}
+        self.cursos = {}
+        self.parte_de = set()
+        self.prerequisitos = set()
+        self.turmas = {}
+        self.erros = []
+        self.pendencias = {"prerequisitos": [], "turmas": []}
+
+    def adicionar_curriculos(self, file_path):
+        """Lê um JSON de currículos; um arquivo inválido não entra pela metade, como na transação do Kotlin."""
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            codigo_curso = int(data["codigo"])
+            nome_curso = data["nome"]
+
+            curriculos, cursos, parte_de, prerequisitos = {}, {}, set(), set()
+            for curriculo_id, curriculo in (data.get("curriculos") or {}).items():
+                ucs = curriculo.get("ucs")
+                if not isinstance(ucs, dict) or not ucs:
+                    continue
+                chave_curriculo = (curriculo_id, codigo_curso)
+                curriculos.setdefault(chave_curriculo, nome_curso)
+                for uc_id, uc in ucs.items():
+                    course_id = uc.get("codigo") or ""
+                    cursos[course_id] = {
+                        "name": uc.get("nome") or "",
+                        "description": uc.get("ementa") or "",
+                        "workloadHours": int(uc.get("carga_horaria") or 0),
+                        "suggestedSemester": int(uc.get("fase_sugestao") or 0),
+                        "etiqueta": '"1"' in json.dumps(uc.get("etiquetas"), ensure_ascii=False, separators=(",", ":")),
+                    }
+                    parte_de.add((course_id, chave_curriculo))
+                    for prerequisito in separar_prerequisitos(uc.get("prerequisito")):
+                        prerequisitos.add((prerequisito, uc_id, curriculo_id, codigo_curso))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.erros.append({"arquivo": os.path.basename(file_path), "motivo": str(e)})
+            return
+
+        for chave, nome in curriculos.items():
+            self.curriculos.setdefault(chave, nome)
+        self.cursos.update(cursos)
+        self.parte_de |= parte_de
+        self.prerequisitos |= prerequisitos
+
+    def adicionar_turmas(self, file_path):
+        turmas = carregar_turmas(file_path)
+        if turmas is None:
+            self.erros.append({"arquivo": os.path.basename(file_path), "motivo": "JSON inválido"})
+            return
+        for turma in turmas:
+            chave = tuple(turma[campo] for campo in CAMPOS_CHAVE)
+            self.turmas.setdefault(chave, {}).update(turma)
+
+    def validar(self):
+        """
+        Separa as referências sem destino antes da gravação: pré-requisitos
+        para disciplinas que nenhum currículo define e turmas cujo
+        codigo_disciplina não é um Course. Devolve as pendências.
+        """
+        validos = set()
+        for relacao in self.prerequisitos:
+            if relacao[0] in self.cursos and relacao[1] in self.cursos:
+                validos.add(relacao)
+            else:
+                self.pendencias["prerequisitos"].append({
+                    "de": relacao[0], "para": relacao[1], "curriculo": relacao[2], "curso": relacao[3],
+                })
+        self.prerequisitos = validos
+
+        for chave in [chave for chave, turma in self.turmas.items() if turma["codigo_disciplina"] not in self.cursos]:
+            turma = self.turmas.pop(chave)
+            self.pendencias["turmas"].append({
+                "shortname": turma.get("shortname"),
+                "codigo_disciplina": turma["codigo_disciplina"],
+                "motivo": f"Curso com courseId='{turma['codigo_disciplina']}' não existe.",
+            })
+        return self.pendencias
+
+    def exportar(self, pasta):
+        """Grava os CSVs (com cabeçalho na primeira linha) e devolve {nome: (arquivo, linhas)}."""
+        os.makedirs(pasta, exist_ok=True)
+        arquivos = {}
+
+        def gravar(nome, cabecalho, linhas):
+            caminho = os.path.join(pasta, f"{nome}.csv")
+            total = 0
+            with open(caminho, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(cabecalho)
+                for linha in linhas:
+                    writer.writerow([valor_csv(valor) for valor in linha])
+                    total += 1
+            arquivos[nome] = (caminho, total)
+
+        gravar("curriculum", [":ID(Curriculum)", "id", "courseCode:long", "courseName"],
+               ([f"{codigo}:{curriculo_id}", curriculo_id, codigo, nome]
+                for (curriculo_id, codigo), nome in sorted(self.curriculos.items())))
+
+        gravar("course", ["courseId:ID(Course)", "name", "description", "workloadHours:long",
+                          "suggestedSemester:long", "etiqueta:boolean"],
+               ([course_id, c["name"], c["description"], c["workloadHours"], c["suggestedSemester"], c["etiqueta"]]
+                for course_id, c in sorted(self.cursos.items())))
+
+        propriedades = sorted({campo for turma in self.turmas.values() for campo in turma})
+        tipos = {campo: tipo_csv([t[campo] for t in self.turmas.values() if t.get(campo) is not None])
+                 for campo in propriedades}
+        gravar("class", [":ID(Class)"] + [f"{campo}:{tipos[campo]}" for campo in propriedades],
+               ([_id_turma(chave)] + [turma.get(campo) for campo in propriedades]
+                for chave, turma in sorted(self.turmas.items())))
+
+        gravar("part_of", [":START_ID(Course)", ":END_ID(Curriculum)"],
+               ([course_id, f"{codigo}:{curriculo_id}"]
+                for course_id, (curriculo_id, codigo) in sorted(self.parte_de)))
+
+        gravar("is_prerequisite_for", [":START_ID(Course)", ":END_ID(Course)", "curriculumId", "courseCode:long"],
+               sorted(self.prerequisitos))
+
+        gravar("offers", [":START_ID(Course)", ":END_ID(Class)"],
+               ([turma["codigo_disciplina"], _id_turma(chave)] for chave, turma in sorted(self.turmas.items())))
+        return arquivos
+
+
+def _id_turma(chave):
+    return "|".join(str(parte) for parte in chave)
+
+
+def comando_importacao(arquivos, database="neo4j", prefixo=None):
+    """
+    Linha de comando do neo4j-admin (4.4) para carregar os CSVs em um banco
+    vazio. `prefixo` é a pasta dos CSVs vista de onde o comando roda.
+    """
+    def caminho(nome):
+        arquivo = arquivos[nome][0]
+        return os.path.join(prefixo, os.path.basename(arquivo)) if prefixo else arquivo
+
+    nos = {"Curriculum": "curriculum", "Course": "course", "Class": "class"}
+    relacoes = {"PART_OF": "part_of", "IS_PREREQUISITE_FOR": "is_prerequisite_for", "OFFERS": "offers"}
+    partes = ["neo4j-admin import", f"--database={database}", "--multiline-fields=true",
+              f"--array-delimiter='{DELIMITADOR_ARRAY}'"]
+    partes += [f"--nodes={rotulo}={caminho(nome)}" for rotulo, nome in nos.items()]
+    partes += [f"--relationships={tipo}={caminho(nome)}" for tipo, nome in relacoes.items()]
+    return " \\\n    ".join(partes)
+
+
+def listar_json(pasta, recursivo=False):
+    if recursivo:
+        return sorted(os.path.join(raiz, nome) for raiz, _, nomes in os.walk(pasta)
+                      for nome in nomes if nome.endswith(".json"))
+    return [os.path.join(pasta, nome) for nome in sorted(os.listdir(pasta))
+            if nome.endswith(".json") and not nome.startswith(".")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Gera os CSVs do neo4j-admin import com currículos, disciplinas e turmas.")
+    parser.add_argument("--curriculos", default=PASTA_CURRICULOS, help="Pasta com os JSONs de currículos")
+    parser.add_argument("--pasta", default=PASTA_DADOS, help="Pasta com os arquivos turmas_curso_*.json")
+    parser.add_argument("--saida", default=PASTA_SAIDA, help="Pasta onde gravar os CSVs")
+    parser.add_argument("--database", default="neo4j", help="Banco usado no comando sugerido")
+    parser.add_argument("--prefixo", help="Pasta dos CSVs vista pelo neo4j-admin (padrão: --saida)")
+    parser.add_argument("--estrito", action="store_true",
+                        help="Não grava os CSVs se houver referências sem destino")
+    args = parser.parse_args()
+
+    for pasta in (args.curriculos, args.pasta):
+        if not os.path.isdir(pasta):
+            print(f"Erro: A pasta '{pasta}' não foi encontrada.")
+            return
+
+    inicio = time.perf_counter()
+    grafo = GrafoImportacao()
+    for file_path in listar_json(args.curriculos, recursivo=True):
+        grafo.adicionar_curriculos(file_path)
+    for file_path in listar_json(args.pasta):
+        grafo.adicionar_turmas(file_path)
+    pendencias = grafo.validar()
+
+    print("=" * 40)
+    for erro in grafo.erros:
+        print(f"  [ERRO] {erro['arquivo']}: {erro['motivo']}")
+    for falha in pendencias["turmas"]:
+        print(f"  [PENDENTE] Turma '{falha['shortname']}': {falha['motivo']}")
+    # O split do Kotlin não trata parênteses, então "(A e B) ou C" gera os códigos "(A" e "B)"
+    ausentes = sorted({p["de"] for p in pendencias["prerequisitos"]})
+    malformados = [codigo for codigo in ausentes if "(" in codigo or ")" in codigo]
+    inexistentes = [codigo for codigo in ausentes if codigo not in malformados]
+    for descricao, codigos in (("códigos com parênteses", malformados), ("códigos sem Course", inexistentes)):
+        if codigos:
+            print(f"  [PENDENTE] Pré-requisitos com {len(codigos)} {descricao}: {', '.join(codigos[:15])}"
+                  f"{' ...' if len(codigos) > 15 else ''}")
+    print(f"Pendências: {len(pendencias['turmas'])} turmas e {len(pendencias['prerequisitos'])} pré-requisitos "
+          f"ficam fora do grafo, como na importação online.")
+
+    if args.estrito and (grafo.erros or pendencias["turmas"] or pendencias["prerequisitos"]):
+        print("Exportação cancelada (--estrito).")
+        raise SystemExit(1)
+
+    arquivos = grafo.exportar(args.saida)
+    for nome, (caminho, linhas) in arquivos.items():
+        print(f"{nome}: {linhas} linhas -> {caminho}")
+    print(f"Tempo total: {time.perf_counter() - inicio:.2f}s")
+    print("Com o Neo4j parado e o banco vazio:")
+    print(comando_importacao(arquivos, args.database, args.prefixo))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import argparse
+import time
+
+import numpy as np
+
+from atualizar_turmas import PASTA_DADOS, carregar_turmas
+
+BITS_POR_PALAVRA = 64
+
+# Linhas da matriz de conflitos calculadas de uma vez. Cada bloco ocupa
+# bloco * turmas * palavras * 8 bytes (cerca de 30 MB para 7 mil turmas).
+TAMANHO_BLOCO = 256
+
+
+def mascara_de_slots(slots, palavras):
+    """Codifica uma lista de sequenciais de horário em `palavras` inteiros de 64 bits."""
+    mascara = np.zeros(palavras, dtype=np.uint64)
+    for slot in slots:
+        slot = int(slot)
+        mascara[slot // BITS_POR_PALAVRA] |= np.uint64(1) << np.uint64(slot % BITS_POR_PALAVRA)
+    return mascara
+
+
+class GradeHorarios:
+    """
+    Horários de todas as turmas de um período em forma de bitmask.
+
+    Cada turma ocupa uma linha de `mascaras` (uint64, largura fixa em
+    `palavras`), com o bit `s` ligado para cada sequencial de horário
+    ocupado. Dois horários conflitam quando o AND das máscaras não é zero.
+    A matriz turma x turma com o resultado desse AND é pré-calculada e
+    guardada com um bit por par (`np.packbits`), então consultar um
+    conflito é só ler um bit.
+    """
+
+    def __init__(self, periodo, shortnames, disciplinas, mascaras, conflitos=None):
+        self.periodo = periodo
+        self.shortnames = list(shortnames)
+        self.disciplinas = list(disciplinas)
+        self.mascaras = mascaras
+        self.indices = {shortname: i for i, shortname in enumerate(self.shortnames)}
+        self.conflitos = conflitos if conflitos is not None else self._calcular_conflitos()
+
+    @classmethod
+    def construir(cls, periodo, turmas):
+        """Monta a grade a partir das turmas normalizadas (carregar_turmas) de um período."""
+        turmas = sorted(turmas, key=lambda turma: turma["shortname"])
+        maior_slot = max((slot for turma in turmas for slot in turma["sequenciais_horas_ocupadas"]), default=0)
+        palavras = maior_slot // BITS_POR_PALAVRA + 1
+
+        mascaras = np.zeros((len(turmas), palavras), dtype=np.uint64)
+        for i, turma in enumerate(turmas):
+            mascaras[i] = mascara_de_slots(turma["sequenciais_horas_ocupadas"], palavras)
+
+        return cls(periodo, [t["shortname"] for t in turmas], [t["codigo_disciplina"] for t in turmas], mascaras)
+
+    def _calcular_conflitos(self):
+        total = len(self.shortnames)
+        conflitos = np.zeros((total, (total + 7) // 8), dtype=np.uint8)
+        for inicio in range(0, total, TAMANHO_BLOCO):
+            bloco = self.mascaras[inicio:inicio + TAMANHO_BLOCO]
+            sobreposicao = (bloco[:, None, :] & self.mascaras[None, :, :]).any(axis=2)
+            conflitos[inicio:inicio + len(bloco)] = np.packbits(sobreposicao, axis=1)
+        return conflitos
+
+    def __len__(self):
+        return len(self.shortnames)
+
+    @property
+    def palavras(self):
+        return self.mascaras.shape[1]
+
+    def mascara(self, turma):
+        """Máscara de uma turma (índice ou shortname) como um único inteiro Python."""
+        i = self._indice(turma)
+        return sum(int(palavra) << (BITS_POR_PALAVRA * n) for n, palavra in enumerate(self.mascaras[i]))
+
+    def conflitam(self, turma_a, turma_b):
+        i, j = self._indice(turma_a), self._indice(turma_b)
+        return bool(self.conflitos[i, j >> 3] & (0x80 >> (j & 7)))
+
+    def conflitos_de(self, turma):
+        """Vetor booleano com as turmas que conflitam com `turma` (inclusive ela mesma, se tiver horário)."""
+        return np.unpackbits(self.conflitos[self._indice(turma)], count=len(self)).astype(bool)
+
+    def compativeis(self, mascara):
+        """Vetor booleano com as turmas que não ocupam nenhum horário de `mascara`."""
+        return ~(self.mascaras & mascara).any(axis=1)
+
+    def _indice(self, turma):
+        return self.indices[turma] if isinstance(turma, str) else turma
+
+    def salvar(self, caminho):
+        np.savez_compressed(
+            caminho,
+            periodo=np.array(self.periodo),
+            shortnames=np.array(self.shortnames),
+            disciplinas=np.array(self.disciplinas),
+            mascaras=self.mascaras,
+            conflitos=self.conflitos,
+        )
+
+    @classmethod
+    def carregar(cls, caminho):
+        with np.load(caminho) as dados:
+            return cls(int(dados["periodo"]), dados["shortnames"].tolist(), dados["disciplinas"].tolist(),
+                       dados["mascaras"], dados["conflitos"])
+
+
+def construir_grades(arquivos):
+    """Lê os arquivos de turmas e devolve uma GradeHorarios por período."""
+    por_periodo = {}
+    for file_path in arquivos:
+        for turma in carregar_turmas(file_path) or []:
+            # Uma turma repetida em mais de um arquivo entra uma vez só
+            por_periodo.setdefault(turma["periodo"], {})[turma["shortname"]] = turma
+
+    return {periodo: GradeHorarios.construir(periodo, turmas.values())
+            for periodo, turmas in sorted(por_periodo.items())}
+
+
+def caminho_grade(pasta, periodo):
+    return os.path.join(pasta, f".horarios_{periodo}.npz")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-calcula as máscaras de horário e os conflitos entre turmas.")
+    parser.add_argument("--pasta", default=PASTA_DADOS, help="Pasta com os arquivos turmas_curso_*.json")
+    parser.add_argument("--saida", help="Pasta onde gravar as grades (padrão: a própria --pasta)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pasta):
+        print(f"Erro: A pasta '{args.pasta}' não foi encontrada.")
+        return
+
+    arquivos = [
+        os.path.join(args.pasta, filename)
+        for filename in sorted(os.listdir(args.pasta))
+        if filename.endswith(".json") and not filename.startswith(".")
+    ]
+
+    inicio = time.perf_counter()
+    grades = construir_grades(arquivos)
+    saida = args.saida or args.pasta
+    os.makedirs(saida, exist_ok=True)
+    for periodo, grade in grades.items():
+        caminho = caminho_grade(saida, periodo)
+        grade.salvar(caminho)
+        pares = int(np.unpackbits(grade.conflitos).sum())
+        print(f"Período {periodo}: {len(grade)} turmas, {grade.palavras} palavras de 64 bits por turma, "
+              f"{pares} pares em conflito -> {caminho}")
+    print(f"Tempo total: {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import tempfile
+import zlib
+
+import instrumentation
+
+log = instrumentation.get_logger("manifesto_turmas")
+
+# Propriedades que identificam uma turma no banco (chave do MERGE).
+CAMPOS_CHAVE = ("codigo_disciplina", "codigo_turma", "periodo")
+
+
+def hash_conteudo(conteudo):
+    """Hash do conteúdo bruto de um arquivo de turmas."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def assinatura_turma(turma):
+    """
+    Calcula o hash da turma inteira e um hash curto por propriedade, usado
+    para descobrir quais campos mudaram desde a última importação.
+    """
+    campos = {
+        campo: zlib.crc32(json.dumps(valor, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        for campo, valor in turma.items()
+    }
+    hash_turma = hashlib.blake2b(
+        json.dumps(sorted(campos.items())).encode("utf-8"), digest_size=8
+    ).hexdigest()
+    return {"hash": hash_turma, "campos": campos}
+
+
+class ManifestoTurmas:
+    """
+    Registro persistente do que já foi importado: o hash de cada arquivo de
+    turmas e a assinatura de cada turma (por shortname).
+
+    A comparação com o manifesto decide o que precisa ir para o banco:
+    arquivos com o mesmo hash são ignorados, turmas novas são enviadas por
+    inteiro, turmas alteradas enviam só as propriedades que mudaram e turmas
+    que sumiram de um período são removidas. As mudanças só passam a valer
+    no manifesto depois de confirmadas com `confirmar`, para que linhas que
+    falharam sejam reenviadas na próxima execução.
+    """
+
+    VERSAO = 1
+
+    def __init__(self, caminho, completo=False):
+        self.caminho = caminho
+        self.completo = completo
+        self.arquivos = {}
+        self.turmas = {}
+
+        self._arquivos_pendentes = {}
+        self._turmas_pendentes = {}
+        self._vistas = set()
+        self._periodos = set()
+
+    @classmethod
+    def carregar(cls, caminho, completo=False):
+        manifesto = cls(caminho, completo=completo)
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return manifesto
+        except json.JSONDecodeError as e:
+            log.warning("Manifesto '%s' inválido, será recriado: %s", caminho, e)
+            return manifesto
+
+        if data.get("versao") == cls.VERSAO:
+            manifesto.arquivos = data.get("arquivos", {})
+            manifesto.turmas = data.get("turmas", {})
+        return manifesto
+
+    def hash_arquivo(self, nome):
+        """Hash registrado para o arquivo, ou None se ele deve ser relido."""
+        if self.completo:
+            return None
+        return self.arquivos.get(nome, {}).get("hash")
+
+    def registrar_inalterado(self, nome):
+        """Marca como presentes as turmas de um arquivo que não mudou."""
+        registro = self.arquivos[nome]
+        for shortname in registro.get("turmas", []):
+            self._marcar_vista(shortname, self.turmas.get(shortname, {}).get("chave"))
+        self._arquivos_pendentes[nome] = registro
+
+    def comparar(self, nome, hash_arquivo, turmas, assinaturas):
+        """
+        Compara as turmas de um arquivo alterado com o manifesto e devolve
+        duas listas: turmas completas (novas) e atualizações parciais
+        (chave + propriedades alteradas).
+        """
+        completas = []
+        parciais = []
+
+        for turma, assinatura in zip(turmas, assinaturas):
+            shortname = turma.get("shortname")
+            chave = {campo: turma.get(campo) for campo in CAMPOS_CHAVE}
+            self._marcar_vista(shortname, chave)
+
+            anterior = self.turmas.get(shortname)
+            self._turmas_pendentes[shortname] = {"chave": chave, **assinatura}
+
+            if self.completo or anterior is None or anterior.get("chave") != chave:
+                completas.append(turma)
+                continue
+
+            if anterior["hash"] == assinatura["hash"]:
+                continue
+
+            campos_anteriores = anterior.get("campos", {})
+            alterados = {
+                campo: turma[campo]
+                for campo, valor in assinatura["campos"].items()
+                if campos_anteriores.get(campo) != valor
+            }
+            # Propriedades que deixaram de existir são apagadas com SET += {campo: null}
+            alterados.update({
+                campo: None for campo in campos_anteriores if campo not in assinatura["campos"]
+            })
+            parciais.append({"shortname": shortname, **chave, **alterados})
+
+        self._arquivos_pendentes[nome] = {
+            "hash": hash_arquivo,
+            "turmas": [turma.get("shortname") for turma in turmas],
+        }
+        return completas, parciais
+
+    def removidas(self):
+        """
+        Turmas do manifesto que não apareceram em nenhum arquivo desta
+        execução. Só são consideradas turmas dos períodos vistos, para que
+        importar a pasta de outro período não apague o período anterior.
+        """
+        removidas = []
+        for shortname, registro in self.turmas.items():
+            chave = registro.get("chave") or {}
+            if shortname in self._vistas or chave.get("periodo") not in self._periodos:
+                continue
+            removidas.append({"shortname": shortname, **chave})
+        return removidas
+
+    def confirmar(self, falhas, removidas):
+        """
+        Aplica ao manifesto o resultado da importação. Turmas que falharam
+        são esquecidas (voltam como novas na próxima execução) e o arquivo
+        que as contém fica sem hash, para ser relido.
+        """
+        falhas = set(falhas)
+
+        for shortname, registro in self._turmas_pendentes.items():
+            if shortname in falhas:
+                self.turmas.pop(shortname, None)
+            else:
+                self.turmas[shortname] = registro
+
+        for shortname in removidas:
+            if shortname not in falhas:
+                self.turmas.pop(shortname, None)
+
+        for nome, registro in self._arquivos_pendentes.items():
+            if any(shortname in falhas for shortname in registro["turmas"]):
+                registro = {**registro, "hash": None}
+            self.arquivos[nome] = registro
+
+        vistos = set(self._arquivos_pendentes)
+        for nome, registro in list(self.arquivos.items()):
+            if nome in vistos:
+                continue
+            if not any(shortname in self.turmas for shortname in registro.get("turmas", [])):
+                self.arquivos.pop(nome)
+
+        self._arquivos_pendentes = {}
+        self._turmas_pendentes = {}
+
+    def salvar(self):
+        """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+        pasta = os.path.dirname(os.path.abspath(self.caminho))
+        os.makedirs(pasta, exist_ok=True)
+        data = {"versao": self.VERSAO, "arquivos": self.arquivos, "turmas": self.turmas}
+
+        fd, temporario = tempfile.mkstemp(dir=pasta, prefix=".manifesto_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(temporario, self.caminho)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+
+    def _marcar_vista(self, shortname, chave):
+        self._vistas.add(shortname)
+        if chave:
+            self._periodos.add(chave.get("periodo"))
@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "main", "scripts"))
+
+from acervo_turmas import AcervoTurmas  # noqa: E402
+
+
+def turma(shortname, ocupadas):
+    return {"shortname": shortname, "codigo_disciplina": shortname[:7], "codigo_turma": "01208",
+            "periodo": 20252, "vagas_ocupadas": ocupadas}
+
+
+class AcervoInterrompidoTest(unittest.TestCase):
+    """Uma gravação interrompida no meio de uma linha não pode corromper as capturas seguintes."""
+
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        acervo = AcervoTurmas(self.raiz, 20252)
+        acervo.registrar([turma("INE5401-01208 (20252)", 10)])
+        self.capturas = acervo.caminho_capturas
+
+    def test_linha_parcial_e_descartada_antes_do_acrescimo(self):
+        with open(self.capturas, "a", encoding="utf-8") as f:
+            f.write('{"captura": 2, "data": "2025-')
+
+        acervo = AcervoTurmas(self.raiz, 20252)
+        self.assertEqual(acervo.ultima, 1)
+        delta = acervo.registrar([turma("INE5401-01208 (20252)", 12)], origem="depois da falha")
+        self.assertIsNotNone(delta)
+
+        recarregado = AcervoTurmas(self.raiz, 20252)
+        self.assertEqual(recarregado.ultima, 2)
+        self.assertEqual(recarregado.turmas()[0]["vagas_ocupadas"], 12)
+        with open(self.capturas, "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_arquivo_so_com_linha_parcial(self):
+        with open(self.capturas, "w", encoding="utf-8") as f:
+            f.write('{"captura": 1')
+
+        acervo = AcervoTurmas(self.raiz, 20252)
+        self.assertEqual(acervo.ultima, 0)
+        acervo.registrar([turma("INE5402-01208 (20252)", 3)])
+        self.assertEqual(AcervoTurmas(self.raiz, 20252).ultima, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
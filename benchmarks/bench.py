@@ -0,0 +1,452 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+GRAPH_GEN_DIR = ROOT / "graph-gen"
+SCRIPTS_DIR = ROOT / "backend/curriculum-graph-processor/src/main/scripts"
+PARSERS_DIR = ROOT / "curriculum-graph-gen/src/app/lib/parsers"
+RESOURCES_DIR = ROOT / "backend/curriculum-graph-processor/src/main/resources"
+TURMAS_DIR = ROOT / "backend/turmas_20252"
+
+RESULTS_DIR = Path(__file__).parent / "resultados"
+
+SUITES = ("grafos", "importacao", "pdf", "catalogo")
+
+# Pior variação aceita por métrica antes do gate falhar (0.10 = 10%)
+DEFAULT_THRESHOLD = 0.10
+
+# Páginas dos históricos sintéticos e linhas de disciplina por página
+PDF_SIZES = (1, 5, 20)
+PDF_LINES_PER_PAGE = 40
+
+for directory in (GRAPH_GEN_DIR, SCRIPTS_DIR, PARSERS_DIR):
+    sys.path.insert(0, str(directory))
+
+
+class Results:
+    """
+    Metrics of one run. Each metric records whether lower or higher is
+    better, so two runs can be compared without knowing what it measures.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.skipped = {}
+
+    def add(self, name: str, value: float, unit: str, better: str = "lower"):
+        self.metrics[name] = {"value": round(value, 6), "unit": unit, "better": better}
+
+    def skip(self, suite: str, reason: str):
+        self.skipped[suite] = reason
+
+    def to_dict(self) -> dict:
+        return {
+            "version": 1,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "metrics": self.metrics,
+            "skipped": self.skipped,
+        }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def median_time(function, repeat: int) -> float:
+    """Median wall time of `repeat` calls."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+# Curriculum graphs
+
+def bench_graphs(results: Results, repeat: int, render_sample: int):
+    import graphviz
+    from graph_gen import GraphGenerator, find_curricula
+
+    documents = []
+    for path in find_curricula(RESOURCES_DIR):
+        with open(path, "r", encoding="utf-8") as file:
+            documents.append(json.load(file))
+
+    generators = []
+
+    def construct():
+        generators.clear()
+        generators.extend(GraphGenerator(document) for document in documents)
+
+    def dot_source():
+        for generator in generators:
+            generator.generate_graph().source
+
+    construct_time = median_time(construct, repeat)
+    source_time = median_time(dot_source, repeat)
+    results.add("grafos.construcao_s", construct_time, "s")
+    results.add("grafos.dot_s", source_time, "s")
+    results.add("grafos.curriculos_por_s", len(documents) / (construct_time + source_time), "1/s", "higher")
+
+    if shutil.which("dot") is None:
+        results.skip("grafos.render", "executável dot (Graphviz) não encontrado")
+        return
+    # A renderização é ordens de grandeza mais lenta; usa uma amostra fixa (a cada n-ésimo currículo)
+    step = max(1, len(generators) // max(1, render_sample))
+    sources = [generator.generate_graph().source for generator in generators[::step]]
+
+    def render():
+        for source in sources:
+            graphviz.Source(source, engine="dot").pipe(format="svg")
+
+    render_time = median_time(render, repeat)
+    results.add("grafos.render_svg_s_por_curriculo", render_time / len(sources), "s")
+
+
+# Turmas import
+
+class _StandInStore:
+    """
+    In-process stand-in for the Neo4j database used by atualizar_turmas:
+    it answers the batch queries with the same semantics (MERGE on the
+    class key, rows without a Course returned, partial SET, DETACH DELETE)
+    over dictionaries. It measures the client side of the pipeline, i.e.
+    reading, batching and partitioning, without network or storage.
+    """
+
+    def __init__(self, course_ids):
+        import atualizar_turmas
+
+        self.queries = {
+            atualizar_turmas.CYPHER_QUERY_LOTE: self._complete,
+            atualizar_turmas.CYPHER_QUERY_PARCIAL: self._partial,
+            atualizar_turmas.CYPHER_QUERY_REMOVER: self._remove,
+        }
+        self.course_ids = set(course_ids)
+        self.classes = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(row):
+        return row["codigo_disciplina"], row["codigo_turma"], row["periodo"]
+
+    def _complete(self, rows):
+        missing = []
+        for props in rows:
+            if props["codigo_disciplina"] not in self.course_ids:
+                missing.append({"shortname": props.get("shortname"), "codigo_disciplina": props["codigo_disciplina"]})
+                continue
+            self.classes.setdefault(self._key(props), {}).update(props)
+        return missing
+
+    def _partial(self, rows):
+        missing = []
+        for props in rows:
+            node = self.classes.get(self._key(props))
+            if node is None:
+                missing.append({"shortname": props.get("shortname"), "codigo_disciplina": props["codigo_disciplina"]})
+            else:
+                node.update(props)
+        return missing
+
+    def _remove(self, rows):
+        for key in rows:
+            self.classes.pop(self._key(key), None)
+        return []
+
+    def run(self, query, rows):
+        query = query[len("PROFILE "):] if query.startswith("PROFILE ") else query
+        # Parameters cross a serialization boundary in the real driver
+        rows = json.loads(json.dumps(rows))
+        with self.lock:
+            return self.queries[query](rows)
+
+
+class _StandInResult:
+    def __init__(self, records):
+        self.records = records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def consume(self):
+        return _StandInSummary()
+
+
+class _StandInRecord(dict):
+    def data(self):
+        return dict(self)
+
+
+class _StandInSummary:
+    profile = None
+
+
+class _StandInSession:
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, rows=(), **kwargs):
+        return _StandInResult([_StandInRecord(r) for r in self.store.run(query, rows)])
+
+    def execute_write(self, function, *args):
+        return function(self, *args)
+
+
+class _StandInDriver:
+    def __init__(self, store):
+        self.store = store
+
+    def session(self):
+        return _StandInSession(self.store)
+
+    def close(self):
+        pass
+
+
+def bench_import(results: Results, repeat: int, neo4j_uri: str = None):
+    from atualizar_turmas import ImportacaoParalela, Neo4jImporter
+    from graph_gen import find_curricula
+
+    files = sorted(str(path) for path in TURMAS_DIR.glob("turmas_curso_*.json"))
+    if neo4j_uri:
+        label = "neo4j"
+        make_driver = lambda: None  # noqa: E731 - Neo4jImporter connects by itself
+    else:
+        label = "memoria"
+        course_ids = set()
+        for path in find_curricula(RESOURCES_DIR):
+            with open(path, "r", encoding="utf-8") as file:
+                for curriculum in (json.load(file).get("curriculos") or {}).values():
+                    if isinstance(curriculum.get("ucs"), dict):
+                        course_ids.update(curriculum["ucs"])
+        make_driver = lambda: _StandInDriver(_StandInStore(course_ids))  # noqa: E731
+
+    totals = []
+
+    def run_import():
+        importer = Neo4jImporter(neo4j_uri, driver=make_driver())
+        if importer.driver is None:
+            raise RuntimeError(f"Neo4j indisponível em {neo4j_uri}")
+        stats = ImportacaoParalela(importer, manifesto=None).executar(files)
+        totals.append(stats)
+        importer.close()
+
+    elapsed = median_time(run_import, repeat)
+    stats = totals[-1]
+    results.add(f"importacao.{label}.tempo_s", elapsed, "s")
+    results.add(f"importacao.{label}.turmas_por_s", stats["turmas"] / elapsed, "1/s", "higher")
+    results.add(f"importacao.{label}.arquivos_por_s", stats["arquivos"] / elapsed, "1/s", "higher")
+
+
+# Transcript PDFs
+
+def write_transcript_pdf(path: Path, pages: int, seed: int = 0):
+    """
+    Writes a minimal transcript-like PDF (Helvetica text only, no
+    dependencies): the header with curso/currículo/aulas on the first page
+    and PDF_LINES_PER_PAGE course lines on every page, a mix of cursadas,
+    em andamento, dispensadas and reprovadas. Same seed, same bytes.
+    """
+    rng = random.Random(seed)
+    statuses = ["{ano}/{sem} {nota}.{dec} Ob", "Cursando Ob", "Cursou Eqv Op", "Reprovado {ano}/{sem} Ob"]
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    number = 0
+    for page in range(pages):
+        lines = []
+        if page == 0:
+            lines += ["Curso: 208 - CIENCIAS DA COMPUTACAO", "Curriculo: 2019/1",
+                      "Aulas Minimas: 12  Aulas Media: 20  Aulas Maximas: 32"]
+        for _ in range(PDF_LINES_PER_PAGE):
+            number += 1
+            code = f"{chr(65 + number // 6760 % 26)}{chr(65 + number // 260 % 26)}{chr(65 + number // 10 % 26)}" \
+                   f"{number % 10000:04d}"
+            status = rng.choice(statuses).format(ano=rng.randint(2015, 2024), sem=rng.randint(1, 2),
+                                                 nota=rng.randint(0, 10), dec=rng.randint(0, 9))
+            lines.append(f"{code} Disciplina {number} {rng.choice([36, 54, 72])} {status}")
+
+        text = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            text.append(f"({escaped}) Tj T*")
+        text.append("ET")
+        stream = "\n".join(text).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for index, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % index + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    Path(path).write_bytes(bytes(output))
+
+
+def bench_pdf(results: Results, repeat: int, sizes=PDF_SIZES):
+    try:
+        import pdf_parser
+    except ImportError as e:
+        results.skip("pdf", f"pdf_parser indisponível: {e}")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in sizes:
+            path = Path(directory) / f"historico_{pages}.pdf"
+            write_transcript_pdf(path, pages, seed=pages)
+            parsed = []
+            elapsed = median_time(lambda: parsed.append(pdf_parser.parse_pdf(str(path))), repeat)
+            courses = sum(len(v) for v in parsed[-1][0].values() if isinstance(v, list))
+            if not courses:
+                raise RuntimeError(f"parse_pdf não encontrou disciplinas no PDF sintético de {pages} páginas")
+            results.add(f"pdf.{pages}_paginas_s", elapsed, "s")
+            results.add(f"pdf.{pages}_paginas_por_s", pages / elapsed, "1/s", "higher")
+
+
+# Course catalogue
+
+def bench_catalog(results: Results, repeat: int, queries: int = 10000):
+    from catalog import CourseCatalog, measure_memory
+    from graph_gen import find_curricula
+
+    documents = []
+    for path in find_curricula(RESOURCES_DIR):
+        with open(path, "r", encoding="utf-8") as file:
+            documents.append(json.load(file))
+
+    catalogs = []
+    results.add("catalogo.construcao_s", median_time(lambda: catalogs.append(CourseCatalog(documents)), repeat), "s")
+    catalog = catalogs[-1]
+
+    rng = random.Random(0)
+    codes = [rng.choice(catalog.codes) for _ in range(queries)]
+    pairs = list(zip(codes, reversed(codes)))
+
+    def lookups():
+        for code in codes:
+            catalog.placements(code)
+        for a, b in pairs:
+            catalog.equivalent(a, b)
+
+    results.add("catalogo.consultas_por_s", 2 * queries / median_time(lookups, repeat), "1/s", "higher")
+    memory = measure_memory(RESOURCES_DIR)
+    results.add("catalogo.memoria_mb", memory["catalogo_mb"], "MB")
+
+
+# Regression gate
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Metrics present in both runs, as (name, before, after, change, regressed).
+    `change` is relative and positive when the metric got worse.
+    """
+    rows = []
+    for name, metric in sorted(current["metrics"].items()):
+        before = baseline.get("metrics", {}).get(name)
+        if before is None or not before["value"]:
+            continue
+        change = (metric["value"] - before["value"]) / before["value"]
+        if metric["better"] == "higher":
+            change = -change
+        rows.append((name, before["value"], metric["value"], change, change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks das ferramentas Python sobre os dados do repositório.")
+    parser.add_argument("suites", nargs="*", default=list(SUITES),
+                        help=f"Suítes a rodar: {', '.join(SUITES)} (padrão: todas)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Execuções por medida (vale a mediana)")
+    parser.add_argument("--amostra-render", type=int, default=10, help="Currículos renderizados com dot")
+    parser.add_argument("--neo4j", metavar="URI", help="Importa em um Neo4j real, em vez do substituto em memória (grava as turmas nesse banco)")
+    parser.add_argument("--saida", type=Path, help="Arquivo JSON do resultado (padrão: resultados/<data>.json)")
+    parser.add_argument("--comparar", type=Path, metavar="BASE", help="Resultado anterior para o gate de regressão")
+    parser.add_argument("--limite", type=float, default=DEFAULT_THRESHOLD,
+                        help="Piora relativa tolerada por métrica (padrão: 0.10)")
+    args = parser.parse_args()
+    import instrumentation
+
+    # Os avisos por currículo/turma das ferramentas iriam para o stderr a cada repetição
+    instrumentation.setup_logging(os.getenv("LOG_LEVEL") or "WARNING")
+    unknown = [suite for suite in args.suites if suite not in SUITES]
+    if unknown:
+        parser.error(f"suítes desconhecidas: {', '.join(unknown)}")
+
+    results = Results()
+    random.seed(0)
+    for suite in args.suites:
+        started = time.perf_counter()
+        print(f"== {suite}", file=sys.stderr)
+        if suite == "grafos":
+            bench_graphs(results, args.repeticoes, args.amostra_render)
+        elif suite == "importacao":
+            bench_import(results, args.repeticoes, args.neo4j)
+        elif suite == "pdf":
+            bench_pdf(results, args.repeticoes)
+        elif suite == "catalogo":
+            bench_catalog(results, args.repeticoes)
+        print(f"   {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    current = results.to_dict()
+    output = args.saida or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(current, file, ensure_ascii=False, indent=2)
+
+    for name, metric in current["metrics"].items():
+        print(f"{name:45} {metric['value']:>14.4f} {metric['unit']}")
+    for suite, reason in current["skipped"].items():
+        print(f"{suite:45} ignorado: {reason}")
+    print(f"Resultado -> {output}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        rows = compare(baseline, current, args.limite)
+        regressions = [row for row in rows if row[4]]
+        print(f"\nComparação com {args.comparar} (commit {baseline.get('commit')}), limite {args.limite:.0%}:")
+        for name, before, after, change, regressed in rows:
+            print(f"{'PIOROU' if regressed else 'ok':6} {name:45} {before:>12.4f} -> {after:>12.4f} ({change:+.1%})")
+        if regressions:
+            print(f"{len(regressions)} métricas pioraram mais que {args.limite:.0%}.")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
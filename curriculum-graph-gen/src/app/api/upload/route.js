@@ -4,9 +4,14 @@ import { exec } from 'child_process';
 import { promisify } from 'util';
 import path from 'path';
 import fs from 'fs';
+import { parsePdf } from '../../lib/parsers/pdfParserWorker';
 
 const execPromise = promisify(exec);
 
+// With PDF_PARSER_WORKER=1 uploads go to a long-lived parser process
+// instead of starting a new Python interpreter for every upload.
+const useParserWorker = process.env.PDF_PARSER_WORKER === '1';
+
 const uploadDir = path.join(process.cwd(), 'uploads');
 if (!fs.existsSync(uploadDir)) {
   fs.mkdirSync(uploadDir, { recursive: true });
@@ -56,31 +61,42 @@ export async function POST(request) {
       );
     }
     
-    const pythonPath = "python3";
-    const command = `"${pythonPath}" "${pythonScript}" "${filePath}"`;
-    let stdout, stderr;
-    
-    try {
-      console.log(`Executing: ${command}`);
-      ({ stdout, stderr } = await execPromise(command));
-    } catch (pythonError) {
-      console.error('Error executing Python script:', pythonError);
-      return NextResponse.json(
-        { error: `Failed to parse PDF: ${pythonError.message}` },
-        { status: 500 }
-      );
-    }
-    
-    if (stderr) {
-      console.error('Error parsing PDF:', stderr);
-      return NextResponse.json(
-        { error: `Failed to parse PDF: ${stderr}` },
-        { status: 500 }
-      );
+    if (useParserWorker) {
+      try {
+        console.log(`Parsing with worker: ${filePath}`);
+        await parsePdf(filePath);
+      } catch (parserError) {
+        console.error('Error parsing PDF:', parserError);
+        return NextResponse.json(
+          { error: `Failed to parse PDF: ${parserError.message}` },
+          { status: 500 }
+        );
+      }
+    } else {
+      const pythonPath = "python3";
+      const command = `"${pythonPath}" "${pythonScript}" "${filePath}"`;
+      let stdout, stderr;
+
+      try {
+        console.log(`Executing: ${command}`);
+        ({ stdout, stderr } = await execPromise(command));
+      } catch (pythonError) {
+        console.error('Error executing Python script:', pythonError);
+        return NextResponse.json(
+          { error: `Failed to parse PDF: ${pythonError.message}` },
+          { status: 500 }
+        );
+      }
+
+      // The parser logs warnings (e.g. a backend falling back to pdfplumber)
+      // to stderr; a failed parse exits non-zero and is caught above.
+      if (stderr) {
+        console.warn('Parser warnings:', stderr);
+      }
+
+      console.log('Parser output:', stdout);
     }
     
-    console.log('Parser output:', stdout);
-    
     const expectedJsonPath = filePath.replace(/\.pdf$/i, '.json');
     console.log(`Looking for JSON at: ${expectedJsonPath}`);
     
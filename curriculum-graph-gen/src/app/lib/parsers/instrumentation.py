@@ -0,0 +1,235 @@
+"""
+Instrumentação comum dos scripts: logging com níveis no stderr, tempos por
+etapa, contadores e um perfil opcional, exportados num relatório JSON da
+execução.
+
+O original é graph-gen/instrumentation.py. Cada pasta de scripts vai para
+um container diferente (montada como volume), então
+backend/curriculum-graph-processor/src/main/scripts/ e
+curriculum-graph-gen/src/app/lib/parsers/ têm cópias: edite só o original e
+rode graph-gen/sync_instrumentation.py (--verificar só compara).
+
+Tudo pode ser ligado pela linha de comando (add_cli_arguments) ou pelo
+ambiente, e a linha de comando tem precedência:
+
+    LOG_LEVEL          DEBUG, INFO (padrão), WARNING, ERROR
+    LOG_FORMAT         "json" para uma linha JSON por mensagem
+    RUN_REPORT         arquivo onde o relatório JSON é gravado ao final
+    CURRICULO_PROFILE  "cprofile:<arquivo.prof>" ou "sample:<arquivo.txt>"
+
+As mensagens dos laços internos (uma por aresta, linha ou lote) são DEBUG,
+então ficam desligadas por padrão; o stdout fica livre para a saída dos
+próprios scripts (JSON, tabelas, protocolo do worker).
+"""
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+ROOT_LOGGER = "curriculo"
+SAMPLE_INTERVAL = 0.005
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+_RECORD_FIELDS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por mensagem, com os campos passados em `extra=`."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({k: v for k, v in record.__dict__.items() if k not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _handler(fmt):
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(_TEXT_FORMAT, "%H:%M:%S"))
+    return handler
+
+
+def setup_logging(level=None, fmt=None):
+    """(Re)configura o logger raiz dos scripts; sem argumentos, usa o ambiente."""
+    root = logging.getLogger(ROOT_LOGGER)
+    level = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT") or "text").lower()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler(fmt))
+    root.setLevel(level)
+    root.propagate = False
+    return root
+
+
+def get_logger(name):
+    """Logger `curriculo.<name>`, configurado pelo ambiente no primeiro uso."""
+    if not logging.getLogger(ROOT_LOGGER).handlers:
+        setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class Run:
+    """
+    Tempos e contadores de uma execução. As etapas acumulam chamadas, soma
+    e máximo; os contadores são somas simples. É seguro usar de várias
+    threads, e relatórios de outros processos entram com merge().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self._started = time.perf_counter()
+        self.spans = {}
+        self.counters = Counter()
+        self.info = {}
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name, seconds, calls=1, max_seconds=None):
+        with self._lock:
+            span = self.spans.setdefault(name, {"calls": 0, "seconds": 0.0, "max": 0.0})
+            span["calls"] += calls
+            span["seconds"] += seconds
+            span["max"] = max(span["max"], seconds if max_seconds is None else max_seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def merge(self, report):
+        """Soma as etapas e contadores de outro relatório (ex: de um processo filho)."""
+        for name, span in report.get("spans", {}).items():
+            self.record(name, span["seconds"], span["calls"], span["max"])
+        for name, n in report.get("counters", {}).items():
+            self.count(name, n)
+
+    def report(self):
+        with self._lock:
+            return {
+                "command": sys.argv,
+                "pid": os.getpid(),
+                "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+                "seconds": round(time.perf_counter() - self._started, 6),
+                "spans": {name: {"calls": s["calls"], "seconds": round(s["seconds"], 6), "max": round(s["max"], 6)}
+                          for name, s in sorted(self.spans.items())},
+                "counters": dict(sorted(self.counters.items())),
+                **self.info,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def write_report(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+# Execução do processo atual
+run = Run()
+span = run.span
+count = run.count
+
+
+class StackSampler(threading.Thread):
+    """
+    Perfil por amostragem: a cada intervalo guarda a pilha da thread
+    principal. O arquivo sai no formato "collapsed" (uma pilha por linha,
+    com a contagem no fim), aceito pelo flamegraph.pl e pelo speedscope.
+    """
+
+    def __init__(self, path, interval=SAMPLE_INTERVAL):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.samples = Counter()
+        self._thread_id = threading.main_thread().ident
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        with open(self.path, "w", encoding="utf-8") as f:
+            for stack, n in self.samples.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+def start_profile(spec):
+    """Liga o perfil descrito por `spec` ("cprofile:<arquivo>" ou "sample:<arquivo>") até o fim do processo."""
+    kind, _, path = spec.partition(":")
+    if kind == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def stop():
+            profiler.disable()
+            profiler.dump_stats(path or "run.prof")
+    elif kind == "sample":
+        sampler = StackSampler(path or "run.stacks.txt")
+        sampler.start()
+        stop = sampler.stop
+    else:
+        raise ValueError(f"Perfil desconhecido '{spec}': use cprofile:<arquivo> ou sample:<arquivo>")
+    run.info["profile"] = spec
+    atexit.register(stop)
+
+
+def add_cli_arguments(parser):
+    group = parser.add_argument_group("instrumentação")
+    group.add_argument("--log-level", help="Nível do log no stderr (env LOG_LEVEL, padrão INFO)")
+    group.add_argument("--log-json", action="store_true", help="Log em JSON, uma linha por mensagem (env LOG_FORMAT=json)")
+    group.add_argument("--run-report", help="Grava tempos e contadores da execução em JSON (env RUN_REPORT)")
+    group.add_argument("--profile", help="cprofile:<arquivo.prof> ou sample:<arquivo.txt> (env CURRICULO_PROFILE)")
+    return parser
+
+
+def configure(args=None):
+    """
+    Aplica as opções de add_cli_arguments (ou só o ambiente, com `args`
+    None): nível e formato do log, perfil e gravação do relatório no fim.
+    """
+    level = getattr(args, "log_level", None)
+    fmt = "json" if getattr(args, "log_json", False) else None
+    setup_logging(level, fmt)
+
+    profile = getattr(args, "profile", None) or os.getenv("CURRICULO_PROFILE")
+    report = getattr(args, "run_report", None) or os.getenv("RUN_REPORT")
+    # Registrado antes do perfil: o atexit roda em ordem inversa, então o
+    # relatório é gravado depois que o perfil termina.
+    if report:
+        atexit.register(run.write_report, report)
+    if profile:
+        start_profile(profile)
+    return run
@@ -0,0 +1,80 @@
+import { spawn } from 'child_process';
+import path from 'path';
+import readline from 'readline';
+
+const pythonPath = 'python3';
+const pythonScript = path.join(process.cwd(), 'src', 'app', 'lib', 'parsers', 'pdf_parser.py');
+
+// Keep the worker across Next.js hot reloads instead of spawning a new one
+// every time this module is re-evaluated.
+const state = globalThis.__pdfParserWorker ?? (globalThis.__pdfParserWorker = {
+  child: null,
+  nextId: 1,
+  pending: new Map(),
+});
+
+function startWorker() {
+  const child = spawn(pythonPath, [pythonScript, '--worker'], {
+    stdio: ['pipe', 'pipe', 'pipe'],
+  });
+
+  const lines = readline.createInterface({ input: child.stdout });
+  lines.on('line', (line) => {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch {
+      console.error('Invalid message from PDF parser worker:', line);
+      return;
+    }
+
+    const entry = state.pending.get(message.id);
+    if (!entry) {
+      return;
+    }
+    state.pending.delete(message.id);
+    entry.resolve(message);
+  });
+
+  child.stderr.on('data', (chunk) => {
+    console.log(`[pdf_parser] ${chunk.toString().trimEnd()}`);
+  });
+
+  child.on('exit', (code) => {
+    console.error(`PDF parser worker exited with code ${code}`);
+    state.child = null;
+    for (const entry of state.pending.values()) {
+      entry.reject(new Error(`PDF parser worker exited with code ${code}`));
+    }
+    state.pending.clear();
+  });
+
+  return child;
+}
+
+function request(payload) {
+  if (!state.child) {
+    state.child = startWorker();
+  }
+
+  const id = state.nextId++;
+  return new Promise((resolve, reject) => {
+    state.pending.set(id, { resolve, reject });
+    state.child.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+  });
+}
+
+// Parses the PDF exactly like `python3 pdf_parser.py <pdfPath>`: the JSON
+// file is written next to the PDF and the parsed data is also returned.
+export async function parsePdf(pdfPath) {
+  const response = await request({ pdf_path: pdfPath });
+  if (!response.ok) {
+    throw new Error(response.error);
+  }
+  return response;
+}
+
+// Returns { status, workers, pending, queue_depth, processed, failed, uptime }.
+export function workerHealth() {
+  return request({ cmd: 'health' });
+}
@@ -1,137 +1,677 @@
 import pdfplumber
 import re
+import argparse
+import glob
 import json
+import os
 import sys
+import threading
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import instrumentation
+
+try:
+    # pypdfium2 já vem como dependência do pdfplumber (>= 0.10)
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# No modo de arquivo único a rota de upload trata qualquer saída no stderr
+# como erro: as mensagens por chamada são DEBUG, desligadas por padrão.
+log = instrumentation.get_logger("pdf_parser")
+
+# Captura cada bloco de disciplina do código até Ob/Op
+COURSE_PATTERN = re.compile(r"""
+    (?P<block>                                   # Bloco completo da disciplina
+        (?P<codigo>[A-Z]{2,}[A-Z]?\d{4})         # Código (ex: ARQ5621, FSARQ5631)
+        .*?                                      # Nome, carga, nota, etc.
+        (?P<tipo>Ob|Op)\b                        # Tipo (Ob/Op)
+    )
+""", re.VERBOSE)
+
+COMPLETED_PATTERN = re.compile(r'\d{4}/\d\s+\d+\.\d')
+
+
+def parse_number(s):
+    if not s:
+        return None
+    s = s.strip().replace(".", "").replace(",", ".")
+    try:
+        return float(s) if "." in s else int(s)
+    except:
+        return None
 
-def parse_pdf(pdf_path):
-    """Parse a curriculum PDF and extract course codes with type (Ob/Op)."""
-    output_path = pdf_path.replace(".pdf", ".json").replace(".PDF", ".json")
 
-    print(f"Processing PDF: {pdf_path}")
-    print(f"Output will be saved to: {output_path}")
+# Metadados do currículo: (chave, regex, conversão). Quando duas regras
+# preenchem a mesma chave, vale a última que casar (Aulas Mínimas tem
+# prioridade sobre Numero Aulas).
+CURRICULUM_PATTERNS = [
+    # Código do curso
+    ("courseCode", re.compile(r'Curso:\s*(\d{3})'), str),
+    # Curriculum ID (YYYY/N → YYYYN)
+    ("curriculumId", re.compile(r'Curr[ií]culo:\s*(\d{4}/\d)', re.IGNORECASE),
+     lambda s: s.replace("/", "")),
+    # Numero Aulas (semanal)
+    ("minClasses", re.compile(r'Numero\s*Aulas\s*\(semanal\)\s*[:\-\s]*([\d.,]+)', re.IGNORECASE),
+     parse_number),
+    # Aulas Mínimas
+    ("minClasses", re.compile(r'Aulas\s*M[ií]nimas\s*[:\-\s]*([\d.,]+)', re.IGNORECASE), parse_number),
+    # Aulas Média
+    ("avgClasses", re.compile(r'Aulas\s*M[eé]dia\s*[:\-\s]*([\d.,]+)', re.IGNORECASE), parse_number),
+    # Aulas Máximas
+    ("maxClasses", re.compile(r'Aulas\s*M[aá]xima?s?\s*[:\-\s]*([\d.,]+)', re.IGNORECASE), parse_number),
+]
+
+
+class TranscriptScanner:
+    """
+    Incremental scanner for transcript text. Pages are fed one at a time and
+    the courses found on each page are returned right away, so callers never
+    need to hold the text of the whole document.
+    """
+
+    def __init__(self):
+        self.pages = 0
+        self.processed_courses = set()
+        # Primeiro valor encontrado para cada regra de metadados
+        self._metadata_matches = {}
+
+    def feed(self, text):
+        """Scan one page of text and return the (status, course) pairs found on it."""
+        self.pages += 1
+        self._scan_metadata(text)
+
+        found = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+
+            # Procura TODAS as disciplinas (cada bloco) na linha
+            for match in COURSE_PATTERN.finditer(line):
+                course = self._classify(match)
+                if course:
+                    found.append(course)
+        return found
+
+    def curriculum_info(self):
+        """Curriculum metadata found so far, with the same keys as extract_curriculum_info."""
+        info = {}
+        for index, (key, _, convert) in enumerate(CURRICULUM_PATTERNS):
+            if index in self._metadata_matches:
+                info[key] = convert(self._metadata_matches[index])
+        return info
+
+    def _scan_metadata(self, text):
+        # Os metadados ficam no cabeçalho: depois que todas as regras
+        # casaram, as páginas seguintes não são mais varridas.
+        if len(self._metadata_matches) == len(CURRICULUM_PATTERNS):
+            return
+        for index, (_, pattern, _) in enumerate(CURRICULUM_PATTERNS):
+            if index in self._metadata_matches:
+                continue
+            match = pattern.search(text)
+            if match:
+                self._metadata_matches[index] = match.group(1)
+
+    def _classify(self, match):
+        data = match.groupdict()
+        codigo = data["codigo"]
+        tipo = data["tipo"]
+        block = data["block"]
+
+        if codigo in self.processed_courses:
+            return None
+        self.processed_courses.add(codigo)
+
+        # Determina status pela análise do bloco específico
+        if "Cursando" in block:
+            return "andamento", {"codigo": codigo, "tipo": tipo}
+        elif "Cursou Eqv" in block or "Equivalência" in block:
+            return "dispensadas", {"codigo": codigo, "tipo": tipo}
+        elif "Não Cursou" in block or "Reprovado" in block:
+            # Ignorar ou poderia guardar em "naoCursadas"
+            return None
+        elif COMPLETED_PATTERN.search(block):
+            return "cursadas", {"codigo": codigo, "tipo": tipo}
+        return None
 
-    # Extrai todo o texto do PDF
-    full_text = ""
+
+def parse_crop(value):
+    """Parse "x0,top,x1,bottom" (fractions of the page, top-left origin)."""
+    if not value:
+        return None
+    crop = tuple(float(v) for v in value.split(","))
+    if len(crop) != 4 or not all(0 <= v <= 1 for v in crop):
+        raise ValueError(f"Invalid crop '{value}': expected x0,top,x1,bottom between 0 and 1")
+    return crop
+
+
+def _pdfplumber_texts(pdf_path, crop=None):
+    # Análise de layout completa do pdfplumber (lenta, mas é a referência)
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text:
-                full_text += text + "\n"
-
-    # Extrai metadados do currículo
-    curriculum_info = extract_curriculum_info(full_text)
-
-    # Captura cada bloco de disciplina do código até Ob/Op
-    course_pattern = re.compile(r"""
-        (?P<block>                                   # Bloco completo da disciplina
-            (?P<codigo>[A-Z]{2,}[A-Z]?\d{4})         # Código (ex: ARQ5621, FSARQ5631)
-            .*?                                      # Nome, carga, nota, etc.
-            (?P<tipo>Ob|Op)\b                        # Tipo (Ob/Op)
-        )
-    """, re.VERBOSE)
+        for index, page in enumerate(pdf.pages):
+            region = page
+            if crop and index > 0:
+                x0, top, x1, bottom = crop
+                region = page.crop((x0 * page.width, top * page.height,
+                                    x1 * page.width, bottom * page.height))
+            text = region.extract_text()
+            page.close()
+            yield text
+
+
+def _pdfium_texts(pdf_path, crop=None):
+    # Texto bruto do PDFium, sem agrupar caracteres em Python
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            if crop and index > 0:
+                width, height = page.get_size()
+                x0, top, x1, bottom = crop
+                text = textpage.get_text_bounded(left=x0 * width, bottom=(1 - bottom) * height,
+                                                 right=x1 * width, top=(1 - top) * height)
+            else:
+                text = textpage.get_text_range()
+            textpage.close()
+            page.close()
+            yield text
+    finally:
+        pdf.close()
+
+
+# Backends de extração de texto: nome -> função (pdf_path, crop) que gera o
+# texto de cada página. O recorte (crop) nunca é aplicado à primeira
+# página, onde ficam os metadados do currículo.
+TEXT_BACKENDS = {
+    "pdfplumber": _pdfplumber_texts,
+    "pdfium": _pdfium_texts,
+}
+
+FALLBACK_BACKEND = "pdfplumber"
+DEFAULT_BACKEND = os.getenv("PDF_PARSER_BACKEND", FALLBACK_BACKEND)
+DEFAULT_CROP = parse_crop(os.getenv("PDF_PARSER_CROP"))
+
+
+def available_backends():
+    return [name for name in TEXT_BACKENDS if name != "pdfium" or pdfium is not None]
+
+
+def iter_page_texts(pdf_path, backend=None, crop=None):
+    """Yield the text of each page, releasing the page's parsed objects as it goes."""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in available_backends():
+        raise ValueError(f"Unknown or unavailable text backend '{backend}'")
+
+    for text in TEXT_BACKENDS[backend](pdf_path, crop):
+        if text:
+            yield text
 
+
+def iter_courses(pdf_path, scanner=None, backend=None, crop=None):
+    """
+    Yield (status, course) pairs as soon as each page is extracted. The
+    curriculum metadata is available from `scanner.curriculum_info()` once
+    the header pages have been consumed.
+    """
+    scanner = scanner or TranscriptScanner()
+    pages = iter_page_texts(pdf_path, backend, crop)
+    while True:
+        with instrumentation.span("pdf_extract"):
+            text = next(pages, None)
+        if text is None:
+            return
+        with instrumentation.span("regex_match"):
+            found = scanner.feed(text)
+        instrumentation.count("pages")
+        instrumentation.count("courses", len(found))
+        yield from found
+
+
+def _scan_pdf(pdf_path, backend, crop):
+    """Return the results dict and the number of pages with text."""
     results = {
         "cursadas": [],
         "andamento": [],
         "dispensadas": []
     }
 
+    # Processa página por página, sem acumular o texto do PDF inteiro
+    scanner = TranscriptScanner()
+    for status, course in iter_courses(pdf_path, scanner, backend, crop):
+        results[status].append(course)
+
     # Adiciona metadados
-    if curriculum_info:
-        results.update(curriculum_info)
+    results.update(scanner.curriculum_info())
+    return results, scanner.pages
 
-    processed_courses = set()
 
-    # Processa linha por linha
-    for line in full_text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
+def extract_results(pdf_path, backend=None, crop=None):
+    """
+    Parse a curriculum PDF into the results dict without writing any file.
+    A fast backend that fails, or finds no course at all, falls back to
+    pdfplumber.
+    """
+    backend = backend or DEFAULT_BACKEND
+    crop = crop if crop is not None else DEFAULT_CROP
+    if backend == FALLBACK_BACKEND:
+        return _scan_pdf(pdf_path, backend, crop)[0]
 
-        # Procura TODAS as disciplinas (cada bloco) na linha
-        for match in course_pattern.finditer(line):
-            data = match.groupdict()
-            codigo = data["codigo"]
-            tipo = data["tipo"]
-            block = data["block"]
+    try:
+        results, _ = _scan_pdf(pdf_path, backend, crop)
+        if results["cursadas"] or results["andamento"] or results["dispensadas"]:
+            return results
+    except Exception as e:
+        log.warning("Backend '%s' failed on %s (%s); using %s", backend, pdf_path, e, FALLBACK_BACKEND)
+    return _scan_pdf(pdf_path, FALLBACK_BACKEND, crop)[0]
 
-            if codigo in processed_courses:
-                continue
-            processed_courses.add(codigo)
-
-            # Determina status pela análise do bloco específico
-            if "Cursando" in block:
-                results["andamento"].append({"codigo": codigo, "tipo": tipo})
-            elif "Cursou Eqv" in block or "Equivalência" in block:
-                results["dispensadas"].append({"codigo": codigo, "tipo": tipo})
-            elif "Não Cursou" in block or "Reprovado" in block:
-                # Ignorar ou poderia guardar em "naoCursadas"
-                continue
-            elif re.search(r'\d{4}/\d\s+\d+\.\d', block):
-                results["cursadas"].append({"codigo": codigo, "tipo": tipo})
+
+def parse_pdf(pdf_path, backend=None, crop=None):
+    """Parse a curriculum PDF and extract course codes with type (Ob/Op)."""
+    output_path = pdf_path.replace(".pdf", ".json").replace(".PDF", ".json")
+
+    log.debug("Processing PDF: %s", pdf_path)
+
+    with instrumentation.span("parse"):
+        results = extract_results(pdf_path, backend, crop)
 
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(results, f, ensure_ascii=False, indent=2)
 
-    print(f"saved to: {output_path}")
+    instrumentation.count("pdfs")
+    log.debug("Saved to: %s", output_path)
     return results, output_path
 
 
 def extract_curriculum_info(text):
     """Extrai metadados do currículo do texto do PDF"""
     info = {}
+    for key, pattern, convert in CURRICULUM_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            info[key] = convert(match.group(1))
+    return info
 
-    # Código do curso
-    course_match = re.search(r'Curso:\s*(\d{3})', text)
-    if course_match:
-        info["courseCode"] = course_match.group(1)
 
-    # Curriculum ID (YYYY/N → YYYYN)
-    curriculum_match = re.search(r'Curr[ií]culo:\s*(\d{4}/\d)', text, re.IGNORECASE)
-    if curriculum_match:
-        info["curriculumId"] = curriculum_match.group(1).replace("/", "")
+def _init_worker():
+    # No modo worker o stdout é o canal do protocolo. O parse_pdf não
+    # imprime nada; o redirecionamento só protege o canal de saída avulsa
+    # de bibliotecas de terceiros (pdfplumber, pdfminer).
+    sys.stdout = sys.stderr
 
-    def parse_number(s):
-        if not s:
-            return None
-        s = s.strip().replace(".", "").replace(",", ".")
+
+def _job_report():
+    # Tempos e contadores do job, medidos no processo do pool; o processo
+    # principal soma com instrumentation.run.merge() e descarta a chave.
+    report = instrumentation.run.report()
+    instrumentation.run.reset()
+    return report
+
+
+def _parse_job(pdf_path, backend=None, crop=None):
+    instrumentation.run.reset()
+    results, output_path = parse_pdf(pdf_path, backend, crop)
+    return {"data": results, "output_path": output_path, "_run": _job_report()}
+
+
+class ParserWorker:
+    """
+    Long-lived parser speaking a JSON-lines protocol on stdin/stdout.
+
+    Each request is one line: {"id": ..., "pdf_path": ...} parses a PDF
+    exactly like `pdf_parser.py <pdf_path>` (the JSON file is written next
+    to the PDF) and answers {"id", "ok", "data", "output_path"} or
+    {"id", "ok": false, "error"}. {"id", "cmd": "health"} reports the pool
+    size and queue depth, and {"cmd": "shutdown"} (or EOF) stops after the
+    pending requests finish. Requests run concurrently on a pool of warm
+    processes, so responses may arrive out of order.
+    """
+
+    def __init__(self, workers=None, out=None, backend=None, crop=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.out = out or sys.stdout
+        self.backend = backend
+        self.crop = crop
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.processed = 0
+        self.failed = 0
+        self.pool = self._create_pool()
+
+    def _create_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        # Sobe os processos já na inicialização, para o primeiro upload
+        # não pagar o custo de criá-los.
+        for future in [pool.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+        return pool
+
+    def serve(self, stream=None):
+        stream = stream or sys.stdin
+        self._respond({"event": "ready", "workers": self.workers})
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            if not self.handle(line):
+                break
+        self.pool.shutdown(wait=True)
+
+    def handle(self, line):
+        """Dispatch one request line. Returns False when the worker should stop."""
         try:
-            return float(s) if "." in s else int(s)
-        except:
-            return None
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            self._respond({"id": None, "ok": False, "error": f"Invalid request: {e}"})
+            return True
 
-    # Numero Aulas (semanal)
-    weekly_match = re.search(r'Numero\s*Aulas\s*\(semanal\)\s*[:\-\s]*([\d.,]+)', text, re.IGNORECASE)
-    if weekly_match:
-        info["minClasses"] = parse_number(weekly_match.group(1))
+        request_id = request.get("id")
+        cmd = request.get("cmd", "parse")
 
-    # Aulas Mínimas
-    min_match = re.search(r'Aulas\s*M[ií]nimas\s*[:\-\s]*([\d.,]+)', text, re.IGNORECASE)
-    if min_match:
-        info["minClasses"] = parse_number(min_match.group(1))
+        if cmd == "health":
+            self._respond({"id": request_id, "ok": True, **self.health()})
+        elif cmd == "shutdown":
+            return False
+        elif cmd == "parse" and request.get("pdf_path"):
+            self._submit(request_id, request["pdf_path"])
+        else:
+            self._respond({"id": request_id, "ok": False, "error": f"Invalid request: {line}"})
+        return True
 
-    # Aulas Média
-    avg_match = re.search(r'Aulas\s*M[eé]dia\s*[:\-\s]*([\d.,]+)', text, re.IGNORECASE)
-    if avg_match:
-        info["avgClasses"] = parse_number(avg_match.group(1))
+    def health(self):
+        with self.lock:
+            pending = self.pending
+            processed = self.processed
+            failed = self.failed
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "pending": pending,
+            "queue_depth": max(0, pending - self.workers),
+            "processed": processed,
+            "failed": failed,
+            "uptime": round(time.monotonic() - self.started, 3),
+        }
 
-    # Aulas Máximas
-    max_match = re.search(r'Aulas\s*M[aá]xima?s?\s*[:\-\s]*([\d.,]+)', text, re.IGNORECASE)
-    if max_match:
-        info["maxClasses"] = parse_number(max_match.group(1))
+    def _submit(self, request_id, pdf_path):
+        with self.lock:
+            self.pending += 1
+        try:
+            future = self.pool.submit(_parse_job, pdf_path, self.backend, self.crop)
+        except BrokenProcessPool:
+            # Um processo do pool morreu (ex: falta de memória); recria o pool.
+            self.pool = self._create_pool()
+            future = self.pool.submit(_parse_job, pdf_path, self.backend, self.crop)
+        future.add_done_callback(lambda f: self._finish(request_id, f))
+
+    def _finish(self, request_id, future):
+        try:
+            result = future.result()
+            instrumentation.run.merge(result.pop("_run"))
+            response = {"id": request_id, "ok": True, **result}
+        except Exception as e:
+            response = {"id": request_id, "ok": False, "error": str(e) or type(e).__name__}
+
+        with self.lock:
+            self.pending -= 1
+            self.processed += 1
+            self.failed += not response["ok"]
+        self._respond(response)
+
+    def _respond(self, payload):
+        with self.lock:
+            self.out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            self.out.flush()
+
+
+def run_worker(workers=None, backend=None, crop=None):
+    out = sys.stdout
+    _init_worker()
+    ParserWorker(workers=workers, out=out, backend=backend, crop=crop).serve(sys.stdin)
+
+
+def find_pdfs(source):
+    """List the PDFs under a directory (recursively) or matching a glob pattern."""
+    if os.path.isdir(source):
+        paths = (
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+        )
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(p for p in paths if p.lower().endswith(".pdf") and os.path.isfile(p))
+
+
+def _batch_job(pdf_path, backend=None, crop=None):
+    instrumentation.run.reset()
+    started = time.perf_counter()
+    try:
+        record = {"pdf": pdf_path, "ok": True, "result": extract_results(pdf_path, backend, crop)}
+    except Exception as e:
+        record = {"pdf": pdf_path, "ok": False, "error": str(e) or type(e).__name__}
+    record["seconds"] = round(time.perf_counter() - started, 4)
+    record["_run"] = _job_report()
+    return record
+
+
+def _run_pool(pdfs, jobs, backend, crop, emit):
+    """
+    Runs _batch_job over `pdfs` on a process pool, passing each record to
+    `emit`. A job that raises becomes an error record; the files lost to a
+    broken pool (a worker that died) are returned instead, to be retried.
+    """
+    broken = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        futures = {pool.submit(_batch_job, pdf_path, backend, crop): pdf_path for pdf_path in pdfs}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except BrokenProcessPool:
+                broken.append(futures[future])
+                continue
+            except Exception as e:
+                record = {"pdf": futures[future], "ok": False, "seconds": 0.0, "error": str(e) or type(e).__name__}
+            instrumentation.run.merge(record.pop("_run", {}))
+            emit(record)
+    return broken
+
+
+def run_batch(source, jobs=None, jsonl_path=None, out_dir=None, backend=None, crop=None):
+    """
+    Parse every PDF under `source` on a process pool. Each file produces one
+    record {"pdf", "ok", "seconds", "result" | "error"}, written as a
+    JSON-lines stream (to `jsonl_path`, or stdout) or, with `out_dir`, as
+    one JSON file per PDF mirroring the source tree. A failing file is
+    recorded and the batch goes on, even when it kills its worker process.
+    Returns the list of records.
+    """
+    pdfs = find_pdfs(source)
+    base_dir = source if os.path.isdir(source) else os.path.commonpath(pdfs) if pdfs else "."
+    if os.path.isfile(base_dir):
+        base_dir = os.path.dirname(base_dir)
+
+    log.info("Parsing %d PDFs with %d processes", len(pdfs), jobs or os.cpu_count())
+
+    stream = None
+    if not out_dir:
+        stream = open(jsonl_path, "w", encoding="utf-8") if jsonl_path else sys.stdout
+
+    records = []
+
+    def emit(record):
+        record["pdf"] = os.path.relpath(record["pdf"], base_dir)
+        records.append(record)
+        if out_dir:
+            target = os.path.join(out_dir, os.path.splitext(record["pdf"])[0] + ".json")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+        else:
+            stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stream.flush()
+        if not record["ok"]:
+            instrumentation.count("failed")
+            log.warning("FAILED %s: %s", record["pdf"], record["error"])
+
+    started = time.perf_counter()
+    try:
+        # Os maiores primeiro, para nenhum arquivo grande sobrar sozinho no fim
+        broken = _run_pool(sorted(pdfs, key=os.path.getsize, reverse=True), jobs, backend, crop, emit)
+        if broken:
+            # Um worker morto derruba o pool e todos os arquivos pendentes
+            # com ele: cada um é refeito em um pool próprio, para só o
+            # arquivo que matou o processo ficar como falha.
+            log.warning("Process pool broke; retrying %d PDFs one at a time", len(broken))
+            for pdf_path in broken:
+                for failed in _run_pool([pdf_path], 1, backend, crop, emit):
+                    emit({"pdf": failed, "ok": False, "seconds": 0.0,
+                          "error": "worker process died while parsing this file"})
+    finally:
+        if stream is not None and stream is not sys.stdout:
+            stream.close()
+
+    elapsed = time.perf_counter() - started
+    failed = [r for r in records if not r["ok"]]
+    log.info("Parsed %d/%d PDFs in %.2fs (%.1f files/s), %d failed", len(records) - len(failed), len(records),
+             elapsed, len(records) / (elapsed or 1e-9), len(failed))
+    for record in sorted(records, key=lambda r: r["seconds"], reverse=True)[:10]:
+        log.info("  %8.3fs  %s", record["seconds"], record["pdf"])
+    return records
 
-    return info
+
+def _courses_by_status(results):
+    return {
+        status: {(c["codigo"], c["tipo"]) for c in results[status]}
+        for status in ("cursadas", "andamento", "dispensadas")
+    }
+
+
+def compare_backends(source, backends=None):
+    """
+    Run every backend over the PDFs in `source` (no fallback) and compare
+    each one with pdfplumber, the reference. Returns a Markdown report with
+    the speed of each backend and the files whose classification or
+    metadata differ.
+    """
+    pdfs = find_pdfs(source)
+    backends = backends or available_backends()
+    stats = {name: {"seconds": 0.0, "pages": 0, "identical": 0, "errors": 0} for name in backends}
+    mismatches = []
+
+    for pdf_path in pdfs:
+        log.info("Comparing %s", pdf_path)
+        reference = None
+        for name in [FALLBACK_BACKEND] + [b for b in backends if b != FALLBACK_BACKEND]:
+            started = time.perf_counter()
+            try:
+                results, pages = _scan_pdf(pdf_path, name, None)
+            except Exception as e:
+                stats[name]["errors"] += 1
+                mismatches.append((pdf_path, name, f"error: {e}"))
+                continue
+            stats[name]["seconds"] += time.perf_counter() - started
+            stats[name]["pages"] += pages
+
+            if name == FALLBACK_BACKEND:
+                reference = results
+            if reference is None:
+                continue
+
+            expected = _courses_by_status(reference)
+            found = _courses_by_status(results)
+            metadata_ok = all(results.get(k) == v for k, v in reference.items() if k not in expected)
+            if found == expected and metadata_ok:
+                stats[name]["identical"] += 1
+                continue
+
+            details = []
+            for status in expected:
+                missing = sorted(c for c, _ in expected[status] - found[status])
+                extra = sorted(c for c, _ in found[status] - expected[status])
+                if missing:
+                    details.append(f"{status} missing {', '.join(missing)}")
+                if extra:
+                    details.append(f"{status} extra {', '.join(extra)}")
+            if not metadata_ok:
+                details.append("metadata differs")
+            mismatches.append((pdf_path, name, "; ".join(details)))
+
+    reference_seconds = stats[FALLBACK_BACKEND]["seconds"] if FALLBACK_BACKEND in stats else 0
+    lines = [
+        "# PDF text backend comparison",
+        "",
+        f"Corpus: `{source}` ({len(pdfs)} PDFs). Reference backend: `{FALLBACK_BACKEND}`.",
+        "",
+        "| Backend | Pages | Seconds | Pages/s | Speedup | Identical to reference | Errors |",
+        "|---|---:|---:|---:|---:|---:|---:|",
+    ]
+    for name, stat in stats.items():
+        seconds = stat["seconds"] or 1e-9
+        speedup = reference_seconds / seconds if reference_seconds else 0
+        lines.append(f"| {name} | {stat['pages']} | {stat['seconds']:.2f} | {stat['pages'] / seconds:.1f} | "
+                     f"{speedup:.1f}x | {stat['identical']}/{len(pdfs)} | {stat['errors']} |")
+
+    lines += ["", "## Differences", ""]
+    if mismatches:
+        lines += [f"- `{os.path.relpath(p, source) if os.path.isdir(source) else p}` "
+                  f"({name}): {detail}" for p, name, detail in mismatches]
+    else:
+        lines.append("None: every backend produced the same cursadas/andamento/dispensadas and metadata.")
+    return "\n".join(lines) + "\n"
 
 
 if __name__ == "__main__":
     try:
-        if len(sys.argv) < 2:
+        parser = argparse.ArgumentParser(description="Extract taken courses from transcript PDFs.")
+        parser.add_argument("pdf_path", nargs="?", help="PDF to parse; the JSON is saved next to it")
+        parser.add_argument("--worker", action="store_true",
+                            help="Serve JSON-lines requests on stdin/stdout")
+        parser.add_argument("--workers", type=int, help="Processes used by --worker")
+        parser.add_argument("--batch", metavar="DIR_OR_GLOB",
+                            help="Parse every PDF in a directory or matching a glob")
+        parser.add_argument("--jobs", type=int, help="Processes used by --batch (default: all cores)")
+        parser.add_argument("--jsonl", help="--batch: write the JSON-lines stream here instead of stdout")
+        parser.add_argument("--out-dir", help="--batch: write one JSON per PDF under this directory")
+        parser.add_argument("--backend", choices=list(TEXT_BACKENDS), default=DEFAULT_BACKEND,
+                            help="Text extraction backend (env PDF_PARSER_BACKEND)")
+        parser.add_argument("--crop", type=parse_crop, default=DEFAULT_CROP,
+                            help="Transcript table region x0,top,x1,bottom as page fractions, "
+                                 "applied from the second page on (env PDF_PARSER_CROP)")
+        parser.add_argument("--compare", metavar="DIR_OR_GLOB",
+                            help="Compare speed and accuracy of the text backends on a corpus")
+        parser.add_argument("--report", help="--compare: write the Markdown report here instead of stdout")
+        instrumentation.add_cli_arguments(parser)
+        args = parser.parse_args()
+        instrumentation.configure(args)
+
+        if args.worker:
+            run_worker(args.workers, backend=args.backend, crop=args.crop)
+        elif args.batch:
+            records = run_batch(args.batch, jobs=args.jobs, jsonl_path=args.jsonl, out_dir=args.out_dir,
+                                backend=args.backend, crop=args.crop)
+            sys.exit(1 if any(not r["ok"] for r in records) else 0)
+        elif args.compare:
+            report = compare_backends(args.compare)
+            if args.report:
+                with open(args.report, "w", encoding="utf-8") as f:
+                    f.write(report)
+            else:
+                print(report)
+        elif args.pdf_path:
+            _, output_path = parse_pdf(args.pdf_path, backend=args.backend, crop=args.crop)
+            print(f"saved to: {output_path}")
+        else:
             print("Usage: python pdf_parser.py <pdf_path>")
+            print("       python pdf_parser.py --worker [--workers N]")
+            print("       python pdf_parser.py --batch <dir_or_glob> [--jobs N] [--jsonl FILE | --out-dir DIR]")
             sys.exit(1)
-
-        pdf_path = sys.argv[1]
-        parse_pdf(pdf_path)
     except Exception as e:
         print(f"Unexpected error: {e}")
         traceback.print_exc()
@@ -0,0 +1,337 @@
+import argparse
+import json
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+import instrumentation
+from graph_gen import RESOURCES_DIR, find_curricula, load_json
+from prerequisites import is_satisfied, parse_expression
+
+log = instrumentation.get_logger("catalog")
+
+# fase_sugestao of the courses without a suggested phase (optional ones)
+NO_PHASE = 999
+
+
+class CourseCatalog:
+    """
+    Every course of every curriculum version, interned once.
+
+    Course codes get dense integer ids, as in PrerequisiteIndex, and what
+    belongs to the course itself (name, ementa, workload, type) is stored
+    once per id, whatever the number of curricula listing it. What belongs
+    to a curriculum (phase, obligatory or not, requirement, equivalence) is
+    a placement: one row of parallel arrays per (curriculum, course) pair,
+    with the parsed requirement and equivalence expressions shared between
+    rows that have the same text.
+
+    Inverted indexes, all in CSR form (the entries of `i` are
+    `values[offsets[i]:offsets[i + 1]]`):
+
+    - course -> placements, i.e. the curricula and phases of a course;
+    - department (first three letters of the code) -> courses;
+    - equivalence class -> member courses.
+
+    An `equivalencia` is directed: "MTM3100" on MTM3110 says that
+    MTM3100 substitutes MTM3110, not the other way around. Every
+    declaration, of a single course or a list ("A ou B", "A e B"), stays in
+    its placement as a substitution for that course only, evaluated with
+    is_satisfied. Equivalence classes come from a union-find over the pairs
+    declared both ways (A substitutes B somewhere and B substitutes A
+    somewhere), which is how sisacad records a course that changed code.
+    Joining one-way declarations would chain unrelated courses together
+    (Pré-Cálculo would end up in the class of every calculus). Classes are
+    symmetric and transitive across programs. After construction, looking
+    up the class of a code is a dict access plus an array index.
+    """
+
+    def __init__(self, documents=()):
+        self.codes = []
+        self.ids = {}
+        self.names = []
+        self.syllabi = []
+        self.workloads = array("i")
+        self.kinds = []
+
+        # One entry per curriculum version: {"program", "name", "version", "center"}
+        self.curricula = []
+        self.placement_course = array("i")
+        self.placement_curriculum = array("i")
+        self.placement_phase = array("h")
+        self.placement_obligatory = array("b")
+        self.requirements = []
+        self.equivalences = []
+        self._expressions = {}
+        self.conflicts = 0
+
+        self._parent = array("i")
+        # (course, substitute) of every single-course equivalencia seen so far
+        self._substitutes = set()
+        for document in documents:
+            self.add_program(document)
+        self.build_indexes()
+
+    @classmethod
+    def from_directory(cls, source: Path = RESOURCES_DIR):
+        return cls(load_json(path) for path in find_curricula(source))
+
+    def intern(self, code: str) -> int:
+        course = self.ids.get(code)
+        if course is None:
+            course = self.ids[code] = len(self.codes)
+            self.codes.append(code)
+            # Codes only seen inside an expression have no data of their own
+            self.names.append(None)
+            self.syllabi.append(None)
+            self.workloads.append(0)
+            self.kinds.append(None)
+            self._parent.append(course)
+        return course
+
+    def _expression(self, text):
+        if not text:
+            return None
+        try:
+            return self._expressions[text]
+        except KeyError:
+            expression = self._expressions[text] = parse_expression(text, self.intern)
+            return expression
+
+    def add_program(self, document: dict):
+        """Adds every curriculum version of a curriculum JSON (one file of the resources)."""
+        for version, curriculum in (document.get("curriculos") or {}).items():
+            index = len(self.curricula)
+            self.curricula.append({"program": document.get("codigo"), "name": document.get("nome"),
+                                   "version": str(version), "center": document.get("sigla_centro")})
+            # Currículos recém-criados vêm com "ucs": []
+            for code, subject in (curriculum.get("ucs") or {}).items():
+                course = self.intern(code)
+                if self.names[course] is None:
+                    self.names[course] = subject.get("nome")
+                    self.syllabi[course] = subject.get("ementa")
+                    self.workloads[course] = int(subject.get("carga_horaria") or 0)
+                    self.kinds[course] = subject.get("tipo_uc")
+                elif self.syllabi[course] != subject.get("ementa") or self.names[course] != subject.get("nome"):
+                    self.conflicts += 1
+
+                phase = str(subject.get("fase_sugestao", ""))
+                equivalence = self._expression(subject.get("equivalencia"))
+                self.placement_course.append(course)
+                self.placement_curriculum.append(index)
+                self.placement_phase.append(int(phase) if phase.isdigit() else NO_PHASE)
+                self.placement_obligatory.append("1" in (subject.get("etiquetas") or ()))
+                self.requirements.append(self._expression(subject.get("prerequisito")))
+                self.equivalences.append(equivalence)
+                if isinstance(equivalence, int):
+                    self._substitutes.add((course, equivalence))
+                    if (equivalence, course) in self._substitutes:
+                        self._union(course, equivalence)
+
+    def _find(self, course: int) -> int:
+        parent = self._parent
+        while parent[course] != course:
+            parent[course] = parent[parent[course]]
+            course = parent[course]
+        return course
+
+    def _union(self, a: int, b: int):
+        a, b = self._find(a), self._find(b)
+        if a != b:
+            # The smaller id stays the root, so classes do not depend on load order of unions
+            self._parent[max(a, b)] = min(a, b)
+
+    @staticmethod
+    def _csr(keys, size: int):
+        """Groups the positions of `keys` (ints below `size`) by key."""
+        offsets = array("i", bytes(4 * (size + 1)))
+        for key in keys:
+            offsets[key + 1] += 1
+        for i in range(size):
+            offsets[i + 1] += offsets[i]
+        values = array("i", bytes(4 * len(keys)))
+        cursor = array("i", offsets[:-1])
+        for position, key in enumerate(keys):
+            values[cursor[key]] = position
+            cursor[key] += 1
+        return offsets, values
+
+    def build_indexes(self):
+        """(Re)builds the inverted indexes; call it after add_program."""
+        num_courses = len(self.codes)
+        self.course_offsets, self.course_placements = self._csr(self.placement_course, num_courses)
+
+        self.classes = array("i", (self._find(course) for course in range(num_courses)))
+        self.class_offsets, self.class_members = self._csr(self.classes, num_courses)
+
+        departments = {}
+        for course, code in enumerate(self.codes):
+            departments.setdefault(code[:3], array("i")).append(course)
+        self.departments = departments
+
+    # Queries
+
+    def course(self, code: str):
+        """The course's own data, or None for an unknown code."""
+        course = self.ids.get(code)
+        if course is None:
+            return None
+        return {"codigo": code, "nome": self.names[course], "ementa": self.syllabi[course],
+                "carga_horaria": self.workloads[course], "tipo_uc": self.kinds[course],
+                "departamento": code[:3]}
+
+    def placements(self, code: str) -> list:
+        """Every curriculum listing `code`, with its phase and whether it is obligatory there."""
+        course = self.ids.get(code)
+        if course is None:
+            return []
+        rows = []
+        for placement in self.course_placements[self.course_offsets[course]:self.course_offsets[course + 1]]:
+            curriculum = self.curricula[self.placement_curriculum[placement]]
+            phase = self.placement_phase[placement]
+            rows.append({"curso": curriculum["program"], "nome": curriculum["name"],
+                         "curriculo": curriculum["version"], "fase": None if phase == NO_PHASE else phase,
+                         "obrigatoria": bool(self.placement_obligatory[placement])})
+        return rows
+
+    def required_by(self, code: str) -> list:
+        """Programs (and curriculum versions) where `code` is obligatory."""
+        return [row for row in self.placements(code) if row["obrigatoria"]]
+
+    def department(self, department: str) -> list:
+        return [self.codes[course] for course in self.departments.get(department.upper(), ())]
+
+    def equivalents(self, code: str) -> list:
+        """Codes in the equivalence class of `code` (itself included)."""
+        course = self.ids.get(code)
+        if course is None:
+            return []
+        root = self.classes[course]
+        return [self.codes[member] for member in self.class_members[self.class_offsets[root]:self.class_offsets[root + 1]]]
+
+    def equivalent(self, a: str, b: str) -> bool:
+        course_a, course_b = self.ids.get(a), self.ids.get(b)
+        if course_a is None or course_b is None:
+            return a == b
+        return self.classes[course_a] == self.classes[course_b]
+
+    def completed_ids(self, completed_codes) -> set:
+        """Ids of the completed courses and of every course equivalent to one of them."""
+        done = set()
+        for code in completed_codes:
+            course = self.ids.get(code)
+            if course is None:
+                continue
+            root = self.classes[course]
+            done.update(self.class_members[self.class_offsets[root]:self.class_offsets[root + 1]])
+        return done
+
+    def satisfies(self, completed_codes, code: str, program=None, version=None) -> bool:
+        """
+        Whether the completed courses count as `code`: the code itself, a
+        course of its equivalence class, or an equivalencia declared for it
+        ("A", "A ou B", "A e B"). With `program` (and optionally `version`),
+        only the declarations of that curriculum are considered.
+        """
+        course = self.ids.get(code)
+        if course is None:
+            return code in set(completed_codes)
+        done = self.completed_ids(completed_codes)
+        if course in done:
+            return True
+        for placement in self.course_placements[self.course_offsets[course]:self.course_offsets[course + 1]]:
+            expression = self.equivalences[placement]
+            if expression is None:
+                continue
+            curriculum = self.curricula[self.placement_curriculum[placement]]
+            if program is not None and str(curriculum["program"]) != str(program):
+                continue
+            if version is not None and curriculum["version"] != str(version):
+                continue
+            if is_satisfied(expression, done):
+                return True
+        return False
+
+    def stats(self) -> dict:
+        sizes = [self.class_offsets[i + 1] - self.class_offsets[i] for i in range(len(self.codes))]
+        return {
+            "curriculos": len(self.curricula),
+            "disciplinas": sum(1 for name in self.names if name is not None),
+            "codigos": len(self.codes),
+            "ocorrencias": len(self.placement_course),
+            "expressoes": len(self._expressions),
+            "departamentos": len(self.departments),
+            "classes_equivalencia": sum(1 for size in sizes if size > 1),
+            "maior_classe": max(sizes, default=0),
+            "conflitos": self.conflicts,
+        }
+
+
+def measure_memory(source: Path = RESOURCES_DIR) -> dict:
+    """Peak traced memory of every curriculum JSON kept loaded versus the catalogue built from them."""
+    paths = find_curricula(source)
+
+    tracemalloc.start()
+    documents = [load_json(path) for path in paths]
+    documents_bytes = tracemalloc.get_traced_memory()[0]
+    del documents
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    catalog = CourseCatalog(load_json(path) for path in paths)
+    elapsed = time.perf_counter() - started
+    catalog_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {"json_mb": round(documents_bytes / 2**20, 2), "catalogo_mb": round(catalog_bytes / 2**20, 2),
+            "construcao_s": round(elapsed, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catálogo único das disciplinas de todos os currículos.")
+    parser.add_argument("--source", type=Path, default=RESOURCES_DIR, help="Pasta com os currículos")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("resumo", help="Totais do catálogo")
+    summary.add_argument("--memoria", action="store_true", help="Compara a memória com os JSONs carregados")
+    commands.add_parser("disciplina", help="Dados e currículos de uma disciplina").add_argument("codigo")
+    commands.add_parser("exigida-por", help="Cursos em que a disciplina é obrigatória").add_argument("codigo")
+    commands.add_parser("departamento", help="Disciplinas de um departamento (ex: INE)").add_argument("sigla")
+    commands.add_parser("equivalentes", help="Classe de equivalência da disciplina").add_argument("codigo")
+    satisfies = commands.add_parser("satisfaz", help="Se as disciplinas cursadas valem pela disciplina")
+    satisfies.add_argument("codigo")
+    satisfies.add_argument("--cursadas", required=True, help="Códigos cursados, separados por vírgula")
+    satisfies.add_argument("--curso", help="Só as equivalências declaradas neste curso (campo codigo)")
+    satisfies.add_argument("--curriculo", help="Só as equivalências declaradas nesta versão do currículo")
+    instrumentation.add_cli_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    if args.command == "resumo" and args.memoria:
+        print(json.dumps(measure_memory(args.source), ensure_ascii=False, indent=2))
+        return
+
+    started = time.perf_counter()
+    with instrumentation.span("catalog_build"):
+        catalog = CourseCatalog.from_directory(args.source)
+    log.info("Catálogo montado em %.2fs", time.perf_counter() - started)
+
+    if args.command == "resumo":
+        result = catalog.stats()
+    elif args.command == "disciplina":
+        result = catalog.course(args.codigo) and {**catalog.course(args.codigo),
+                                                   "curriculos": catalog.placements(args.codigo)}
+    elif args.command == "exigida-por":
+        result = catalog.required_by(args.codigo)
+    elif args.command == "departamento":
+        result = catalog.department(args.sigla)
+    elif args.command == "equivalentes":
+        result = catalog.equivalents(args.codigo)
+    else:
+        completed = [code.strip() for code in args.cursadas.split(",") if code.strip()]
+        result = catalog.satisfies(completed, args.codigo, args.curso, args.curriculo)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
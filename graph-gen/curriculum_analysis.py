@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from graph_gen import RESOURCES_DIR, GraphGenerator, find_curricula, load_json
+
+ANALYSIS_OUTPUT = Path(__file__).parent / "analise_curriculos.json"
+
+
+class CurriculumDag:
+    """
+    Prerequisite DAG of the obligatory courses of one curriculum, i.e. the
+    courses GraphGenerator draws. `codes[i]` is course i and `edges` holds
+    (prerequisite, course) index pairs.
+    """
+
+    def __init__(self, name: str, curriculum_id: str, codes: list, edges: list):
+        self.name = name
+        self.curriculum_id = curriculum_id
+        self.codes = codes
+        self.edges = edges
+
+    @classmethod
+    def from_json(cls, name: str, json_data: dict):
+        generator = GraphGenerator(json_data)
+        codes = list(generator.all_subjects)
+        position = {code: i for i, code in enumerate(codes)}
+        edges = [(position[prerequisite], position[course])
+                 for prerequisite, course in generator.prerequisite_index.edges(members=position)]
+        curriculum_id = next(reversed(json_data.get("curriculos") or {}), None)
+        return cls(name, curriculum_id, codes, edges)
+
+
+def _closure(adjacency: np.ndarray) -> np.ndarray:
+    """
+    Transitive closure of a stack of boolean adjacency matrices by repeated
+    squaring: after k rounds, paths of up to 2**k edges are covered, so
+    log2(n) batched matrix products are enough.
+    """
+    reach = adjacency.copy()
+    while True:
+        product = np.matmul(reach.astype(np.float32), reach.astype(np.float32)) > 0
+        extended = reach | product
+        if np.array_equal(extended, reach):
+            return reach
+        reach = extended
+
+
+def _longest_chain(adjacency: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Number of courses on the longest chain ending at each course (1 for a
+    course with no prerequisites), relaxed for every course at once until
+    it stops changing. `adjacency` must be acyclic.
+    """
+    depth = valid.astype(np.int32)
+    weights = adjacency.astype(np.int32)
+    while True:
+        incoming = (weights * (depth[:, :, None] + 1)).max(axis=1)
+        updated = np.where(valid, np.maximum(incoming, 1), 0)
+        if np.array_equal(updated, depth):
+            return depth
+        depth = updated
+
+
+def analyse(dags: list) -> list:
+    """
+    Analyses every curriculum in one batch. The DAGs are padded to the
+    largest curriculum and stacked into a (curricula, n, n) boolean tensor,
+    so each step is a handful of NumPy operations over all of them.
+
+    For every course it reports the transitive prerequisites and dependents,
+    `chain` (minimum number of semesters to reach and pass it), `blocking`
+    (how many courses are delayed if it is failed) and whether it lies on a
+    longest chain of its curriculum. Courses caught in a prerequisite cycle
+    get `chain` None and are left out of the chain computation.
+    """
+    if not dags:
+        return []
+
+    size = max(max(len(dag.codes) for dag in dags), 1)
+    adjacency = np.zeros((len(dags), size, size), dtype=bool)
+    valid = np.zeros((len(dags), size), dtype=bool)
+    for b, dag in enumerate(dags):
+        valid[b, :len(dag.codes)] = True
+        if dag.edges:
+            sources, targets = zip(*dag.edges)
+            adjacency[b, list(sources), list(targets)] = True
+
+    # reach[b, i, j]: i is a (transitive) prerequisite of j
+    reach = _closure(adjacency)
+    cyclic = np.diagonal(reach, axis1=1, axis2=2).copy()
+
+    acyclic = adjacency & ~cyclic[:, :, None] & ~cyclic[:, None, :]
+    chain_valid = valid & ~cyclic
+    depth = _longest_chain(acyclic, chain_valid)
+    height = _longest_chain(np.swapaxes(acyclic, 1, 2), chain_valid)
+    longest = depth.max(axis=1)
+    critical = chain_valid & (depth + height - 1 == longest[:, None])
+
+    blocking = reach.sum(axis=2)
+
+    results = []
+    for b, dag in enumerate(dags):
+        courses = {}
+        for i, code in enumerate(dag.codes):
+            courses[code] = {
+                "prerequisites": [dag.codes[j] for j in np.flatnonzero(reach[b, :, i]) if j != i],
+                "dependents": [dag.codes[j] for j in np.flatnonzero(reach[b, i, :]) if j != i],
+                "chain": None if cyclic[b, i] else int(depth[b, i]),
+                "blocking": int(blocking[b, i]) - int(cyclic[b, i]),
+                "critical": bool(critical[b, i]),
+            }
+        results.append({
+            "curriculum": dag.name,
+            "curriculum_id": dag.curriculum_id,
+            "courses": len(dag.codes),
+            "prerequisites": len(dag.edges),
+            "longest_chain": int(longest[b]),
+            "cycles": [dag.codes[i] for i in np.flatnonzero(cyclic[b, :len(dag.codes)])],
+            "by_course": courses,
+        })
+    return results
+
+
+def load_all(source_dir: Path, paths: list = None) -> list:
+    dags = []
+    for path in paths or find_curricula(source_dir):
+        relative = path.relative_to(source_dir) if path != source_dir else Path(path.name)
+        dags.append(CurriculumDag.from_json(str(relative.with_suffix("")), load_json(path)))
+    return dags
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Calcula pré-requisitos transitivos, cadeias críticas e fator de bloqueio dos currículos.")
+    parser.add_argument("curricula", nargs="*", type=Path,
+                        help="JSONs específicos (padrão: todos em --source)")
+    parser.add_argument("--source", type=Path, default=RESOURCES_DIR, help="Pasta com os currículos")
+    parser.add_argument("--output", type=Path, default=ANALYSIS_OUTPUT, help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    paths = [path.resolve() for path in args.curricula] or None
+    source_dir = args.source.resolve()
+    if paths and not all(source_dir in path.parents for path in paths):
+        source_dir = Path(os.path.commonpath([path.parent for path in paths]))
+
+    started = time.perf_counter()
+    dags = load_all(source_dir, paths)
+    loaded = time.perf_counter()
+    results = analyse(dags)
+    finished = time.perf_counter()
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    cyclic = [r["curriculum"] for r in results if r["cycles"]]
+    print(f"{len(results)} currículos analisados (carga: {loaded - started:.2f}s, "
+          f"análise: {finished - loaded:.2f}s) -> {args.output}")
+    for name in cyclic:
+        print(f"  Aviso: ciclo de pré-requisitos em {name}")
+
+
+if __name__ == "__main__":
+    main()
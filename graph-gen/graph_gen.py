@@ -1,11 +1,20 @@
+import argparse
 import json
-import re
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import graphviz
+import logging
 import os
 
-SUBJECT_CODE_REGEX = re.compile("[A-Z]{3}[0-9]{4}")
+import instrumentation
+import render_cache
+from phase_layout import ENGINE_NAME as PHASE_ENGINE, LAYOUT_VERSION, PhaseLayout
+from prerequisites import PrerequisiteIndex
+from render_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, RenderCache
+
+log = instrumentation.get_logger("graph_gen")
 
 VALID_COLORS = ["1", "2", "3", "4", "5", "6"]
 
@@ -34,12 +43,14 @@ class GraphGenerator:
     Gera um grafo de currículo a partir de dados JSON, com ajustes no layout
     para se aproximar do segundo exemplo.
     """
-    def __init__(self, json_data):
+    def __init__(self, json_data, curriculum_id=None):
         self.raw_data = json_data
+        self.curriculum_id = curriculum_id
         self.curriculum_data = {}
         self.node_colors = {}
         self.all_subjects = {}
         self.fase_keys_sorted = []
+        self.prerequisite_index = PrerequisiteIndex([])
         self._load_and_process_data()
 
     def _load_and_process_data(self):
@@ -49,22 +60,25 @@ class GraphGenerator:
         """
         curriculos = self.raw_data.get("curriculos", {})
         if not curriculos:
-            print("Nenhum currículo encontrado no JSON.")
+            log.warning("Nenhum currículo encontrado no JSON.")
             return
 
-        # Pega a última chave (geralmente a mais recente ou a única relevante)
-        # Se houver múltiplas chaves e você quiser uma específica, ajuste aqui.
-        curriculo_key = next(reversed(curriculos), None)
-        print(f"Usando currículo: {curriculo_key}")
+        # Pega a versão pedida ou a última chave (geralmente a mais recente)
+        curriculo_key = str(self.curriculum_id) if str(self.curriculum_id) in curriculos else next(reversed(curriculos), None)
+        self.curriculum_id = curriculo_key
+        log.debug("Usando currículo: %s", curriculo_key)
         curriculo = curriculos.get(curriculo_key, {})
-        disciplinas = curriculo.get("ucs", {})
+        # Currículos recém-criados vêm com "ucs": [] em vez de um objeto vazio
+        disciplinas = curriculo.get("ucs") or {}
+        # Os pré-requisitos são compilados uma vez por currículo
+        self.prerequisite_index = PrerequisiteIndex(disciplinas.values())
 
         obrigatorias = {
             k: v for k, v in disciplinas.items()
             if "1" in v.get("etiquetas", []) and v.get("fase_sugestao") != "999"
         }
         self.all_subjects = obrigatorias
-        print(f"Encontradas {len(obrigatorias)} disciplinas obrigatórias.")
+        log.debug("Encontradas %d disciplinas obrigatórias.", len(obrigatorias))
 
         fases_temp = defaultdict(list)
         fase_numbers = set()
@@ -88,7 +102,7 @@ class GraphGenerator:
                 color_idx = (fase_num - 1) % len(VALID_COLORS)
                 self.node_colors[code] = VALID_COLORS[color_idx]
             except ValueError:
-                print(f"Aviso: Fase '{fase_val}' para a disciplina '{code}' não é um número. Ignorando.")
+                log.warning("Fase '%s' para a disciplina '%s' não é um número. Ignorando.", fase_val, code)
 
 
         sorted_numeric = sorted([k for k in fases_temp.keys() if k.isdigit()], key=int)
@@ -96,7 +110,7 @@ class GraphGenerator:
         if "8+" in fases_temp:
             self.fase_keys_sorted.append("8+")
 
-        print(f"Fases processadas: {self.fase_keys_sorted}")
+        log.debug("Fases processadas: %s", self.fase_keys_sorted)
 
         for key in self.fase_keys_sorted:
             self.curriculum_data[key] = sorted(fases_temp[key], key=lambda x: x["codigo"])
@@ -150,6 +164,7 @@ class GraphGenerator:
         """
         Cria os subgrafos (colunas) para cada fase com suas disciplinas.
         """
+        debug = log.isEnabledFor(logging.DEBUG)
         all_first_nodes = []
         for i, phase_key in enumerate(self.fase_keys_sorted):
             subjects = self.curriculum_data.get(phase_key, []) # Use .get for safety
@@ -180,7 +195,8 @@ class GraphGenerator:
                 phase_key = self.fase_keys_sorted[i]
                 cluster_id = phase_key.replace('+', '_plus')
 
-                print(f"Conectando header '{header}' ao primeiro nó '{first_node}' do cluster '{cluster_id}'")
+                if debug:
+                    log.debug("Conectando header '%s' ao primeiro nó '%s' do cluster '%s'", header, first_node, cluster_id)
                 graph.edge(header, first_node, style="invis", weight="1000", lhead=f"cluster_{cluster_id}")
 
 
@@ -189,15 +205,15 @@ class GraphGenerator:
         Cria as arestas (conexões) entre as disciplinas com base nos pré-requisitos.
         """
         all_codes = set(self.all_subjects.keys())
+        # Uma mensagem por aresta: o teste de nível sai do laço
+        debug = log.isEnabledFor(logging.DEBUG)
 
         for subjects_list in self.curriculum_data.values():
             for subject in subjects_list:
-                prereq_field = subject.get("prerequisito", "")
-                prereq_list = SUBJECT_CODE_REGEX.findall(prereq_field)
-
-                for prereq_code in prereq_list:
+                for prereq_code in self.prerequisite_index.prerequisite_codes(subject["codigo"]):
                     if prereq_code not in all_codes:
-                        # print(f"Aviso: Pré-requisito '{prereq_code}' para '{subject['codigo']}' não encontrado nas obrigatórias.")
+                        if debug:
+                            log.debug("Pré-requisito '%s' para '%s' não encontrado nas obrigatórias.", prereq_code, subject["codigo"])
                         continue
 
                     color = self.node_colors.get(prereq_code, "1")
@@ -207,11 +223,9 @@ class GraphGenerator:
 
                     if (prereq_code.upper(), subject["codigo"].upper()) == ('MTM3100', 'MTM3110'):
                         attrs['constraint'] = "false"
-                        print(f"Conectando {prereq_code} a {subject['codigo']} com constraint=false")
-                        graph.edge(prereq_code, subject["codigo"], **attrs)
-                    else:
-                        print(f"Conectando {prereq_code} a {subject['codigo']} com constraint=false")
-                        graph.edge(prereq_code, subject["codigo"], **attrs)
+                    if debug:
+                        log.debug("Conectando %s a %s %s", prereq_code, subject["codigo"], attrs)
+                    graph.edge(prereq_code, subject["codigo"], **attrs)
 
 
     def generate_graph(self) -> graphviz.Digraph:
@@ -229,23 +243,357 @@ class GraphGenerator:
 
         return graph
 
+    def generate_layout(self, previous: PhaseLayout = None, status: dict = None) -> PhaseLayout:
+        """
+        Monta o mesmo grafo com o layout próprio em colunas por fase, sem
+        passar pelo Graphviz. Com `previous` (o layout de outra versão do
+        currículo), as disciplinas que continuam na mesma fase ficam na
+        mesma posição; `status` marca disciplinas ({código: "added" |
+        "moved" | "changed"}).
+        """
+        status = status or {}
+        columns = []
+        for key in self.fase_keys_sorted:
+            nodes = [{"id": subject["codigo"], "label": self._get_subject_label(subject),
+                      "color": self._get_subject_color(subject), "tooltip": subject["descricao"],
+                      "status": status.get(subject["codigo"])}
+                     for subject in self.curriculum_data.get(key, [])]
+            columns.append((f"Fase {key}", nodes))
+
+        edges = []
+        for subjects_list in self.curriculum_data.values():
+            for subject in subjects_list:
+                for prereq_code in self.prerequisite_index.prerequisite_codes(subject["codigo"]):
+                    if prereq_code in self.all_subjects:
+                        edges.append((prereq_code, subject["codigo"], self.node_colors.get(prereq_code, "1")))
+        return PhaseLayout(columns, edges, previous)
+
+    def phases(self) -> dict:
+        """{código: fase} das disciplinas desenhadas."""
+        return {subject["codigo"]: key for key, subjects in self.curriculum_data.items() for subject in subjects}
+
+    def prerequisite_edges(self) -> set:
+        """Arestas (pré-requisito, disciplina) entre as disciplinas desenhadas."""
+        return set(self.prerequisite_index.edges(members=self.all_subjects))
+
+
+def diff_versions(old: GraphGenerator, new: GraphGenerator) -> dict:
+    """
+    Diferença estrutural entre duas versões de um currículo, sobre as
+    disciplinas desenhadas: adicionadas, removidas, que mudaram de fase e
+    pré-requisitos adicionados ou removidos.
+    """
+    old_phases, new_phases = old.phases(), new.phases()
+    old_edges, new_edges = old.prerequisite_edges(), new.prerequisite_edges()
+    return {
+        "de": old.curriculum_id,
+        "para": new.curriculum_id,
+        "adicionadas": sorted(new_phases.keys() - old_phases.keys()),
+        "removidas": sorted(old_phases.keys() - new_phases.keys()),
+        "movidas": [{"codigo": code, "de": old_phases[code], "para": new_phases[code]}
+                    for code in sorted(old_phases.keys() & new_phases.keys())
+                    if old_phases[code] != new_phases[code]],
+        "prerequisitos_adicionados": sorted(new_edges - old_edges),
+        "prerequisitos_removidos": sorted(old_edges - new_edges),
+    }
+
+
+def diff_status(diff: dict) -> dict:
+    """Marcação de cada disciplina alterada no layout da versão nova."""
+    status = {code: "changed" for edge in diff["prerequisitos_adicionados"] + diff["prerequisitos_removidos"]
+              for code in edge[1:]}
+    status.update({move["codigo"]: "moved" for move in diff["movidas"]})
+    status.update({code: "added" for code in diff["adicionadas"]})
+    return status
+
 
 project_root = Path(__file__).parent.parent
-path = project_root / "curriculos/ciencias_da_computação/curriculo_208_20242.json"
 
-output_dir = project_root / "graph-gen/grafos_gerados"
-output_dir.mkdir(parents=True, exist_ok=True)
+# Currículos baixados do sisacad (um JSON por curso)
+RESOURCES_DIR = project_root / "backend/curriculum-graph-processor/src/main/resources"
+# Turmas do semestre (turmas_curso_*.json), gravadas pelo download_turmas.py
+TURMAS_DIR = project_root / "backend/turmas_20252"
+OUTPUT_DIR = project_root / "graph-gen/grafos_gerados"
+# Subpasta da saída com todas as versões de cada currículo (--versoes)
+VERSIONS_DIR = "versoes"
 
-with open(path, "r", encoding='utf-8') as file:
-    curriculum_data = json.load(file)
+DEFAULT_FORMATS = ["png", "svg", "dot", "json"]
 
-    generator = GraphGenerator(curriculum_data)
-    grafo = generator.generate_graph()
 
-    output_filename = output_dir / "grafo_curriculo"
-    # Tenta usar o motor 'dot' (padrão) ou 'neato'/'fdp' se quiser experimentar
-    grafo.engine = 'dot' 
-    grafo.render(filename=output_filename, cleanup=True, format="png", view=False)
+def find_curricula(source: Path) -> list:
+    """Lista os JSONs de currículo de uma pasta (recursivamente) ou um arquivo único."""
+    source = Path(source)
+    if source.is_file():
+        return [source]
+    return sorted(source.rglob("*.json"))
 
-    with open(f"{output_filename}.dot", "w", encoding='utf-8') as dot_file:
-        dot_file.write(grafo.source)
\ No newline at end of file
+
+def load_json(path: Path):
+    """Lê um JSON de currículo ou de turmas."""
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def render_graph(graph: graphviz.Digraph, output_base: Path, formats: list, engine: str = "dot",
+                 cache: RenderCache = None) -> dict:
+    """
+    Gera todos os formatos pedidos com uma única execução do Graphviz: o
+    layout é calculado uma vez e cada formato é só uma saída diferente.
+    Formatos já presentes no cache não passam pelo Graphviz.
+    """
+    return render_cache.render(graph.source, output_base, formats, engine=engine, cache=cache)
+
+
+def write_formats(grafo: graphviz.Digraph, output_base: Path, formats: list, engine: str, cache: RenderCache,
+                  make_layout, layout_key: str = "") -> dict:
+    """
+    Grava os formatos pedidos de um grafo e devolve {formato: "hit" | "miss"}.
+    "json" (e o "svg" com --engine fases) vêm do layout próprio, criado por
+    `make_layout` só quando algum deles não está no cache; o resto vai para
+    o Graphviz. `layout_key` entra na chave do cache desses formatos, para
+    layouts que dependem de mais que o DOT (posições de outra versão).
+    """
+    results = {}
+    layout_formats = {"json": "to_json"}
+    if engine == PHASE_ENGINE:
+        layout_formats["svg"] = "to_svg"
+        engine = "dot"
+    layout = None
+
+    def produce(method):
+        nonlocal layout
+        layout = layout or make_layout()
+        return getattr(layout, method)()
+
+    for fmt, method in layout_formats.items():
+        if fmt in formats:
+            results[fmt] = render_cache.write_cached(f"{grafo.source}\n// layout {LAYOUT_VERSION}{layout_key}",
+                                                     output_base, fmt, PHASE_ENGINE, lambda: produce(method), cache)
+    formats = [fmt for fmt in formats if fmt not in layout_formats]
+    if formats:
+        results.update(render_graph(grafo, output_base, formats, engine, cache))
+    return results
+
+
+def render_curriculum(path: Path, source_dir: Path, output_dir: Path, formats: list, engine: str = "dot",
+                      cache_dir: Path = None, cache_max_bytes: int = DEFAULT_MAX_BYTES):
+    """Carrega, monta e renderiza um currículo, medindo o tempo de cada etapa."""
+    relative = path.relative_to(source_dir) if path != source_dir else Path(path.name)
+    timing = {"curriculum": str(relative.with_suffix("")), "nodes": 0, "edges": 0,
+              "load": 0.0, "process": 0.0, "build": 0.0, "layout": 0.0, "cache": {}, "error": None}
+    try:
+        started = time.perf_counter()
+        curriculum_data = load_json(path)
+        timing["load"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        generator = GraphGenerator(curriculum_data)
+        timing["process"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        grafo = generator.generate_graph()
+        grafo.engine = "dot" if engine == PHASE_ENGINE else engine
+        timing["build"] = time.perf_counter() - started
+        timing["nodes"] = len(generator.all_subjects)
+        timing["edges"] = sum(1 for line in grafo.body if "->" in line and "invis" not in line)
+
+        started = time.perf_counter()
+        output_base = output_dir / relative.with_suffix("")
+        cache = RenderCache(cache_dir, cache_max_bytes) if cache_dir else None
+        timing["cache"] = write_formats(grafo, output_base, formats, engine, cache, generator.generate_layout)
+        timing["layout"] = time.perf_counter() - started
+    except Exception as e:
+        stderr = getattr(e, "stderr", None)
+        timing["error"] = stderr.decode("utf-8", "replace").strip() if stderr else str(e)
+    return timing
+
+
+def curriculum_versions(curriculum_data: dict) -> list:
+    """Chaves das versões do currículo, da mais antiga para a mais recente."""
+    return sorted(curriculum_data.get("curriculos") or {}, key=lambda key: (len(key), key))
+
+
+def render_curriculum_versions(path: Path, source_dir: Path, output_dir: Path, formats: list, engine: str = "dot",
+                               cache_dir: Path = None, cache_max_bytes: int = DEFAULT_MAX_BYTES):
+    """
+    Renderiza todas as versões de um currículo em
+    `<saída>/versoes/<currículo>/<versão>.<formato>`, mais um diff.json com
+    a diferença estrutural entre versões consecutivas.
+
+    O layout próprio de cada versão parte do layout da anterior: as
+    disciplinas que não mudaram de fase mantêm a posição e só as novas ou
+    movidas são posicionadas, marcadas no SVG/JSON. Os formatos do
+    Graphviz não têm como fixar posições no dot, então cada versão tem o
+    próprio layout; versões iguais saem do cache de renderização.
+    """
+    relative = path.relative_to(source_dir) if path != source_dir else Path(path.name)
+    timing = {"curriculum": str(relative.with_suffix("")), "nodes": 0, "edges": 0,
+              "load": 0.0, "process": 0.0, "build": 0.0, "layout": 0.0, "cache": {}, "error": None,
+              "versions": 0, "reused": 0}
+    try:
+        started = time.perf_counter()
+        curriculum_data = load_json(path)
+        timing["load"] = time.perf_counter() - started
+
+        output_base = output_dir / VERSIONS_DIR / relative.with_suffix("")
+        cache = RenderCache(cache_dir, cache_max_bytes) if cache_dir else None
+        previous = previous_layout = None
+        diffs, rendered = [], []
+        for version in curriculum_versions(curriculum_data):
+            started = time.perf_counter()
+            generator = GraphGenerator(curriculum_data, version)
+            timing["process"] += time.perf_counter() - started
+            if not generator.all_subjects:
+                continue
+
+            started = time.perf_counter()
+            grafo = generator.generate_graph()
+            grafo.engine = "dot" if engine == PHASE_ENGINE else engine
+            status = {}
+            if previous is not None:
+                diffs.append(diff_versions(previous, generator))
+                status = diff_status(diffs[-1])
+            layout = generator.generate_layout(previous_layout, status)
+            timing["build"] += time.perf_counter() - started
+            timing["nodes"] += len(generator.all_subjects)
+            timing["edges"] += len(layout.edges)
+            timing["reused"] += layout.reused
+            timing["versions"] += 1
+            rendered.append(version)
+
+            started = time.perf_counter()
+            # As posições herdadas e as marcações mudam o layout sem mudar o DOT
+            layout_key = "\n// " + json.dumps([layout.rows_by_header(), status], sort_keys=True)
+            results = write_formats(grafo, output_base / version, formats, engine, cache, lambda: layout, layout_key)
+            timing["cache"].update({f"{version}.{fmt}": result for fmt, result in results.items()})
+            timing["layout"] += time.perf_counter() - started
+            previous, previous_layout = generator, layout
+
+        output_base.mkdir(parents=True, exist_ok=True)
+        with open(output_base / "diff.json", "w", encoding="utf-8") as f:
+            json.dump({"curso": curriculum_data.get("codigo"), "nome": curriculum_data.get("nome"),
+                       "versoes": rendered, "diferencas": diffs},
+                      f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        stderr = getattr(e, "stderr", None)
+        timing["error"] = stderr.decode("utf-8", "replace").strip() if stderr else str(e)
+    return timing
+
+
+def record_timing(timing: dict):
+    """Soma as etapas de um currículo (medidas no worker) ao relatório da execução."""
+    run = instrumentation.run
+    for stage in ("load", "process", "build", "layout"):
+        run.record(stage, timing[stage])
+    run.count("curricula")
+    run.count("nodes", timing["nodes"])
+    run.count("edges", timing["edges"])
+    if "versions" in timing:
+        run.count("versions", timing["versions"])
+        run.count("reused_nodes", timing["reused"])
+    for result in timing["cache"].values():
+        run.count(f"cache_{result}")
+    if timing["error"]:
+        run.count("errors")
+
+
+def render_all(source_dir: Path, output_dir: Path, formats: list, jobs: int = None,
+               engine: str = "dot", paths: list = None, cache_dir: Path = DEFAULT_CACHE_DIR,
+               cache_max_bytes: int = DEFAULT_MAX_BYTES, versions: bool = False) -> list:
+    """
+    Renderiza todos os currículos em paralelo, um processo por currículo
+    (com `versions`, todas as versões de cada um). Os arquivos maiores são
+    enviados primeiro para o tempo total ficar próximo do tempo do grafo
+    mais lento. O cache é limitado a `cache_max_bytes` uma vez só, no fim,
+    e não a cada arquivo gravado pelos processos.
+    """
+    job = render_curriculum_versions if versions else render_curriculum
+    paths = paths or find_curricula(source_dir)
+    paths = sorted(paths, key=lambda p: p.stat().st_size, reverse=True)
+
+    timings = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(job, path, source_dir, output_dir, formats, engine,
+                               cache_dir, None)
+                   for path in paths]
+        for future in as_completed(futures):
+            timing = future.result()
+            timings.append(timing)
+            record_timing(timing)
+            status = f"ERRO: {timing['error']}" if timing["error"] else f"{timing['layout']:.2f}s"
+            if timing["cache"] and all(r == "hit" for r in timing["cache"].values()):
+                status += " (cache)"
+            log.info("[%d/%d] %s %s", len(timings), len(paths), timing["curriculum"], status)
+
+    if cache_dir:
+        cache = RenderCache(cache_dir, cache_max_bytes)
+        with instrumentation.span("cache_evict"):
+            cache.evict()
+        instrumentation.count("cache_evictions", cache.evictions)
+    return timings
+
+
+def print_timings(timings: list, wall_time: float):
+    """Tabela por currículo, ordenada pelo tempo de layout."""
+    print()
+    print(f"{'Currículo':<70} {'Nós':>5} {'Arestas':>7} {'Carga':>8} {'Grafo':>8} {'Layout':>8}")
+    for t in sorted(timings, key=lambda t: t["layout"], reverse=True):
+        print(f"{t['curriculum'][:70]:<70} {t['nodes']:>5} {t['edges']:>7} "
+              f"{t['load'] + t['process']:>7.3f}s {t['build']:>7.3f}s {t['layout']:>7.3f}s")
+
+    failed = [t for t in timings if t["error"]]
+    slowest = max((t["load"] + t["process"] + t["build"] + t["layout"] for t in timings), default=0)
+    total = sum(t["load"] + t["process"] + t["build"] + t["layout"] for t in timings)
+    print()
+    print(f"{len(timings) - len(failed)}/{len(timings)} currículos em {wall_time:.2f}s "
+          f"(soma sequencial: {total:.2f}s, mais lento: {slowest:.2f}s)")
+    results = [r for t in timings for r in t["cache"].values()]
+    if results:
+        print(f"Cache: {results.count('hit')} hits, {results.count('miss')} misses "
+              f"({sum(1 for t in timings if 'miss' in t['cache'].values())} currículos re-renderizados)")
+    for t in failed:
+        print(f"  ERRO {t['curriculum']}: {t['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os grafos de todos os currículos.")
+    parser.add_argument("curricula", nargs="*", type=Path,
+                        help="JSONs específicos (padrão: todos em --source)")
+    parser.add_argument("--source", type=Path, default=RESOURCES_DIR, help="Pasta com os currículos")
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR, help="Pasta de saída")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help="Formatos separados por vírgula (ex: png,svg,dot,json)")
+    parser.add_argument("--engine", default="dot",
+                        help=f"Motor do Graphviz, ou '{PHASE_ENGINE}' para o layout próprio em colunas (só SVG)")
+    parser.add_argument("--jobs", type=int, help="Processos em paralelo (padrão: todos os núcleos)")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE_DIR, help="Pasta do cache de renderização")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Tamanho máximo do cache em MB")
+    parser.add_argument("--sem-cache", action="store_true", help="Sempre executa o Graphviz")
+    parser.add_argument("--timings", type=Path, help="Grava a tabela de tempos em JSON")
+    parser.add_argument("--versoes", action="store_true",
+                        help=f"Renderiza todas as versões de cada currículo em <saída>/{VERSIONS_DIR}, com o diff "
+                             f"entre elas (use com --engine {PHASE_ENGINE} para reaproveitar as posições)")
+    instrumentation.add_cli_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    paths = [path.resolve() for path in args.curricula] or None
+    source_dir = args.source.resolve()
+    if paths and not all(source_dir in path.parents for path in paths):
+        source_dir = Path(os.path.commonpath([path.parent for path in paths]))
+
+    started = time.perf_counter()
+    timings = render_all(source_dir, args.output, formats, jobs=args.jobs, engine=args.engine, paths=paths,
+                         cache_dir=None if args.sem_cache else args.cache,
+                         cache_max_bytes=args.cache_mb * 1024 * 1024, versions=args.versoes)
+    print_timings(timings, time.perf_counter() - started)
+
+    if args.timings:
+        with open(args.timings, "w", encoding="utf-8") as f:
+            json.dump(timings, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 import json
-import re
 from collections import defaultdict
 from pathlib import Path
 
 import graphviz
 
-SUBJECT_CODE_REGEX = re.compile("[A-Z]{3}[0-9]{4}")
+from graph_gen import write_formats
+from phase_layout import PhaseLayout
+from prerequisites import PrerequisiteIndex
+from render_cache import RenderCache
 
 # The order may appear chaotic (and it is)
 # but it makes the output much prettier
@@ -40,6 +42,10 @@ class GraphGenerator:
     def __init__(self, curriculum_data):
         self.curriculum_data = self.load_data(curriculum_data)
         self._remove_undesired_fases()
+        self.prerequisite_index = PrerequisiteIndex(
+            (subject for subjects in self.curriculum_data.values() for subject in subjects),
+            prerequisite_field="pre_requisito",
+        )
 
         # small hack that increments the counter for new values
         self.color_counter = defaultdict(lambda: len(self.color_counter))
@@ -61,6 +67,35 @@ class GraphGenerator:
         self._force_order(graph)
         return graph
 
+    def generate_layout(self) -> PhaseLayout:
+        """
+        Same graph laid out in phase columns without Graphviz
+        """
+        columns = []
+        for fase, subjects in self.curriculum_data.items():
+            nodes = [{"id": subject["codigo"], "label": self._get_subject_label(subject),
+                      "color": self._get_subject_color(subject), "tooltip": subject["descricao"]}
+                     for subject in subjects]
+            columns.append((fase, nodes))
+
+        all_subjects_code = {node["id"] for _, nodes in columns for node in nodes}
+        edges = []
+        for subjects in self.curriculum_data.values():
+            for subject in subjects:
+                color = self._get_subject_color(subject)
+                for prerequisite in self.prerequisite_index.prerequisite_codes(subject["codigo"]):
+                    if prerequisite in all_subjects_code:
+                        edges.append((prerequisite, subject["codigo"], color))
+        return PhaseLayout(columns, edges)
+
+    def render(self, output_base, formats=("png",), engine="dot", cache: RenderCache = None) -> dict:
+        """
+        Renders the graph to `<output_base>.<format>`, reusing the cached
+        output when the generated source has been rendered before.
+        "json" (and "svg" with engine="fases") come from generate_layout.
+        """
+        return write_formats(self.generate_graph(), output_base, list(formats), engine, cache, self.generate_layout)
+
     def _remove_undesired_fases(self):
         """
         Keep only regurar obrigatory subjects
@@ -115,8 +150,8 @@ class GraphGenerator:
 
         for subjects in self.curriculum_data.values():
             for subject in subjects:
-                for prerequisite in SUBJECT_CODE_REGEX.findall(
-                    subject["pre_requisito"]
+                for prerequisite in self.prerequisite_index.prerequisite_codes(
+                    subject["codigo"]
                 ):
                     if prerequisite not in all_subjects_code:
                         continue
@@ -0,0 +1,247 @@
+import itertools
+import json
+from collections import defaultdict
+from xml.sax.saxutils import escape, quoteattr
+
+ENGINE_NAME = "fases"
+
+# Part of the render cache key of the SVG/JSON outputs: bump it whenever a
+# change here alters the output, so cached layouts are not served stale
+LAYOUT_VERSION = 2
+
+# Outline of the nodes marked by a version diff ("status" of the node)
+STATUS_COLORS = {"added": "#1a9641", "moved": "#2b83ba", "changed": "#fdae61"}
+
+# colorscheme=set36 of the DOT layouts (ColorBrewer Set3, 6 classes)
+SET36 = {"1": "#8dd3c7", "2": "#ffffb3", "3": "#bebada", "4": "#fb8072", "5": "#80b1d3", "6": "#fdb462"}
+
+# Sizes in points, matching the DOT defaults (width=1.4 height=.5, fontsize 14)
+NODE_WIDTH = 101
+NODE_MIN_HEIGHT = 36
+FONT_SIZE = 14
+LINE_HEIGHT = 16
+HEADER_HEIGHT = 40
+MARGIN = 8
+TRACK_SPACING = 4
+GAP_MIN = 18
+CHANNEL_MIN = 36
+
+
+class PhaseLayout:
+    """
+    Layout for curriculum graphs whose shape is known in advance: one
+    column per phase, nodes stacked in the given order, so no layout
+    engine has to search for positions.
+
+    Every node sits on a shared row grid, which leaves two kinds of free
+    space: vertical channels between the columns and horizontal gaps
+    between the rows. An edge leaves the right side of its source, runs
+    down the channel after the source column, crosses the intermediate
+    columns along the gap above the target row, and enters the target
+    from the channel before the target column. Each edge gets its own
+    track in each channel and gap, and those are widened to fit the
+    tracks. The routing is orthogonal, like splines=ortho, and linear in
+    the number of edges.
+
+    `columns` is a list of (header, nodes), where each node is a dict with
+    "id", "label", "color" (a set36 index or any SVG color) and optional
+    "tooltip" and "status" (a key of STATUS_COLORS, drawn as a thicker
+    outline). `edges` is a list of (source id, target id, color).
+
+    With `previous` (the layout of an earlier version of the curriculum),
+    every node that is still under the same header keeps its row, and only
+    the other nodes are placed, in the free rows of their column. Rows
+    left empty by removed nodes stay empty unless a new node takes them,
+    so unchanged courses do not move between versions. `reused` counts
+    the nodes that kept their row.
+    """
+
+    def __init__(self, columns: list, edges: list, previous: "PhaseLayout" = None):
+        self.columns = columns
+        self.edges = [edge for edge in edges if edge[0] != edge[1]]
+
+        previous_rows = previous.rows_by_header() if previous is not None else {}
+        self.position = {}
+        self.reused = 0
+        for column, (header, nodes) in enumerate(columns):
+            kept = previous_rows.get(header, {})
+            taken = set()
+            pending = []
+            for node in nodes:
+                row = kept.get(node["id"])
+                if row is None:
+                    pending.append(node)
+                    continue
+                self.position[node["id"]] = (column, row)
+                taken.add(row)
+            self.reused += len(nodes) - len(pending)
+            free = (row for row in itertools.count() if row not in taken)
+            for node in pending:
+                self.position[node["id"]] = (column, next(free))
+        self.edges = [edge for edge in self.edges if edge[0] in self.position and edge[1] in self.position]
+
+        lines = [len(node["label"].split("\n")) for _, nodes in columns for node in nodes]
+        # Spacing never shrinks from the previous version, so kept nodes keep their coordinates too
+        self.node_height = max([NODE_MIN_HEIGHT, getattr(previous, "node_height", 0)]
+                               + [n * LINE_HEIGHT + 8 for n in lines])
+        self.rows = max([row + 1 for _, row in self.position.values()] + [0])
+
+        # Channel c runs just left of column c (channel len(columns) closes the right side);
+        # gap r runs just above row r.
+        channel_tracks = defaultdict(list)
+        gap_tracks = defaultdict(list)
+        for index, (source, target, _) in enumerate(self.edges):
+            source_column, source_row = self.position[source]
+            target_column, target_row = self.position[target]
+            channel_tracks[source_column + 1].append(index)
+            if target_column != source_column + 1:
+                channel_tracks[target_column].append(index)
+                gap_tracks[target_row].append(index)
+
+        self.channel_width = max([CHANNEL_MIN, getattr(previous, "channel_width", 0)]
+                                 + [(len(t) + 1) * TRACK_SPACING for t in channel_tracks.values()])
+        self.gap_height = max([GAP_MIN, getattr(previous, "gap_height", 0)]
+                              + [(len(t) + 1) * TRACK_SPACING for t in gap_tracks.values()])
+        self.tracks = {}
+        for channel, indices in channel_tracks.items():
+            for slot, index in enumerate(self._spread(indices, channel_axis=True), start=1):
+                self.tracks[("channel", channel, index)] = self._channel_x(channel) + slot * TRACK_SPACING
+        for row, indices in gap_tracks.items():
+            for slot, index in enumerate(self._spread(indices, channel_axis=False), start=1):
+                self.tracks[("gap", row, index)] = self._row_y(row) - self.gap_height + slot * TRACK_SPACING
+
+        self.width = self._channel_x(len(columns)) + self.channel_width + MARGIN
+        self.height = self._row_y(self.rows) + MARGIN
+
+    def rows_by_header(self) -> dict:
+        """{header: {node id: row}}, what a later version needs to keep the same rows."""
+        rows = {}
+        for header, nodes in self.columns:
+            rows[header] = {node["id"]: self.position[node["id"]][1] for node in nodes}
+        return rows
+
+    def _spread(self, indices, channel_axis):
+        # Ordering the tracks by the rows they connect keeps most edges from crossing each other
+        if channel_axis:
+            return sorted(indices, key=lambda i: (self.position[self.edges[i][0]][1],
+                                                  self.position[self.edges[i][1]][1]))
+        return sorted(indices, key=lambda i: (self.position[self.edges[i][0]][0],
+                                              self.position[self.edges[i][1]][0]))
+
+    def _channel_x(self, channel: int) -> float:
+        return MARGIN + channel * (self.channel_width + NODE_WIDTH)
+
+    def _column_x(self, column: int) -> float:
+        return self._channel_x(column) + self.channel_width
+
+    def _row_y(self, row: int) -> float:
+        return MARGIN + HEADER_HEIGHT + row * (self.node_height + self.gap_height) + self.gap_height
+
+    def node_box(self, node_id: str):
+        """(x, y, width, height) of a node, top-left origin."""
+        column, row = self.position[node_id]
+        return self._column_x(column), self._row_y(row), NODE_WIDTH, self.node_height
+
+    def route(self, index: int) -> list:
+        """Polyline points of edge `index`, from the source's right side to the target's left side."""
+        source, target, _ = self.edges[index]
+        source_column, source_row = self.position[source]
+        target_column, target_row = self.position[target]
+        start_x = self._column_x(source_column) + NODE_WIDTH
+        start_y = self._row_y(source_row) + self.node_height / 2
+        end_x = self._column_x(target_column)
+        end_y = self._row_y(target_row) + self.node_height / 2
+
+        out_x = self.tracks[("channel", source_column + 1, index)]
+        if target_column == source_column + 1:
+            points = [(start_x, start_y), (out_x, start_y), (out_x, end_y), (end_x, end_y)]
+        else:
+            gap_y = self.tracks[("gap", target_row, index)]
+            in_x = self.tracks[("channel", target_column, index)]
+            points = [(start_x, start_y), (out_x, start_y), (out_x, gap_y),
+                      (in_x, gap_y), (in_x, end_y), (end_x, end_y)]
+
+        # Drop the zero-length segments left when source and target share a row
+        simplified = [points[0]]
+        for point in points[1:]:
+            if point != simplified[-1]:
+                simplified.append(point)
+        return simplified
+
+    def to_svg(self) -> str:
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8" standalone="no"?>',
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width:.0f}pt" height="{self.height:.0f}pt" '
+            f'viewBox="0 0 {self.width:.2f} {self.height:.2f}">',
+            '<g id="graph0" class="graph" font-family="Arial" font-size="14">',
+        ]
+
+        for column, (header, _) in enumerate(self.columns):
+            x = self._column_x(column) + NODE_WIDTH / 2
+            parts.append(f'<text class="header" x="{x:.2f}" y="{MARGIN + HEADER_HEIGHT / 2:.2f}" '
+                         f'text-anchor="middle" font-weight="bold" font-size="16">{escape(str(header))}</text>')
+
+        for index, (source, target, color) in enumerate(self.edges):
+            points = self.route(index)
+            stroke = _color(color)
+            path = " ".join(f"{x:.2f},{y:.2f}" for x, y in points)
+            end_x, end_y = points[-1]
+            parts.append(f'<g class="edge"><title>{escape(source)}&#45;&gt;{escape(target)}</title>')
+            parts.append(f'<polyline fill="none" stroke="{stroke}" stroke-width="2" points="{path}"/>')
+            # arrowhead=tee
+            parts.append(f'<polyline fill="none" stroke="{stroke}" stroke-width="2" '
+                         f'points="{end_x - 3:.2f},{end_y - 5:.2f} {end_x - 3:.2f},{end_y + 5:.2f}"/></g>')
+
+        for _, nodes in self.columns:
+            for node in nodes:
+                x, y, width, height = self.node_box(node["id"])
+                lines = node["label"].split("\n")
+                first_y = y + height / 2 - (len(lines) - 1) * LINE_HEIGHT / 2 + FONT_SIZE * 0.35
+                status = node.get("status")
+                outline = (f'stroke="{STATUS_COLORS[status]}" stroke-width="4"' if status in STATUS_COLORS
+                           else f'stroke="{_color(node.get("color"))}"')
+                parts.append(f'<g id={quoteattr(node["id"])} class="node{" " + status if status else ""}">'
+                             f'<title>{escape(node.get("tooltip") or node["id"])}</title>')
+                parts.append(f'<rect x="{x:.2f}" y="{y:.2f}" width="{width}" height="{height}" '
+                             f'fill="{_color(node.get("color"))}" {outline}/>')
+                for i, line in enumerate(lines):
+                    if line:
+                        parts.append(f'<text x="{x + width / 2:.2f}" y="{first_y + i * LINE_HEIGHT:.2f}" '
+                                     f'text-anchor="middle">{escape(line)}</text>')
+                parts.append('</g>')
+
+        parts.append('</g>')
+        parts.append('</svg>')
+        return "\n".join(parts) + "\n"
+
+    def to_dict(self) -> dict:
+        """
+        Positions of the layout for client-side rendering: nodes with their
+        label lines, phase and colour, edges with their route, all in the
+        same coordinates as the SVG (points, top-left origin).
+        """
+        nodes = []
+        for column, (header, column_nodes) in enumerate(self.columns):
+            for node in column_nodes:
+                x, y, width, height = self.node_box(node["id"])
+                nodes.append({"id": node["id"], "label": node["label"].split("\n"), "phase": str(header),
+                              "column": column, "color": _color(node.get("color")),
+                              "tooltip": node.get("tooltip") or node["id"],
+                              "x": round(x, 1), "y": round(y, 1), "width": width, "height": height,
+                              **({"status": node["status"]} if node.get("status") else {})})
+
+        edges = [{"source": source, "target": target, "color": _color(color),
+                  "points": [[round(x, 1), round(y, 1)] for x, y in self.route(index)]}
+                 for index, (source, target, color) in enumerate(self.edges)]
+
+        phases = [{"label": str(header), "x": round(self._column_x(column) + NODE_WIDTH / 2, 1)}
+                  for column, (header, _) in enumerate(self.columns)]
+        return {"width": round(self.width, 1), "height": round(self.height, 1),
+                "phases": phases, "nodes": nodes, "edges": edges}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+
+def _color(color) -> str:
+    return SET36.get(str(color), color or SET36["1"])
@@ -0,0 +1,195 @@
+import re
+from array import array
+
+TOKEN_REGEX = re.compile(r"[A-Z]{3}[0-9]{4}|\(|\)|\bou\b|\be\b")
+
+AND = "e"
+OR = "ou"
+
+
+class _ParseError(Exception):
+    pass
+
+
+def parse_expression(text: str, intern) -> object:
+    """
+    Parses a sisacad requirement string ("A e (B ou C)") into nested tuples:
+    a course id (int) or (AND | OR, (operand, ...)). "e" binds tighter than
+    "ou", as in "A ou B e C" == "A ou (B e C)". Returns None for an empty
+    requirement. Malformed strings ("Inválida: ...", unbalanced parentheses)
+    fall back to requiring every code they mention, which is what the
+    regex-only edge builders used to assume.
+    """
+    tokens = TOKEN_REGEX.findall(text or "")
+    if not tokens:
+        return None
+
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or():
+        nonlocal position
+        operands = [parse_and()]
+        while peek() == OR:
+            position += 1
+            operands.append(parse_and())
+        return operands[0] if len(operands) == 1 else (OR, tuple(operands))
+
+    def parse_and():
+        nonlocal position
+        operands = [parse_atom()]
+        while peek() == AND:
+            position += 1
+            operands.append(parse_atom())
+        return operands[0] if len(operands) == 1 else (AND, tuple(operands))
+
+    def parse_atom():
+        nonlocal position
+        token = peek()
+        position += 1
+        if token == "(":
+            node = parse_or()
+            if peek() != ")":
+                raise _ParseError(text)
+            position += 1
+            return node
+        if token is None or token in (AND, OR, ")"):
+            raise _ParseError(text)
+        return intern(token)
+
+    try:
+        expression = parse_or()
+        if position != len(tokens):
+            raise _ParseError(text)
+        return expression
+    except _ParseError:
+        codes = [intern(token) for token in tokens if token not in (AND, OR, "(", ")")]
+        if not codes:
+            return None
+        return codes[0] if len(codes) == 1 else (AND, tuple(codes))
+
+
+def expression_codes(expression) -> list:
+    """Ids mentioned by an expression, in order of appearance, without repeats."""
+    seen = {}
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if isinstance(node, int):
+            seen.setdefault(node, None)
+        else:
+            stack.extend(reversed(node[1]))
+    return list(seen)
+
+
+def is_satisfied(expression, completed) -> bool:
+    """Evaluates an expression against a set of completed course ids."""
+    if expression is None:
+        return True
+    if isinstance(expression, int):
+        return expression in completed
+    operator, operands = expression
+    if operator == AND:
+        return all(is_satisfied(operand, completed) for operand in operands)
+    return any(is_satisfied(operand, completed) for operand in operands)
+
+
+class PrerequisiteIndex:
+    """
+    Prerequisite structure of one curriculum, compiled once and shared by
+    the graph generators and any later analysis.
+
+    Course codes are interned to dense integer ids. The curriculum's own
+    courses come first (ids `0 .. len(courses) - 1`, in input order);
+    codes that only appear inside a requirement get the following ids.
+    Each requirement is kept as a parsed AND/OR expression, and the edges
+    it implies are stored as forward (prerequisite -> course) and reverse
+    (course -> prerequisite) adjacency in CSR form: the neighbours of `i`
+    are `targets[offsets[i]:offsets[i + 1]]`, in order of appearance.
+    """
+
+    def __init__(self, subjects, prerequisite_field: str = "prerequisito",
+                 equivalence_field: str = "equivalencia"):
+        self.codes = []
+        self.ids = {}
+
+        subjects = list(subjects)
+        for subject in subjects:
+            self.intern(subject["codigo"])
+        self.num_courses = len(self.codes)
+
+        self.requirements = [None] * self.num_courses
+        self.equivalences = [None] * self.num_courses
+        for subject in subjects:
+            course = self.ids[subject["codigo"]]
+            self.requirements[course] = parse_expression(subject.get(prerequisite_field), self.intern)
+            self.equivalences[course] = parse_expression(subject.get(equivalence_field), self.intern)
+
+        predecessors = [expression_codes(self.requirements[course]) if course < self.num_courses else []
+                        for course in range(len(self.codes))]
+        self.pred_offsets, self.pred = self._csr(predecessors)
+
+        successors = [[] for _ in self.codes]
+        for course, prerequisites in enumerate(predecessors):
+            for prerequisite in prerequisites:
+                successors[prerequisite].append(course)
+        self.succ_offsets, self.succ = self._csr(successors)
+
+    @staticmethod
+    def _csr(adjacency):
+        offsets = array("i", [0])
+        targets = array("i")
+        for neighbours in adjacency:
+            targets.extend(neighbours)
+            offsets.append(len(targets))
+        return offsets, targets
+
+    def intern(self, code: str) -> int:
+        course = self.ids.get(code)
+        if course is None:
+            course = self.ids[code] = len(self.codes)
+            self.codes.append(code)
+        return course
+
+    def __len__(self):
+        return len(self.codes)
+
+    def prerequisites(self, course: int):
+        """Ids of every course mentioned in the requirement of `course`."""
+        return self.pred[self.pred_offsets[course]:self.pred_offsets[course + 1]]
+
+    def dependents(self, course: int):
+        """Ids of the courses whose requirement mentions `course`."""
+        return self.succ[self.succ_offsets[course]:self.succ_offsets[course + 1]]
+
+    def prerequisite_codes(self, code: str) -> list:
+        course = self.ids.get(code)
+        if course is None:
+            return []
+        return [self.codes[prerequisite] for prerequisite in self.prerequisites(course)]
+
+    def is_available(self, code: str, completed_codes) -> bool:
+        """Whether the requirement of `code` is met by the completed course codes."""
+        course = self.ids.get(code)
+        if course is None or course >= self.num_courses:
+            return True
+        completed = {self.ids[c] for c in completed_codes if c in self.ids}
+        return is_satisfied(self.requirements[course], completed)
+
+    def edges(self, members=None):
+        """
+        (prerequisite, course) code pairs, grouped by course in input order.
+        With `members`, only edges between codes in that set are produced.
+        """
+        for course in range(self.num_courses):
+            code = self.codes[course]
+            if members is not None and code not in members:
+                continue
+            for prerequisite in self.prerequisites(course):
+                prerequisite_code = self.codes[prerequisite]
+                if members is None or prerequisite_code in members:
+                    yield prerequisite_code, code
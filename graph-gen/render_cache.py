@@ -0,0 +1,177 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".render_cache"
+
+# 512 MB is a few thousand PNG/SVG renders of the largest curricula
+DEFAULT_MAX_BYTES = int(os.environ.get("GRAPH_RENDER_CACHE_MB", "512")) * 1024 * 1024
+
+
+class RenderCache:
+    """
+    On-disk cache of Graphviz output, addressed by the hash of the DOT
+    source, the layout engine and the output format. The same graph is
+    never laid out twice: unchanged curricula are served from the cache.
+
+    Entries live in `<directory>/<key[:2]>/<key>.<format>` and are written
+    atomically, so several processes can share one cache directory. The
+    modification time of an entry is refreshed on every hit and the least
+    recently used entries are evicted once the cache grows past `max_bytes`.
+    The size is scanned from disk once and then tracked in memory, so a put
+    only touches the directory again when it goes over the limit. With
+    `max_bytes` None nothing is evicted on put: batch renders (render_all)
+    run evict() once at the end instead.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Total size of the entries, as of the last scan plus what this process added
+        self.size = None
+
+    @staticmethod
+    def key(source: str, engine: str, fmt: str) -> str:
+        digest = hashlib.sha256()
+        for part in (engine, fmt, source):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def path(self, key: str, fmt: str) -> Path:
+        return self.directory / key[:2] / f"{key}.{fmt}"
+
+    def copy_to(self, key: str, fmt: str, destination) -> bool:
+        """
+        Copies the cached artifact to `destination`. Returns False on a miss,
+        including an entry evicted by another process before the copy ended,
+        so a hit is only counted once the output file exists.
+        """
+        path = self.path(key, fmt)
+        try:
+            os.utime(path)
+            shutil.copyfile(path, destination)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def put(self, key: str, fmt: str, artifact: Path) -> Path:
+        """Moves a freshly rendered file into the cache."""
+        path = self.path(key, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = artifact.stat().st_size
+        os.replace(artifact, path)
+        if self.max_bytes is None:
+            return path
+        if self.size is None:
+            self.evict()
+        else:
+            self.size += size
+            if self.size > self.max_bytes:
+                self.evict()
+        return path
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in max_bytes (a full scan)."""
+        entries = []
+        total = 0
+        # Only the two-character shard directories hold entries; renders in
+        # progress live in ".render_*" temporary directories.
+        for entry in self.directory.glob("??/*"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, entry in entries:
+            if self.max_bytes is None or total <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.size = total
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def render(source: str, output_base: Path, formats, engine: str = "dot", cache: RenderCache = None) -> dict:
+    """
+    Writes `<output_base>.<format>` for every requested format and returns
+    {format: "hit" | "miss"}. All formats missing from the cache are
+    produced by a single Graphviz run (one -T/-o pair per format), so the
+    layout is computed at most once. The "dot" format is the source itself.
+    """
+    output_base = Path(output_base)
+    output_base.parent.mkdir(parents=True, exist_ok=True)
+    result = {}
+
+    missing = []
+    for fmt in formats:
+        if fmt == "dot":
+            with open(f"{output_base}.dot", "w", encoding="utf-8") as dot_file:
+                dot_file.write(source)
+            continue
+        if cache and cache.copy_to(cache.key(source, engine, fmt), fmt, f"{output_base}.{fmt}"):
+            result[fmt] = "hit"
+            continue
+        missing.append(fmt)
+
+    if not missing:
+        return result
+
+    # Rendering inside the cache directory keeps the final move a rename
+    tmp_parent = cache.directory if cache else output_base.parent
+    tmp_parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=tmp_parent, prefix=".render_") as tmp:
+        args = []
+        for fmt in missing:
+            args += [f"-T{fmt}", f"-o{Path(tmp) / ('out.' + fmt)}"]
+        subprocess.run([engine, *args], input=source.encode("utf-8"), check=True, capture_output=True)
+
+        for fmt in missing:
+            artifact = Path(tmp) / f"out.{fmt}"
+            shutil.copyfile(artifact, f"{output_base}.{fmt}")
+            if cache:
+                cache.put(cache.key(source, engine, fmt), fmt, artifact)
+            result[fmt] = "miss"
+    return result
+
+
+def write_cached(source: str, output_base: Path, fmt: str, engine: str, produce, cache: RenderCache = None) -> str:
+    """
+    Writes `<output_base>.<fmt>` for outputs built in Python rather than by
+    Graphviz (e.g. the phase layout). They are cached under the same key
+    scheme, so `produce()` (returning the file's text) only runs when the
+    DOT source, engine or format changed. Returns "hit" or "miss".
+    """
+    output_base = Path(output_base)
+    output_base.parent.mkdir(parents=True, exist_ok=True)
+    key = cache.key(source, engine, fmt) if cache else None
+    if cache and cache.copy_to(key, fmt, f"{output_base}.{fmt}"):
+        return "hit"
+
+    content = produce()
+    with open(f"{output_base}.{fmt}", "w", encoding="utf-8") as output_file:
+        output_file.write(content)
+    if cache:
+        cache.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=cache.directory,
+                                         prefix=".render_", delete=False) as tmp:
+            tmp.write(content)
+        cache.put(key, fmt, Path(tmp.name))
+    return "miss"
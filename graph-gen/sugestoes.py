@@ -0,0 +1,287 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+from graph_gen import RESOURCES_DIR, TURMAS_DIR, load_json
+from prerequisites import PrerequisiteIndex, is_satisfied
+
+# Weight of a class = weekly classes * phase priority + seats bonus. The
+# phase priority goes from 2 (first phase) down to 1 (last phase), so
+# courses the student is behind on come first; open seats only break ties.
+SEATS_BONUS = 0.5
+SEATS_CAP = 10
+
+
+def latest_curriculum(curriculum_json: dict, curriculum_id=None) -> dict:
+    """The requested curriculum version, or the latest one (like GraphGenerator)."""
+    curriculos = curriculum_json.get("curriculos") or {}
+    if curriculum_id is not None and str(curriculum_id) in curriculos:
+        return curriculos[str(curriculum_id)]
+    key = next(reversed(curriculos), None)
+    return curriculos.get(key, {})
+
+
+def load_offering(turmas_dir: Path, course_code=None) -> list:
+    """
+    Classes of the current offering. When `course_code` has its own
+    turmas_curso_<code>.json, only that file is read: it holds every class
+    reserved for the course, including other departments' ones.
+    """
+    turmas_dir = Path(turmas_dir)
+    own_file = turmas_dir / f"turmas_curso_{course_code}.json"
+    paths = [own_file] if course_code is not None and own_file.exists() else sorted(turmas_dir.glob("turmas_curso_*.json"))
+
+    classes = {}
+    for path in paths:
+        turmas = load_json(path).get("turmas")
+        if isinstance(turmas, dict):
+            for turma in turmas.values():
+                classes[turma["shortname"]] = turma
+    return list(classes.values())
+
+
+def slot_mask(slots) -> int:
+    mask = 0
+    for slot in slots or ():
+        mask |= 1 << int(slot)
+    return mask
+
+
+class ScheduleSuggester:
+    """
+    Suggests conflict-free schedules for a student from the transcript
+    parsed by pdf_parser (cursadas / dispensadas / andamento) and the
+    curriculum JSON, without touching the database.
+
+    Eligibility evaluates the compiled prerequisite expressions: a course
+    is eligible when it is not done yet and its AND/OR requirement is met.
+    Courses in progress count as done, as on the sugestoes page, and so
+    does any course whose equivalence is met.
+
+    The search picks at most one class per course. It is a depth-first
+    branch and bound over courses, in decreasing order of their best class:
+
+    - a class is pruned with a single AND when its slot mask overlaps the
+      slots already taken, or when it exceeds the weekly class budget;
+    - a branch is cut when its score plus a fractional-knapsack bound of
+      the remaining courses cannot beat the k-th best schedule found.
+
+    Only maximal schedules are kept, and one per set of courses, so the
+    suggestions are not the same schedule with a course dropped or with
+    another class of the same courses.
+    """
+
+    def __init__(self, curriculum_json: dict, curriculum_id=None, include_optional=False):
+        self.curriculum = latest_curriculum(curriculum_json, curriculum_id)
+        self.subjects = self.curriculum.get("ucs") or {}
+        self.index = PrerequisiteIndex(self.subjects.values())
+        self.include_optional = include_optional
+
+        phases = [int(s["fase_sugestao"]) for s in self.subjects.values()
+                  if str(s.get("fase_sugestao", "")).isdigit() and int(s["fase_sugestao"]) != 999]
+        self.last_phase = max(phases, default=1)
+
+    @property
+    def max_weekly_classes(self) -> int:
+        return int(self.curriculum.get("aulas_semana_max") or 0)
+
+    def completed(self, transcript: dict) -> set:
+        """Ids of every course that counts as done for the student."""
+        # Codes missing from the curriculum cannot satisfy any of its requirements
+        done = {self.index.ids[course["codigo"]]
+                for status in ("cursadas", "dispensadas", "andamento")
+                for course in transcript.get(status, [])
+                if course["codigo"] in self.index.ids}
+        for course in range(self.index.num_courses):
+            if course not in done and self.index.equivalences[course] is not None \
+                    and is_satisfied(self.index.equivalences[course], done):
+                done.add(course)
+        return done
+
+    def eligible(self, transcript: dict) -> list:
+        """Codes of the curriculum courses the student can enroll in, by phase."""
+        done = self.completed(transcript)
+        codes = []
+        for code, subject in self.subjects.items():
+            if not self.include_optional and "1" not in subject.get("etiquetas", []):
+                continue
+            course = self.index.ids[code]
+            if course not in done and is_satisfied(self.index.requirements[course], done):
+                codes.append(code)
+        return sorted(codes, key=lambda code: (self._phase(code), code))
+
+    def _phase(self, code: str) -> int:
+        phase = str(self.subjects.get(code, {}).get("fase_sugestao", ""))
+        return int(phase) if phase.isdigit() and int(phase) != 999 else self.last_phase
+
+    def _value(self, turma: dict) -> float:
+        priority = 1 + (self.last_phase - self._phase(turma["codigo_disciplina"])) / max(self.last_phase, 1)
+        seats = min(max(turma.get("saldo_vagas") or 0, 0), SEATS_CAP) / SEATS_CAP
+        return (turma.get("num_aulas_semana") or 0) * priority + SEATS_BONUS * seats
+
+    def suggest(self, transcript: dict, offering: list, k: int = 5, max_weekly_classes: int = None,
+                include_full: bool = False) -> dict:
+        """
+        Top-k schedules by score, each a list of classes, plus the eligible
+        courses. Only maximal schedules (no other class fits) are returned,
+        one per set of courses, with its best choice of classes.
+        """
+        budget = max_weekly_classes or self.max_weekly_classes or float("inf")
+        eligible = self.eligible(transcript)
+        eligible_set = set(eligible)
+
+        by_course = {}
+        for turma in offering:
+            if turma["codigo_disciplina"] not in eligible_set:
+                continue
+            if not include_full and (turma.get("saldo_vagas") or 0) <= 0:
+                continue
+            hours = turma.get("num_aulas_semana") or 0
+            if hours > budget:
+                continue
+            option = (self._value(turma), hours, slot_mask(turma.get("sequenciais_horas_ocupadas")), turma)
+            by_course.setdefault(turma["codigo_disciplina"], []).append(option)
+
+        # Best options first, so the first descent already finds a good schedule
+        courses = []
+        for options in by_course.values():
+            options.sort(key=lambda option: option[0], reverse=True)
+            courses.append(options)
+        courses.sort(key=lambda options: options[0][0], reverse=True)
+
+        # Upper bound of what courses[i:] can add: a fractional knapsack
+        # ignoring conflicts, where each course is worth its best value at
+        # its best value per weekly class.
+        density_order = []
+        for i, options in enumerate(courses):
+            value = options[0][0]
+            density = max(o[0] / o[1] if o[1] else float("inf") for o in options)
+            hours = value / density if density != float("inf") else 0
+            density_order.append((density, i, value, hours))
+        density_order.sort(reverse=True)
+
+        def bound(start, remaining):
+            total = 0.0
+            for _, i, value, hours in density_order:
+                if i < start:
+                    continue
+                if hours <= remaining:
+                    total += value
+                    remaining -= hours
+                else:
+                    return total + value * remaining / hours
+            return total
+
+        # Course set -> (score, counter, classes): one entry per set of
+        # courses, with its best choice of classes
+        best = {}
+        counter = 0
+        stats = {"nodes": 0, "pruned": 0}
+
+        def floor():
+            return min(entry[0] for entry in best.values()) if len(best) == k else float("-inf")
+
+        def maximal(used, hours, taken):
+            """Whether no class of a course not taken still fits in the schedule."""
+            for i, options in enumerate(courses):
+                if i in taken:
+                    continue
+                for _, class_hours, mask, _ in options:
+                    if not mask & used and hours + class_hours <= budget:
+                        return False
+            return True
+
+        def record(score, chosen, taken):
+            nonlocal counter
+            key = frozenset(taken)
+            current = best.get(key)
+            if current is not None and current[0] >= score:
+                return
+            if current is None and len(best) == k:
+                worst = min(best, key=lambda key: best[key][:2])
+                if score <= best[worst][0]:
+                    return
+                del best[worst]
+            counter += 1
+            best[key] = (score, counter, list(chosen))
+
+        def search(start, used, hours, score, chosen, taken):
+            stats["nodes"] += 1
+            # Only maximal schedules: a schedule that still has room for
+            # another class is a strict subset of a better suggestion
+            if chosen and score > floor() and maximal(used, hours, taken):
+                record(score, chosen, taken)
+
+            for i in range(start, len(courses)):
+                if len(best) == k and score + bound(i, budget - hours) <= floor():
+                    stats["pruned"] += 1
+                    return
+                for value, class_hours, mask, turma in courses[i]:
+                    if mask & used or hours + class_hours > budget:
+                        continue
+                    chosen.append(turma)
+                    taken.add(i)
+                    search(i + 1, used | mask, hours + class_hours, score + value, chosen, taken)
+                    taken.discard(i)
+                    chosen.pop()
+
+        started = time.perf_counter()
+        search(0, 0, 0, 0.0, [], set())
+        stats["time"] = time.perf_counter() - started
+
+        schedules = []
+        for score, _, classes in sorted(best.values(), key=lambda entry: (-entry[0], entry[1])):
+            schedules.append({
+                "score": round(score, 3),
+                "aulas_semana": sum(turma.get("num_aulas_semana") or 0 for turma in classes),
+                "turmas": [{
+                    "codigo_disciplina": turma["codigo_disciplina"],
+                    "codigo_turma": turma["codigo_turma"],
+                    "nome_disciplina": turma.get("nome_disciplina"),
+                    "fase": self._phase(turma["codigo_disciplina"]),
+                    "num_aulas_semana": turma.get("num_aulas_semana"),
+                    "saldo_vagas": turma.get("saldo_vagas"),
+                    "horarios": sorted(int(s) for s in (turma.get("sequenciais_horas_ocupadas") or ())),
+                } for turma in sorted(classes, key=lambda t: (self._phase(t["codigo_disciplina"]), t["codigo_disciplina"]))],
+            })
+        return {"elegiveis": eligible, "sugestoes": schedules, "busca": stats}
+
+
+def find_curriculum_file(course_code, source: Path = RESOURCES_DIR):
+    """Curriculum JSON of a course code (the "codigo" field), searched in the backend resources."""
+    for path in sorted(Path(source).rglob("*.json")):
+        if path.name.startswith(f"curriculo_{course_code}_"):
+            return path
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sugere grades sem conflito de horário a partir do histórico.")
+    parser.add_argument("historico", type=Path, help="JSON gerado pelo pdf_parser.py")
+    parser.add_argument("--curriculo", type=Path, help="JSON do currículo (padrão: pelo courseCode do histórico)")
+    parser.add_argument("--turmas", type=Path, default=TURMAS_DIR, help="Pasta com os turmas_curso_*.json")
+    parser.add_argument("-k", type=int, default=5, help="Quantidade de grades sugeridas")
+    parser.add_argument("--max-aulas", type=int, help="Aulas por semana (padrão: aulas_semana_max do currículo)")
+    parser.add_argument("--optativas", action="store_true", help="Inclui disciplinas optativas")
+    parser.add_argument("--lotadas", action="store_true", help="Inclui turmas sem vagas")
+    args = parser.parse_args()
+
+    with open(args.historico, "r", encoding="utf-8") as file:
+        transcript = json.load(file)
+
+    course_code = transcript.get("courseCode")
+    curriculum_path = args.curriculo or find_curriculum_file(course_code)
+    if curriculum_path is None:
+        parser.error(f"Currículo do curso {course_code} não encontrado; use --curriculo")
+    curriculum_json = load_json(curriculum_path)
+
+    suggester = ScheduleSuggester(curriculum_json, transcript.get("curriculumId"), include_optional=args.optativas)
+    offering = load_offering(args.turmas, curriculum_json.get("codigo"))
+    result = suggester.suggest(transcript, offering, k=args.k, max_weekly_classes=args.max_aulas,
+                               include_full=args.lotadas)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
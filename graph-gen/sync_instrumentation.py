@@ -0,0 +1,42 @@
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+from graph_gen import project_root
+
+ORIGINAL = Path(__file__).parent / "instrumentation.py"
+
+# Pastas que vão para outros containers e levam uma cópia do original
+COPIES = [
+    project_root / "backend/curriculum-graph-processor/src/main/scripts/instrumentation.py",
+    project_root / "curriculum-graph-gen/src/app/lib/parsers/instrumentation.py",
+]
+
+
+def outdated(original: Path = ORIGINAL, copies=COPIES) -> list:
+    """Cópias que não são idênticas ao original (ou que não existem)."""
+    content = original.read_bytes()
+    return [copy for copy in copies if not copy.exists() or copy.read_bytes() != content]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Copia graph-gen/instrumentation.py para as pastas de scripts dos outros containers.")
+    parser.add_argument("--verificar", action="store_true",
+                        help="Só compara; sai com erro se alguma cópia estiver diferente do original")
+    args = parser.parse_args()
+
+    stale = outdated()
+    for copy in stale:
+        if args.verificar:
+            print(f"Diferente do original: {copy.relative_to(project_root)}", file=sys.stderr)
+        else:
+            shutil.copyfile(ORIGINAL, copy)
+            print(f"Atualizado: {copy.relative_to(project_root)}")
+    if args.verificar and stale:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
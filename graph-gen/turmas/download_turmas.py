@@ -1,41 +1,264 @@
-import requests
+import argparse
+import asyncio
 import json
 import os
+import random
+import tempfile
+import time
+
+import aiohttp
 
 # URL do endpoint
-url = "https://sisacad.inf.ufsc.br/modules/curriculo/exporta.php"
+URL = "https://sisacad.inf.ufsc.br/modules/curriculo/exporta.php"
 
 # Cabeçalhos para simular um navegador
-headers = {
+HEADERS = {
     "User-Agent": "Mozilla/5.0",
     "Referer": "https://sisacad.inf.ufsc.br/modules/curriculo/",
     "Origin": "https://sisacad.inf.ufsc.br",
 }
 
 # Todos os códigos dos cursos (retirados do <option>)
-codigos_curso = [
+CODIGOS_CURSO = [
     "301","316","501","555","455","337","207","335","451","324","342","349","601","503","108","110","302","317","208","304","318","310","320","450","454","453","452","420","303","5","717","703","715","705","702","714","713","708","707","709","716","711","710","334","444","404","12","101","602","603","201","607","215","234","655","220","754","653","233","753","236","237","212","213","214","608","202","235","604","553","203","605","606","216","211","755","102","328","329","323","307","2","225","654","109","331","332","336","326","327","344","347","343","346","345","348","341","415","428","426","421","461","460","462","423","464","463","465","424","467","466","468","425","470","469","471","427","473","472","474","441","440","222","223","224","751","756","103","656","556","552","230","338","9","333","104","308","319","226","3","205","752","757","227","340","429","309","339","238","652","651","502"
 ]
 
-# Pasta para salvar
-output_dir = "curriculos_20252"
-os.makedirs(output_dir, exist_ok=True)
+PERIODO = "20252"  # 2025-2
+
+# Requisições simultâneas ao servidor (e conexões mantidas abertas)
+CONCORRENCIA = 8
+
+# Tentativas por curso e limites do backoff exponencial (em segundos)
+TENTATIVAS = 5
+ESPERA_BASE = 1.0
+ESPERA_MAXIMA = 30.0
+
+TIMEOUT = 15
+
+
+class ErroTemporario(Exception):
+    """Falha que vale a pena tentar de novo (rede, 5xx, 429, JSON truncado)."""
 
-for codigo in codigos_curso:
-    params = {
-        "codigo_curso": codigo,
-        "periodo": "20252",  # 2025-2
-        "export_turmas": "Exportar Turmas",
-    }
 
+class ErroDefinitivo(Exception):
+    """Falha que não se resolve tentando de novo (4xx, resposta vazia)."""
+
+
+def escrever_atomico(caminho, conteudo):
+    """Grava em um arquivo temporário na mesma pasta e troca pelo destino."""
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    fd, temporario = tempfile.mkstemp(dir=pasta, prefix=".tmp_", suffix=".json")
     try:
-        resp = requests.post(url, headers=headers, data=params, timeout=15)
-        if resp.status_code == 200 and resp.text.strip():
-            filename = os.path.join(output_dir, f"turmas_curso_{codigo}.json")
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(resp.json(), f, ensure_ascii=False, indent=2)
-            print(f"✅ Baixado: {filename}")
-        else:
-            print(f"⚠️ Falhou {codigo} -> Status {resp.status_code}")
-    except Exception as e:
-        print(f"❌ Erro no curso {codigo}: {e}")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+        os.chmod(temporario, 0o644)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def espera_backoff(tentativa, base=ESPERA_BASE, maxima=ESPERA_MAXIMA):
+    """Backoff exponencial com jitter completo."""
+    return random.uniform(0, min(maxima, base * 2 ** tentativa))
+
+
+class EstadoDownload:
+    """
+    Estado persistido de uma execução, para que uma execução interrompida
+    continue de onde parou. O arquivo é apagado quando todos os cursos
+    terminam; cursos que falharam ficam pendentes para a próxima execução.
+    """
+
+    def __init__(self, caminho, periodo):
+        self.caminho = caminho
+        self.periodo = periodo
+        self.concluidos = {}
+
+    @classmethod
+    def carregar(cls, caminho, periodo):
+        estado = cls(caminho, periodo)
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return estado
+
+        if data.get("periodo") == periodo:
+            estado.concluidos = data.get("concluidos", {})
+        return estado
+
+    def concluir(self, codigo, situacao):
+        self.concluidos[codigo] = situacao
+        self.salvar()
+
+    def salvar(self):
+        data = {"periodo": self.periodo, "concluidos": self.concluidos}
+        escrever_atomico(self.caminho, json.dumps(data, ensure_ascii=False, indent=2))
+
+    def apagar(self):
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
+
+
+class DownloaderTurmas:
+    """
+    Baixa as turmas de vários cursos em paralelo, com número limitado de
+    requisições simultâneas, reaproveitamento de conexões e novas tentativas
+    com backoff exponencial. Arquivos só são reescritos quando o conteúdo
+    baixado muda.
+    """
+
+    def __init__(self, periodo=PERIODO, cursos=CODIGOS_CURSO, pasta_saida=None, url=URL,
+                 concorrencia=CONCORRENCIA, tentativas=TENTATIVAS, timeout=TIMEOUT,
+                 arquivo_estado=None, espera_base=ESPERA_BASE):
+        self.periodo = str(periodo)
+        self.cursos = [str(codigo) for codigo in cursos]
+        self.pasta_saida = pasta_saida or f"turmas_{self.periodo}"
+        self.url = url
+        self.concorrencia = max(1, concorrencia)
+        self.tentativas = max(1, tentativas)
+        self.timeout = timeout
+        self.espera_base = espera_base
+        self.arquivo_estado = arquivo_estado or os.path.join(self.pasta_saida, ".download_estado.json")
+
+    def executar(self, reiniciar=False):
+        return asyncio.run(self.baixar_todos(reiniciar=reiniciar))
+
+    async def baixar_todos(self, reiniciar=False):
+        """Baixa todos os cursos pendentes e devolve um resumo por situação."""
+        os.makedirs(self.pasta_saida, exist_ok=True)
+        estado = EstadoDownload(self.arquivo_estado, self.periodo)
+        if not reiniciar:
+            estado = EstadoDownload.carregar(self.arquivo_estado, self.periodo)
+
+        pendentes = [codigo for codigo in self.cursos if codigo not in estado.concluidos]
+        if len(pendentes) < len(self.cursos):
+            print(f"Retomando download: {len(self.cursos) - len(pendentes)} cursos já concluídos.")
+
+        resumo = {"baixados": [], "inalterados": [], "falhas": {}}
+        inicio = time.perf_counter()
+
+        semaforo = asyncio.Semaphore(self.concorrencia)
+        connector = aiohttp.TCPConnector(limit=self.concorrencia)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout) as session:
+            tarefas = [self._baixar_curso(session, semaforo, codigo) for codigo in pendentes]
+            for tarefa in asyncio.as_completed(tarefas):
+                codigo, situacao, detalhe = await tarefa
+                if situacao == "falha":
+                    resumo["falhas"][codigo] = detalhe
+                    print(f"❌ Erro no curso {codigo}: {detalhe}")
+                    continue
+
+                resumo[situacao].append(codigo)
+                estado.concluir(codigo, situacao)
+                if situacao == "baixados":
+                    print(f"✅ Baixado: {detalhe}")
+
+        if not resumo["falhas"]:
+            estado.apagar()
+
+        resumo["tempo"] = time.perf_counter() - inicio
+        return resumo
+
+    async def _baixar_curso(self, session, semaforo, codigo):
+        params = {
+            "codigo_curso": codigo,
+            "periodo": self.periodo,
+            "export_turmas": "Exportar Turmas",
+        }
+
+        for tentativa in range(self.tentativas):
+            try:
+                async with semaforo:
+                    data = await self._requisitar(session, params)
+                try:
+                    return (codigo, *self._gravar(codigo, data))
+                except OSError as e:
+                    # Disco cheio, permissão...: o curso fica pendente, como nos erros HTTP
+                    return codigo, "falha", f"Erro ao gravar o arquivo: {e}"
+            except ErroDefinitivo as e:
+                return codigo, "falha", str(e)
+            except (ErroTemporario, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                erro = str(e) or type(e).__name__
+                if tentativa + 1 == self.tentativas:
+                    return codigo, "falha", f"{erro} (após {self.tentativas} tentativas)"
+                await asyncio.sleep(espera_backoff(tentativa, base=self.espera_base))
+
+    async def _requisitar(self, session, params):
+        async with session.post(self.url, data=params) as resp:
+            texto = await resp.text()
+            if resp.status == 429 or resp.status >= 500:
+                raise ErroTemporario(f"Status {resp.status}")
+            if resp.status != 200:
+                raise ErroDefinitivo(f"Status {resp.status}")
+            if not texto.strip():
+                raise ErroDefinitivo("Resposta vazia")
+
+        try:
+            return json.loads(texto)
+        except json.JSONDecodeError as e:
+            raise ErroTemporario(f"JSON inválido: {e}")
+
+    def _gravar(self, codigo, data):
+        """Grava o arquivo do curso apenas se o conteúdo mudou."""
+        filename = os.path.join(self.pasta_saida, f"turmas_curso_{codigo}.json")
+        conteudo = json.dumps(data, ensure_ascii=False, indent=2)
+
+        try:
+            with open(filename, "r", encoding="utf-8") as f:
+                if f.read() == conteudo:
+                    return "inalterados", filename
+        except (FileNotFoundError, UnicodeDecodeError):
+            pass
+
+        escrever_atomico(filename, conteudo)
+        return "baixados", filename
+
+
+def ler_cursos(valor):
+    """Aceita uma lista separada por vírgulas ou @arquivo com um código por linha."""
+    if valor.startswith("@"):
+        with open(valor[1:], "r", encoding="utf-8") as f:
+            return [linha.strip() for linha in f if linha.strip()]
+    return [codigo.strip() for codigo in valor.split(",") if codigo.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Baixa as turmas de cada curso do sisacad.")
+    parser.add_argument("--periodo", default=PERIODO, help="Período no formato AAAAS (ex: 20252)")
+    parser.add_argument("--cursos", type=ler_cursos, default=CODIGOS_CURSO,
+                        help="Códigos separados por vírgula, ou @arquivo com um código por linha")
+    parser.add_argument("--saida", help="Pasta de destino (padrão: turmas_<periodo>)")
+    parser.add_argument("--url", default=URL, help="Endpoint de exportação")
+    parser.add_argument("--concorrencia", type=int, default=CONCORRENCIA, help="Requisições simultâneas")
+    parser.add_argument("--tentativas", type=int, default=TENTATIVAS, help="Tentativas por curso")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="Timeout por requisição (s)")
+    parser.add_argument("--reiniciar", action="store_true",
+                        help="Ignora o estado salvo e baixa todos os cursos de novo")
+    args = parser.parse_args()
+
+    downloader = DownloaderTurmas(
+        periodo=args.periodo,
+        cursos=args.cursos,
+        pasta_saida=args.saida,
+        url=args.url,
+        concorrencia=args.concorrencia,
+        tentativas=args.tentativas,
+        timeout=args.timeout,
+    )
+    resumo = downloader.executar(reiniciar=args.reiniciar)
+
+    print("-" * 40)
+    print(f"Baixados: {len(resumo['baixados'])} | Sem alteração: {len(resumo['inalterados'])} | "
+          f"Falhas: {len(resumo['falhas'])} | Tempo: {resumo['tempo']:.1f}s")
+    if resumo["falhas"]:
+        print("Rode novamente para tentar os cursos que falharam.")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import hashlib
+import sys
+import time
+from pathlib import Path
+
+import instrumentation
+from graph_gen import DEFAULT_FORMATS, OUTPUT_DIR, RESOURCES_DIR, TURMAS_DIR, project_root, render_all
+from render_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+
+SCRIPTS_DIR = project_root / "backend/curriculum-graph-processor/src/main/scripts"
+
+# Segundos entre duas varreduras das pastas
+POLL_INTERVAL = 1.0
+# Um lote de mudanças só é processado depois de tanto tempo sem novas
+# escritas (o download_turmas.py grava dezenas de arquivos em sequência)...
+DEBOUNCE = 2.0
+# ...ou quando a primeira mudança pendente ficar mais velha que isto, para
+# uma sequência contínua de escritas não adiar tudo indefinidamente.
+MAX_WAIT = 30.0
+
+log = instrumentation.get_logger("watch")
+
+
+class DirectoryPoller:
+    """
+    Detecta arquivos novos, alterados e apagados comparando o (mtime, tamanho)
+    de cada arquivo entre duas varreduras. Só usa a biblioteca padrão, então
+    funciona igual em volumes do Docker, onde o inotify nem sempre chega.
+    Arquivos que começam com ponto (manifesto, temporários da escrita
+    atômica) são ignorados.
+    """
+
+    def __init__(self, directory: Path, pattern: str = "*.json", recursive: bool = False):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.recursive = recursive
+        self.state = self.scan()
+
+    def scan(self) -> dict:
+        glob = self.directory.rglob if self.recursive else self.directory.glob
+        state = {}
+        for path in glob(self.pattern):
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def changes(self) -> set:
+        """Caminhos que mudaram desde a última chamada (inclusive os apagados)."""
+        state = self.scan()
+        changed = {path for path, signature in state.items() if self.state.get(path) != signature}
+        changed |= self.state.keys() - state.keys()
+        self.state = state
+        return changed
+
+
+class Debouncer:
+    """Junta as mudanças de uma rajada de escritas e as libera uma única vez."""
+
+    def __init__(self, debounce: float = DEBOUNCE, max_wait: float = MAX_WAIT):
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.pending = set()
+        self.first = self.last = None
+
+    def add(self, paths, now: float):
+        if not paths:
+            return
+        self.pending |= paths
+        self.last = now
+        self.first = self.first if self.first is not None else now
+
+    def ready(self, now: float) -> set:
+        if not self.pending:
+            return set()
+        if now - self.last < self.debounce and now - self.first < self.max_wait:
+            return set()
+        batch, self.pending = self.pending, set()
+        self.first = self.last = None
+        return batch
+
+
+def content_hash(path: Path):
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+class CurriculumWatcher:
+    """
+    Re-renderiza só os grafos dos currículos alterados. Um arquivo reescrito
+    com o mesmo conteúdo não é renderizado de novo, e o grafo de um
+    currículo apagado é removido da pasta de saída.
+    """
+
+    def __init__(self, source_dir: Path, output_dir: Path, formats: list, engine: str = "dot",
+                 jobs: int = None, cache_dir: Path = DEFAULT_CACHE_DIR, cache_max_bytes: int = DEFAULT_MAX_BYTES):
+        self.source_dir = Path(source_dir).resolve()
+        self.output_dir = Path(output_dir)
+        self.formats = formats
+        self.engine = engine
+        self.jobs = jobs
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.poller = DirectoryPoller(self.source_dir, recursive=True)
+        # Hash do conteúdo de cada currículo na última renderização
+        self.rendered = {}
+
+    def handle(self, paths: set):
+        changed = []
+        for path in sorted(paths):
+            digest = content_hash(path)
+            if digest is None:
+                self._remove_outputs(path)
+            elif self.rendered.get(path) != digest:
+                changed.append(path)
+                self.rendered[path] = digest
+        if not changed:
+            return
+
+        with instrumentation.span("watch_render"):
+            timings = render_all(self.source_dir, self.output_dir, self.formats, jobs=self.jobs,
+                                 engine=self.engine, paths=changed, cache_dir=self.cache_dir,
+                                 cache_max_bytes=self.cache_max_bytes)
+        failed = [t for t in timings if t["error"]]
+        for t in failed:
+            log.error("Falha ao renderizar %s: %s", t["curriculum"], t["error"])
+            # Sem hash, a próxima escrita do arquivo tenta de novo
+            self.rendered.pop(self.source_dir / f"{t['curriculum']}.json", None)
+        log.info("%d grafos atualizados (%d falhas)", len(timings) - len(failed), len(failed))
+
+    def _remove_outputs(self, path: Path):
+        self.rendered.pop(path, None)
+        output_base = self.output_dir / path.relative_to(self.source_dir).with_suffix("")
+        for fmt in self.formats:
+            Path(f"{output_base}.{fmt}").unlink(missing_ok=True)
+        log.info("Currículo removido: %s", path.relative_to(self.source_dir))
+
+
+class TurmasWatcher:
+    """
+    Reimporta só os arquivos de turmas alterados, pelo pipeline e pelo
+    manifesto do atualizar_turmas.py: dentro de cada arquivo, só as turmas
+    novas ou com propriedades alteradas vão para o banco, e as turmas de
+    arquivos apagados são removidas.
+    """
+
+    def __init__(self, directory: Path, uri: str = None, sessions: int = None, manifest: str = None):
+        if str(SCRIPTS_DIR) not in sys.path:
+            sys.path.insert(0, str(SCRIPTS_DIR))
+        import atualizar_turmas
+
+        self.importacao = atualizar_turmas
+        self.directory = Path(directory)
+        self.manifest = manifest
+        self.options = {"sessoes": sessions} if sessions else {}
+        self.importer = atualizar_turmas.Neo4jImporter(uri or atualizar_turmas.URI)
+        self.poller = DirectoryPoller(self.directory, "turmas_*.json")
+
+    @property
+    def connected(self) -> bool:
+        return self.importer.driver is not None
+
+    def prepare(self, skip_schema: bool = False, allow_scans: bool = False) -> bool:
+        return self.importacao.preparar_importacao(self.importer, skip_schema, allow_scans)
+
+    def handle(self, paths: set):
+        with instrumentation.span("watch_import"):
+            estatisticas = self.importacao.importar_alterados(self.importer, str(self.directory),
+                                                              [str(path) for path in paths],
+                                                              self.manifest, **self.options)
+        for falha in estatisticas["falhas"]:
+            log.warning("Turma '%s': %s", falha["shortname"], falha["motivo"])
+        log.info("%d arquivos de turmas: %d turmas enviadas, %d inalteradas, %d removidas, %d falhas em %.2fs",
+                 estatisticas["arquivos"], estatisticas["turmas"], estatisticas["turmas_inalteradas"],
+                 estatisticas["turmas_removidas"], len(estatisticas["falhas"]), estatisticas["tempo_total"])
+
+    def close(self):
+        self.importer.close()
+
+
+def watch(watchers: list, interval: float = POLL_INTERVAL, debounce: float = DEBOUNCE,
+          max_wait: float = MAX_WAIT, iterations: int = None):
+    """
+    Laço principal: varre as pastas a cada `interval` segundos e entrega a
+    cada observador, uma vez, as mudanças que já se acalmaram. Mudanças que
+    chegam durante o processamento ficam para a próxima volta.
+    """
+    debouncers = [Debouncer(debounce, max_wait) for _ in watchers]
+    done = 0
+    while iterations is None or done < iterations:
+        done += 1
+        now = time.monotonic()
+        for watcher, debouncer in zip(watchers, debouncers):
+            debouncer.add(watcher.poller.changes(), now)
+            batch = debouncer.ready(now)
+            if batch:
+                log.debug("%s: %d arquivos alterados", type(watcher).__name__, len(batch))
+                instrumentation.count("watch_changes", len(batch))
+                try:
+                    watcher.handle(batch)
+                except Exception:
+                    # Um lote com erro não pode derrubar o modo watch
+                    log.exception("Falha ao processar %d arquivos alterados", len(batch))
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Observa os currículos e as turmas e atualiza só os grafos e as turmas que mudaram.")
+    parser.add_argument("--source", type=Path, default=RESOURCES_DIR, help="Pasta com os currículos")
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR, help="Pasta de saída dos grafos")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS), help="Formatos separados por vírgula")
+    parser.add_argument("--engine", default="dot", help="Motor do Graphviz, ou 'fases' para o layout próprio")
+    parser.add_argument("--jobs", type=int, help="Processos renderizando em paralelo")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE_DIR, help="Pasta do cache de renderização")
+    parser.add_argument("--turmas", type=Path, default=TURMAS_DIR, help="Pasta com os turmas_curso_*.json")
+    parser.add_argument("--neo4j", help="URI do Neo4j (padrão: env NEO4J_URI)")
+    parser.add_argument("--sessoes", type=int, help="Sessões gravando no Neo4j")
+    parser.add_argument("--manifesto", help="Manifesto da importação (padrão: <turmas>/.manifesto_turmas.json)")
+    parser.add_argument("--sem-grafos", action="store_true", help="Não observa os currículos")
+    parser.add_argument("--sem-turmas", action="store_true", help="Não observa as turmas")
+    parser.add_argument("--sem-inicial", action="store_true",
+                        help="Não processa o que mudou enquanto o watch estava parado")
+    parser.add_argument("--intervalo", type=float, default=POLL_INTERVAL, help="Segundos entre varreduras")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE,
+                        help="Segundos sem escritas antes de processar uma rajada de mudanças")
+    parser.add_argument("--espera-max", type=float, default=MAX_WAIT,
+                        help="Tempo máximo que uma mudança espera durante escritas contínuas")
+    instrumentation.add_cli_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    watchers = []
+    if not args.sem_grafos:
+        formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+        watchers.append(CurriculumWatcher(args.source, args.output, formats, args.engine, args.jobs, args.cache))
+    if not args.sem_turmas:
+        turmas = TurmasWatcher(args.turmas, args.neo4j, args.sessoes, args.manifesto)
+        if not turmas.connected or not turmas.prepare():
+            parser.error("Neo4j indisponível ou esquema não preparado; use --sem-turmas para observar só os grafos")
+        watchers.append(turmas)
+    if not watchers:
+        parser.error("Nada para observar")
+
+    if not args.sem_inicial:
+        # Tudo o que existe hoje: o cache de renderização e o manifesto
+        # descartam o que não mudou desde a última execução.
+        for watcher in watchers:
+            try:
+                watcher.handle(set(watcher.poller.state))
+            except Exception:
+                # Como no watch(): uma falha aqui não impede de observar
+                log.exception("Falha na passagem inicial de %s", watcher.poller.directory)
+
+    log.info("Observando %s", ", ".join(str(w.poller.directory) for w in watchers))
+    try:
+        watch(watchers, args.intervalo, args.debounce, args.espera_max)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for watcher in watchers:
+            if isinstance(watcher, TurmasWatcher):
+                watcher.close()
+
+
+if __name__ == "__main__":
+    main()